@@ -11,6 +11,7 @@
 
 __version__ = '0.6-dev'
 
-from .core import Plan
+from .core import Plan, PlanGroup
 from .job import Job, CommandJob, ScriptJob, ModuleJob, RawJob
+from .job import FunctionJob
 from .exceptions import PlanError, ParseError, ValidationError
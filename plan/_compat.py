@@ -18,6 +18,10 @@ if not PY2:
     string_types = (str,)
     integer_types = (int,)
 
+    intern = sys.intern
+
+    from itertools import zip_longest
+
     iterkeys = lambda d: iter(d.keys())
     itervalues = lambda d: iter(d.values())
     iteritems = lambda d: iter(d.items())
@@ -26,11 +30,26 @@ else:
     string_types = (str, unicode)
     integer_types = (int, long)
 
+    intern = intern
+
+    from itertools import izip_longest as zip_longest
+
     iterkeys = lambda d: d.iterkeys()
     itervalues = lambda d: d.itervalues()
     iteritems = lambda d: d.iteritems()
 
 
+def shell_quote(value):
+    """Quote one string for the shell, shlex is imported on the first
+    call.
+    """
+    if PY2:
+        from pipes import quote
+    else:
+        from shlex import quote
+    return quote(value)
+
+
 def get_binary_content(content):
     """Get binary content for binary_writer."""
     if isinstance(content, text_type):
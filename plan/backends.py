@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+    plan.backends
+    ~~~~~~~~~~~~~
+
+    Crontab backends for Plan.  One backend reads and writes the cronfile of
+    one user, :class:`CrontabBackend` runs the `crontab` command and
+    :class:`SpoolBackend` works on the spool files directly.
+
+    :copyright: (c) 2014 by Shipeng Feng.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import os
+import errno
+import signal
+
+from .exceptions import PlanError
+from .utils import communicate_process, write_lines, atomic_write
+
+
+class CrontabBackend(object):
+    """The default backend, which runs `crontab -l` to read the cronfile and
+    `crontab cronfile` to write it.
+
+    .. versionadded:: 0.6
+    """
+
+    def read(self, user=None):
+        """Get the cronfile content of one user.
+
+        :param user: the user, default to be the current user.
+        """
+        command = ['crontab', '-l']
+        if user:
+            command.extend(["-u", str(user)])
+        try:
+            r = communicate_process(command, universal_newlines=True)
+            output, error, returncode = r
+            if returncode != 0:
+                raise PlanError("couldn't read crontab")
+        except OSError:
+            raise PlanError("couldn't read crontab; please make sure you "
+                            "have crontab installed")
+        return output
+
+    def write(self, lines, user=None):
+        """Replace the cronfile of one user.
+
+        :param lines: an iterable of cronfile lines without newlines.
+        :param user: the user, default to be the current user.
+        """
+        import tempfile
+        tmp_cronfile = tempfile.NamedTemporaryFile()
+        try:
+            write_lines(tmp_cronfile, lines)
+            tmp_cronfile.flush()
+
+            # command used to write crontab
+            # $ crontab -u username cronfile
+            command = ['crontab']
+            if user:
+                command.extend(["-u", str(user)])
+            command.append(tmp_cronfile.name)
+
+            try:
+                output, error, returncode = communicate_process(command)
+                if returncode != 0:
+                    raise PlanError("couldn't write crontab; try running "
+                                    "check to ensure your cronfile is valid.")
+            except OSError:
+                raise PlanError("couldn't write crontab; please make sure you "
+                                "have crontab installed")
+        finally:
+            tmp_cronfile.close()
+
+
+class SpoolBackend(object):
+    """The backend reading and writing the spool files of the cron daemon
+    directly, no process is started.  The cronfile is written into one
+    temporary file in the spool directory, synced to disk and renamed over
+    the old one, so the daemon never sees half written cronfiles.
+
+    The content is not checked by the `crontab` command, so run check first.
+
+    .. versionadded:: 0.6
+
+    :param directory: the spool directory, default to be
+                      ``/var/spool/cron/crontabs``.
+    :param pidfile: the pidfile of the cron daemon, the daemon is signaled
+                    after every write if set.  Most daemons notice the
+                    changed spool directory without this.
+    :param reload_signal: the signal sent to the daemon, default to be
+                          SIGHUP.
+    :param mode: the permission bits of written cronfiles.
+    """
+
+    #: The first line of the header `crontab` puts before spool files, the
+    #: header is three lines long and skipped when reading.
+    header = "# DO NOT EDIT THIS FILE"
+
+    def __init__(self, directory='/var/spool/cron/crontabs', pidfile=None,
+                 reload_signal=signal.SIGHUP, mode=0o600):
+        self.directory = directory
+        self.pidfile = pidfile
+        self.reload_signal = reload_signal
+        self.mode = mode
+
+    def get_path(self, user=None):
+        """Get the spool file path of one user."""
+        import getpass
+        return os.path.join(self.directory, str(user or getpass.getuser()))
+
+    def read(self, user=None):
+        """Get the cronfile content of one user, empty if the user has no
+        spool file.
+
+        :param user: the user, default to be the current user.
+        """
+        try:
+            with open(self.get_path(user)) as f:
+                content = f.read()
+        except (IOError, OSError) as e:
+            if e.errno == errno.ENOENT:
+                return ''
+            raise PlanError("couldn't read crontab; %s" % e)
+        if content.startswith(self.header):
+            content = content.split('\n', 3)[3:]
+            content = content[0] if content else ''
+        return content
+
+    def write(self, lines, user=None):
+        """Replace the cronfile of one user atomically.
+
+        :param lines: an iterable of cronfile lines without newlines.
+        :param user: the user, default to be the current user.
+        """
+        path = self.get_path(user)
+        try:
+            owner = None
+            if os.geteuid() == 0:
+                owner = self.get_owner(user)
+            atomic_write(path, lines, self.mode, owner)
+        except (IOError, OSError) as e:
+            raise PlanError("couldn't write crontab; %s" % e)
+        self.reload()
+
+    def get_owner(self, user=None):
+        """Get the (uid, gid) tuple spool files of one user are given to when
+        running as root, the user and the group of the spool directory like
+        `crontab` does.
+        """
+        import pwd
+        import getpass
+        user = str(user or getpass.getuser())
+        try:
+            uid = pwd.getpwnam(user).pw_uid
+        except KeyError:
+            raise PlanError("couldn't write crontab; unknown user %s" % user)
+        return uid, os.stat(self.directory).st_gid
+
+    def reload(self):
+        """Signal the cron daemon if `pidfile` is set."""
+        if not self.pidfile:
+            return
+        try:
+            with open(self.pidfile) as f:
+                pid = int(f.read().strip())
+            os.kill(pid, self.reload_signal)
+        except (IOError, OSError, ValueError) as e:
+            raise PlanError("couldn't signal cron daemon; %s" % e)
@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+"""
+    plan.benchmarks
+    ~~~~~~~~~~~~~~~
+
+    Benchmarks for Plan, every module can be run with ``python -m``.
+
+    :copyright: (c) 2014 by Shipeng Feng.
+    :license: BSD, see LICENSE for more details.
+"""
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+    plan.benchmarks.memory
+    ~~~~~~~~~~~~~~~~~~~~~~
+
+    Memory benchmark for Plan.  This builds one plan with lots of jobs and
+    compares the memory used by jobs with the memory used by jobs keeping
+    their own copies of every value in an instance dictionary, which is how
+    jobs were stored before.
+
+    Run it with::
+
+        $ python -m plan.benchmarks.memory --jobs 100000
+
+    :copyright: (c) 2014 by Shipeng Feng.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import gc
+import sys
+import optparse
+
+from plan.job import CommandJob
+from plan.output import Output
+from plan.cost import Cost
+
+
+class LegacyJob(object):
+    """One job keeping its own copies of every value in its instance
+    dictionary, only used for comparison.
+    """
+
+    def __init__(self, task, every, at=None, path=None,
+                 environment=None, output=None, cost=None, window=None):
+        self.task = task
+        self.every = every
+        self.at = at
+        self.path = path
+        self.environment = environment
+        self.output = str(Output(output))
+        self.cost = Cost(cost)
+        self.window = window
+
+
+def copy_value(value):
+    """Build a new copy of one value, like values read from a
+    configuration file for every job.
+    """
+    if isinstance(value, str):
+        return ''.join(list(value))
+    if isinstance(value, dict):
+        return dict((copy_value(k), copy_value(v)) for k, v in value.items())
+    return value
+
+
+def build_jobs(job_class, count):
+    """Build count jobs, tasks are mostly different while everything else
+    is shared by lots of jobs.
+    """
+    jobs = []
+    for i in range(count):
+        jobs.append(job_class(
+            copy_value('/srv/app/bin/task --shard %d' % (i % 1000)),
+            every=copy_value('%d.day' % (i % 7 + 1)),
+            at=copy_value('hour.%d' % (i % 24)),
+            path=copy_value('/usr/local/bin:/usr/bin:/bin'),
+            environment={copy_value('APP_ENV'): copy_value('production')},
+            output=dict(stdout=copy_value('/var/log/app/jobs.log')),
+            cost=i % 3 + 1))
+    return jobs
+
+
+def measure(job_class, count):
+    """Measure the memory in bytes used by count jobs of job_class."""
+    import tracemalloc
+    gc.collect()
+    tracemalloc.start()
+    jobs = build_jobs(job_class, count)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del jobs
+    return used
+
+
+def main(argv=None):
+    parser = optparse.OptionParser(usage='%prog [--jobs N]')
+    parser.add_option('--jobs', type='int', default=100000,
+                      help='how many jobs to build')
+    options, args = parser.parse_args(argv)
+    if sys.version_info < (3, 4):
+        parser.error('tracemalloc needs Python 3.4 or newer')
+    legacy = measure(LegacyJob, options.jobs)
+    compact = measure(CommandJob, options.jobs)
+    sys.stdout.write('jobs: %d\n' % options.jobs)
+    sys.stdout.write('legacy: %.1f MiB, %d bytes per job\n' %
+                     (legacy / 1048576.0, legacy // options.jobs))
+    sys.stdout.write('compact: %.1f MiB, %d bytes per job\n' %
+                     (compact / 1048576.0, compact // options.jobs))
+    sys.stdout.write('saved: %.0f%%\n' % (100.0 - compact * 100.0 / legacy))
+
+
+if __name__ == '__main__':
+    main()
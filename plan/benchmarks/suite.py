@@ -0,0 +1,371 @@
+# -*- coding: utf-8 -*-
+"""
+    plan.benchmarks.suite
+    ~~~~~~~~~~~~~~~~~~~~~
+
+    Benchmark suite for Plan.  This measures parsing every and at values,
+    rendering the cron content of large plans and updating the block of one
+    plan inside large crontabs, and writes the results as JSON.
+
+    Run it and keep the results as the baseline::
+
+        $ python -m plan.benchmarks.suite --output baseline.json
+
+    Later runs compare against the baseline and exit with status 1 if any
+    result got slower or bigger by more than the tolerance::
+
+        $ python -m plan.benchmarks.suite --baseline baseline.json
+
+    The crontab benchmarks never touch the real crontab, one fake `crontab`
+    executable keeping the cronfile in one temporary file is put first on
+    `PATH` while they run.
+
+    :copyright: (c) 2014 by Shipeng Feng.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import os
+import gc
+import sys
+import json
+import time
+import shutil
+import platform
+import optparse
+import tempfile
+
+from plan import __version__
+from plan.core import Plan
+from plan.job import CommandJob, parse_cache
+
+
+#: The every and at forms parsed by the parse benchmark.
+TIME_FORMS = [
+    ('1.minute', None),
+    ('15.minute', None),
+    ('1.hour', None),
+    ('2.hour', 'minute.30'),
+    ('1.day', None),
+    ('1.day', '12:15'),
+    ('3.day', 'hour.1 minute.5'),
+    ('1.month', None),
+    ('2.month', 'day.5 hour.1'),
+    ('1.month', 'sunday 8:00'),
+    ('jan', 'day.1'),
+    ('jan,jul', 'day.1 hour.6'),
+    ('1.year', None),
+    ('monday', None),
+    ('monday', 'hour.9 minute.30'),
+    ('weekday', '9:30'),
+    ('weekend', 'hour.10'),
+]
+
+#: How many jobs the plans of the render benchmark have.
+RENDER_SIZES = (1000, 10000, 100000)
+
+#: How many foreign blocks the crontabs of the update benchmark have.
+CRONTAB_SIZES = (10, 100, 1000)
+
+#: How many jobs one foreign block has.
+BLOCK_JOBS = 20
+
+FAKE_CRONTAB = """\
+#!/bin/sh
+# fake crontab: crontab [-u user] (-l | cronfile)
+if [ "$1" = "-u" ]; then shift 2; fi
+if [ "$1" = "-l" ]; then
+    cat "$PLAN_BENCHMARK_CRONFILE" 2>/dev/null
+    exit 0
+fi
+cp "$1" "$PLAN_BENCHMARK_CRONFILE"
+"""
+
+if hasattr(time, 'perf_counter'):
+    clock = time.perf_counter
+else:
+    clock = time.time
+
+
+def best_of(repeat, setup, run):
+    """Call setup and then run repeat times and get the best time of run in
+    seconds, the value returned by setup is passed to run.
+    """
+    best = None
+    for _ in range(repeat):
+        value = setup()
+        gc.collect()
+        start = clock()
+        run(value)
+        seconds = clock() - start
+        if best is None or seconds < best:
+            best = seconds
+    return best
+
+
+def peak_memory(setup, run):
+    """Get the peak memory in bytes allocated while run is called, None if
+    tracemalloc is not available.
+    """
+    try:
+        import tracemalloc
+    except ImportError:
+        return None
+    value = setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run(value)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_parse(repeat, count=2000):
+    """Measure :meth:`~plan.job.Job.parse_time` of every form in
+    :data:`TIME_FORMS`, the parse cache is not used.
+    """
+    results = {}
+    for every, at in TIME_FORMS:
+        def setup():
+            return [CommandJob('task', every, at) for _ in range(count)]
+
+        def run(jobs):
+            for job in jobs:
+                job.parse_time()
+        seconds = best_of(repeat, setup, run)
+        name = 'parse_time every=%s' % every
+        if at:
+            name += ' at=%s' % at
+        results[name] = {'seconds': seconds, 'ops': count,
+                         'ops_per_second': count / seconds}
+    return results
+
+
+def build_plan(size, name='main'):
+    """Build one plan with size jobs using all the forms in
+    :data:`TIME_FORMS`.
+    """
+    plan = Plan(name, path='/srv/app', environment={'APP_ENV': 'production'},
+                output=dict(stdout='/var/log/app/jobs.log'))
+    for index in range(size):
+        every, at = TIME_FORMS[index % len(TIME_FORMS)]
+        plan.command('/srv/app/bin/task --shard %d' % index, every=every,
+                     at=at)
+    return plan
+
+
+def bench_render(repeat, sizes=RENDER_SIZES):
+    """Measure rendering :attr:`~plan.Plan.cron_content` of fresh plans,
+    neither the parse cache nor the rendered line cache is warm.
+    """
+    results = {}
+    for size in sizes:
+        def setup():
+            parse_cache.clear()
+            return build_plan(size)
+
+        def run(plan):
+            plan.cron_content
+        seconds = best_of(repeat, setup, run)
+        results['cron_content jobs=%d' % size] = {
+            'seconds': seconds, 'ops': size, 'ops_per_second': size / seconds,
+            'peak_bytes': peak_memory(setup, run)}
+    return results
+
+
+def build_crontab(blocks, plan):
+    """Build one crontab with blocks foreign plan blocks, the block of plan
+    sits in the middle of them.
+    """
+    lines = ['MAILTO=ops@example.com', '# not managed by plan',
+             '0 4 * * * /usr/local/bin/backup']
+    for index in range(blocks):
+        foreign = Plan('foreign%d' % index, path='/srv/foreign%d' % index)
+        for job in range(BLOCK_JOBS):
+            foreign.command('bin/sync --part %d' % job, every='1.day',
+                            at='hour.%d' % (job % 24))
+        lines.append('')
+        lines.extend(foreign.iter_cron_lines())
+        if index == blocks // 2:
+            lines.append('')
+            lines.extend(plan.iter_cron_lines())
+    return '\n'.join(lines) + '\n'
+
+
+class FakeCrontab(object):
+    """Put one fake `crontab` executable first on `PATH`, the cronfile is
+    kept in one temporary file.
+    """
+
+    def __enter__(self):
+        self.directory = tempfile.mkdtemp()
+        self.cronfile = os.path.join(self.directory, 'cronfile')
+        executable = os.path.join(self.directory, 'crontab')
+        with open(executable, 'w') as f:
+            f.write(FAKE_CRONTAB)
+        os.chmod(executable, 0o755)
+        self.environ = dict(os.environ)
+        os.environ['PATH'] = self.directory + os.pathsep + \
+            os.environ.get('PATH', '')
+        os.environ['PLAN_BENCHMARK_CRONFILE'] = self.cronfile
+        return self
+
+    def __exit__(self, *args):
+        os.environ.clear()
+        os.environ.update(self.environ)
+        shutil.rmtree(self.directory)
+
+    def install(self, content):
+        with open(self.cronfile, 'w') as f:
+            f.write(content)
+
+    def read(self):
+        with open(self.cronfile) as f:
+            return f.read()
+
+
+class Quiet(object):
+    """Swallow what Plan echoes, so it does not end up in the results."""
+
+    def __enter__(self):
+        self.stdout = sys.stdout
+        sys.stdout = open(os.devnull, 'w')
+
+    def __exit__(self, *args):
+        sys.stdout.close()
+        sys.stdout = self.stdout
+
+
+def bench_update(repeat, sizes=CRONTAB_SIZES, jobs=100):
+    """Measure :meth:`~plan.Plan.update_crontab` replacing the block of one
+    plan inside crontabs with more and more foreign blocks, and finding it
+    unchanged.
+    """
+    results = {}
+    old = build_plan(jobs)
+    new = build_plan(jobs)
+    new.command('/srv/app/bin/added', every='1.hour')
+    with FakeCrontab() as crontab, Quiet():
+        for size in sizes:
+            content = build_crontab(size, old)
+            lines = content.count('\n')
+
+            def setup():
+                crontab.install(content)
+                return new
+
+            def replace(plan):
+                if not plan.update_crontab('update'):
+                    raise RuntimeError("the block was not replaced")
+            seconds = best_of(repeat, setup, replace)
+            results['update_crontab replace blocks=%d' % size] = {
+                'seconds': seconds, 'lines': lines}
+            updated = crontab.read()
+
+            def setup():
+                crontab.install(updated)
+                return new
+
+            def unchanged(plan):
+                if plan.update_crontab('update'):
+                    raise RuntimeError("the block was replaced")
+            seconds = best_of(repeat, setup, unchanged)
+            results['update_crontab unchanged blocks=%d' % size] = {
+                'seconds': seconds, 'lines': lines}
+    return results
+
+
+#: The benchmark groups, run in this order.
+BENCHMARKS = [
+    ('parse', bench_parse),
+    ('render', bench_render),
+    ('update', bench_update),
+]
+
+#: The result values compared with the baseline, higher is worse.
+COMPARED = ('seconds', 'peak_bytes')
+
+
+def compare(results, baseline, tolerance):
+    """Compare results with the baseline results.
+
+    :return: a list of (name, key, baseline value, value) tuples of the
+             results worse than the baseline by more than tolerance, a
+             fraction like 0.25.
+    """
+    regressions = []
+    for name, result in sorted(results.items()):
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for key in COMPARED:
+            value, before = result.get(key), previous.get(key)
+            if value is None or not before:
+                continue
+            if value > before * (1 + tolerance):
+                regressions.append((name, key, before, value))
+    return regressions
+
+
+def main(argv=None):
+    parser = optparse.OptionParser(usage='%prog [options]')
+    parser.add_option('--only', action='append', default=[],
+                      help='run only this group, one of %s' %
+                           ', '.join(name for name, _ in BENCHMARKS))
+    parser.add_option('--sizes', default=None,
+                      help='comma separated job counts of the render group')
+    parser.add_option('--repeat', type='int', default=3,
+                      help='how many times every benchmark runs, the best '
+                           'time is kept')
+    parser.add_option('--output', default=None,
+                      help='write the results into this file instead of '
+                           'stdout')
+    parser.add_option('--baseline', default=None,
+                      help='compare the results with this results file')
+    parser.add_option('--tolerance', type='float', default=0.25,
+                      help='how much worse than the baseline one result '
+                           'may be, default 0.25')
+    options, args = parser.parse_args(argv)
+    groups = [name for name, _ in BENCHMARKS]
+    for name in options.only:
+        if name not in groups:
+            parser.error('unknown group %s' % name)
+
+    results = {}
+    for name, benchmark in BENCHMARKS:
+        if options.only and name not in options.only:
+            continue
+        if name == 'render' and options.sizes:
+            sizes = [int(size) for size in options.sizes.split(',')]
+            results.update(benchmark(options.repeat, sizes))
+        else:
+            results.update(benchmark(options.repeat))
+
+    report = {
+        'plan': __version__,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'results': results,
+    }
+    content = json.dumps(report, indent=2, sort_keys=True)
+    if options.output:
+        with open(options.output, 'w') as f:
+            f.write(content + '\n')
+    else:
+        sys.stdout.write(content + '\n')
+
+    if options.baseline:
+        with open(options.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, options.tolerance)
+        for name, key, before, value in regressions:
+            sys.stderr.write('regression: %s %s %.6g -> %.6g (%+.0f%%)\n' %
+                             (name, key, before, value,
+                              (value - before) * 100.0 / before))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -13,43 +13,7 @@ import os
 import click
 
 from ._compat import get_binary_content
-
-
-class Echo(object):
-    """Echo class for Plan.  This is used to echo some common used content
-    type in the command line.
-    """
-
-    @classmethod
-    def echo(cls, message):
-        click.echo(message)
-
-    @classmethod
-    def secho(cls, *args, **kwargs):
-        click.secho(*args, **kwargs)
-
-    @classmethod
-    def message(cls, message):
-        cls.secho("[message] %s" % message, fg="green")
-
-    @classmethod
-    def write(cls, message):
-        cls.secho("[write] %s" % message, fg="green")
-
-    @classmethod
-    def fail(cls, message):
-        cls.secho("[fail] %s" % message, fg="red")
-
-    @classmethod
-    def add(cls, message):
-        cls.secho("[add] %s" % message, fg="green")
-
-    @classmethod
-    def done(cls, message=None):
-        if message:
-            cls.secho("[done] %s" % message, fg="green")
-        else:
-            cls.secho("[done]!", fg="green")
+from .utils import Echo
 
 
 SCHEDULE_TEMPLATE = """\
@@ -91,6 +55,94 @@ def quickstart(path):
         Echo.done()
 
 
+@click.command()
+@click.argument('schedule', type=click.Path(exists=True, dir_okay=False))
+@click.option('--user', '-u', 'users', multiple=True,
+              help='The user to deploy to, can be given more than once.')
+@click.option('--users-file', type=click.File(),
+              help='A file listing one user per line.')
+@click.option('--run-type', default='update',
+              type=click.Choice(['update', 'write', 'clear']),
+              help='The running type, default to be update.')
+@click.option('--workers', default=8,
+              help='The most users deployed at the same time.')
+def deploy(schedule, users, users_file, run_type, workers):
+    """plan-deploy"""
+    from .deploy import deploy as deploy_plans, load_plans
+    users = list(users)
+    if users_file is not None:
+        users.extend(line.strip() for line in users_file if line.strip())
+    if not users:
+        raise click.UsageError("no user given, use --user or --users-file")
+    plans = load_plans(schedule)
+    if not plans:
+        raise click.UsageError("no Plan object found in %s" % schedule)
+    results = deploy_plans(dict((user, plans) for user in users),
+                           run_type, workers)
+    action = {'update': 'updated', 'write': 'written',
+              'clear': 'cleared'}[run_type]
+    failed = 0
+    for result in results:
+        if result.ok:
+            Echo.message("%s %s in %.2fs" % (
+                result.user, action if result.changed else 'unchanged',
+                result.seconds))
+        else:
+            failed += 1
+            Echo.fail("%s %s" % (result.user, result.error))
+    if failed:
+        Echo.fail("%d of %d users failed" % (failed, len(results)))
+        raise SystemExit(1)
+    Echo.done()
+
+
+@click.command()
+@click.argument('schedule', type=click.Path(exists=True, dir_okay=False))
+@click.option('--concurrency', type=int, default=None,
+              help='The most jobs running at the same time.')
+@click.option('--grace', default=30,
+              help='Seconds running jobs get to exit after stopping.')
+def serve(schedule, concurrency, grace):
+    """plan-serve"""
+    from .deploy import load_plans
+    from .engine import Engine
+    plans = load_plans(schedule)
+    if not plans:
+        raise click.UsageError("no Plan object found in %s" % schedule)
+    for plan in plans:
+        plan.run_bootstrap_commands()
+    engine = Engine(plans, concurrency, grace, echo=True)
+    Echo.message("serving %d jobs of %d plans" % (
+        sum(len(plan.jobs) for plan in plans), len(plans)))
+    engine.run()
+    Echo.done("served %d runs, %d failed" % (engine.finished, engine.failed))
+
+
+@click.command()
+@click.option('--socket', 'path', required=True,
+              help='The Unix socket path.')
+@click.option('--preload', multiple=True,
+              help='One module imported before serving, can be given more '
+                   'than once.')
+@click.option('--stats', 'show_stats', is_flag=True,
+              help='Echo the statistics of the running zygote instead.')
+def zygote(path, preload, show_stats):
+    """plan-zygote"""
+    import json
+    from .zygote import Zygote, stats
+    if show_stats:
+        result = stats(path)
+        if result is None:
+            raise click.ClickException("no zygote is listening on %s" % path)
+        Echo.echo(json.dumps(result, indent=2, sort_keys=True))
+        return
+    server = Zygote(path, preload)
+    Echo.message("zygote listening on %s" % path)
+    server.serve_forever()
+    Echo.done("%d runs, %.2fs of startup saved" % (
+        server.stats()['runs'], server.stats()['saved_seconds']))
+
+
 def prompt_choices(name, choices):
     """One wrapper function for click.prompt to show choices to the user.
     """
@@ -9,18 +9,57 @@
     :license: BSD, see LICENSE for more details.
 """
 
-import re
 import os
-import tempfile
-import shlex
-import subprocess
+import datetime
+import collections
 
-from .commands import Echo
 from .job import CommandJob, ScriptJob, ModuleJob, RawJob
+from .job import FunctionJob, PythonJob, intern_environment
 from .output import Output
-from ._compat import string_types, get_binary_content
-from .exceptions import PlanError
-from .utils import communicate_process
+from .cron import merge_schedules
+from ._compat import string_types
+from .exceptions import PlanError, ParseError, ValidationError
+from .crontab import CrontabIndex
+from .utils import iter_lines, normalize_lines, write_lines, same_lines
+from .utils import join_chunks, file_lock, Echo
+
+
+#: One problem found by :meth:`Plan.validate`, index is the job index in
+#: :attr:`Plan.jobs`, field is the wrong job parameter.
+Problem = collections.namedtuple('Problem',
+                                 ['index', 'job', 'field', 'message'])
+
+
+def update_cronfile(target, update_type):
+    """Read, merge and write the cronfile of one :class:`Plan` or
+    :class:`PlanGroup`.  The local lockfile of target is held the whole time
+    if it is set.  If target allows retries, the cronfile is read again
+    right before writing, and merged again if somebody else changed it in
+    the meantime.
+
+    :param target: one :class:`Plan` or :class:`PlanGroup` instance.
+    :param update_type: update or clear.
+    :return: False if the cronfile was left alone, True otherwise.
+    """
+    if update_type == "update":
+        action = "updated"
+    elif update_type == "clear":
+        action = "cleared"
+
+    with file_lock(target.lockfile):
+        for attempt in range((target.retries or 0) + 1):
+            current_crontab = target.read_crontab()
+            chunks = target.merge_crontab(current_crontab, update_type)
+            if chunks is None:
+                Echo.write("crontab file unchanged")
+                return False
+            if target.retries and target.read_crontab() != current_crontab:
+                continue
+            # Write the updated cronfile back to crontab
+            target._write_to_crontab(action, join_chunks(chunks))
+            return True
+    raise PlanError("Your crontab file kept changing while updating, gave "
+                    "up after %d retries" % target.retries)
 
 
 class Plan(object):
@@ -32,10 +71,45 @@ class Plan(object):
     :param environment: the global crontab job bash environment.
     :param output: the global crontab job output logfile for this object.
     :param user: the user you want to run `crontab` command with.
+    :param spread: spread jobs that do not pin their minute or hour over the
+                   day instead of running them all at minute 0 and hour 0.
+    :param max_concurrency: the most jobs the host can run at the same time,
+                            check mode simulates the next 7 days and tells
+                            whether this is exceeded.
+    :param compact: render the shortest equivalent cron time syntax and
+                    merge jobs running the same task when possible.
+    :param backend: the backend reading and writing the cronfile, default to
+                    be one :class:`~plan.backends.CrontabBackend`, use one
+                    :class:`~plan.backends.SpoolBackend` to work on spool
+                    files directly.
+    :param retries: how many times update and clear merge again when the
+                    cronfile is changed by somebody else between reading and
+                    writing it, 0 means the cronfile is not read again.
+    :param lockfile: the path of one local lockfile held while updating the
+                     cronfile, deployers using the same lockfile never run
+                     at the same time.
+    :param crond: one cron.d style directory path or one
+                  :class:`~plan.crond.CronDirectory` instance, if set, write
+                  and update put this object's jobs into its own file there
+                  instead of the user crontab, clear removes the file.
+    :param systemd: one unit directory path or one
+                    :class:`~plan.systemd.SystemdDirectory` instance, if set,
+                    write and update render every job as one systemd service
+                    and timer there instead of the user crontab, clear
+                    removes them.
+    :param zygote: the socket path of one :class:`~plan.zygote.Zygote`
+                   script and module jobs ask to run them, see
+                   :class:`~plan.job.PythonJob`.
+
+    .. versionchanged:: 0.6
+       The `spread`, `max_concurrency`, `compact`, `backend`, `retries`,
+       `lockfile`, `crond`, `systemd` and `zygote` parameters were added.
     """
 
     def __init__(self, name="main", path=None, environment=None,
-                 output=None, user=None):
+                 output=None, user=None, spread=False, max_concurrency=None,
+                 compact=False, backend=None, retries=0, lockfile=None,
+                 crond=None, systemd=None, zygote=None):
         self.name = name
         if path is None:
             self.path = os.getcwd()
@@ -44,6 +118,21 @@ class Plan(object):
         self.environment = environment
         self.output = str(Output(output))
         self.user = user
+        self.spread = spread
+        self.max_concurrency = max_concurrency
+        self.compact = compact
+        self.backend = backend
+        self.retries = retries
+        self.lockfile = lockfile
+        if isinstance(crond, string_types):
+            from .crond import CronDirectory
+            crond = CronDirectory(crond)
+        self.crond = crond
+        if isinstance(systemd, string_types):
+            from .systemd import SystemdDirectory
+            systemd = SystemdDirectory(systemd)
+        self.systemd = systemd
+        self.zygote = zygote
 
         # All commands should be executed before run
         self.bootstrap_commands = []
@@ -51,6 +140,25 @@ class Plan(object):
         self.envs = {}
         # All jobs registered on this Plan object
         self.jobs = []
+        # Jobs placed by their costs, spread leaves them alone
+        self.placed_jobs = []
+        # The jobs spread last time, spreading again is skipped until they
+        # change
+        self.spread_key = None
+
+    @property
+    def backend(self):
+        """The crontab backend, one :class:`~plan.backends.CrontabBackend`
+        unless another one was given.
+        """
+        if self._backend is None:
+            from .backends import CrontabBackend
+            self._backend = CrontabBackend()
+        return self._backend
+
+    @backend.setter
+    def backend(self, backend):
+        self._backend = backend
 
     def bootstrap(self, command_or_commands):
         """Register bootstrap commands.
@@ -96,6 +204,15 @@ class Plan(object):
         job = RawJob(*args, **kwargs)
         self.job(job)
 
+    def function(self, *args, **kwargs):
+        """Register one function, takes the same parameters as
+        :class:`~plan.job.FunctionJob`.
+
+        .. versionadded:: 0.6
+        """
+        job = FunctionJob(*args, **kwargs)
+        self.job(job)
+
     def job(self, job):
         """Register one job.
 
@@ -104,11 +221,34 @@ class Plan(object):
         if self.path and not job.path:
             job.path = self.path
         if self.environment and not job.environment:
-            job.environment = self.environment
+            job.environment = intern_environment(self.environment)
         if self.output and not job.output:
             job.output = self.output
+        if self.zygote and isinstance(job, PythonJob) and not job.zygote:
+            job.zygote = self.zygote
         self.jobs.append(job)
 
+    def validate(self):
+        """Check all registered jobs at once instead of raising on the first
+        bad one.  Parse results are shared with rendering, so validating
+        before rendering costs almost nothing.
+
+        .. versionadded:: 0.6
+
+        :return: a list of :data:`~plan.core.Problem` tuples, empty if every
+                 job is fine.
+        """
+        from .placement import parse_window
+        problems = []
+        for index, job in enumerate(self.jobs):
+            try:
+                job.time_in_cron_syntax
+                if job.window:
+                    parse_window(job.window)
+            except (ParseError, ValidationError) as e:
+                problems.append(Problem(index, job, e.field, e.message))
+        return problems
+
     @property
     def comment_begin(self):
         """Comment begin content for this object, this will be added before
@@ -132,11 +272,99 @@ class Plan(object):
                 variables.append("%s=%s" % (str(variable), value))
         return variables
 
+    def spread_jobs(self):
+        """Assign deterministic moments to jobs that do not pin their
+        minute or hour, balanced against the other jobs of this object.
+        This is done before rendering if `spread` is enabled.
+
+        .. versionadded:: 0.6
+        """
+        key = (tuple((id(job), job.__class__, job.task, job.every, job.at)
+                     for job in self.jobs),
+               tuple(map(id, self.placed_jobs)))
+        if key == self.spread_key:
+            return
+        from .placement import spread
+        spread(self.jobs, exclude=self.placed_jobs)
+        self.spread_key = key
+
+    def place(self, resource='cpu', step=5):
+        """Place daily, weekly and monthly jobs that set neither minute nor
+        hour in their at value into the moments that keep the peak
+        concurrent cost lowest, honouring their windows.  Jobs declare
+        their costs with the `cost` parameter.
+
+        .. versionadded:: 0.6
+
+        :param resource: place jobs by cpu, memory or jobs, default to be
+                         cpu.
+        :param step: only consider start minutes that are multiples of
+                     step, default to be 5.
+        :return: one :class:`~plan.placement.PlacementReport` instance, its
+                 `peak` is the resulting peak load.
+        """
+        from .placement import spread, place, placeable
+        if self.spread:
+            spread(self.jobs, exclude=filter(placeable, self.jobs))
+        report = place(self.jobs, resource, step)
+        self.placed_jobs = report.jobs
+        self.spread_key = None
+        return report
+
     @property
     def crons(self):
         """Return a list of registered jobs's cron syntax content."""
+        if self.spread:
+            self.spread_jobs()
+        if self.compact:
+            return self.compact_crons()
         return [job.cron for job in self.jobs]
 
+    def compact_crons(self):
+        """Return a list of registered jobs's cron syntax content in the
+        shortest form.  Jobs running the same task are merged when their
+        times differ in one field only, see
+        :meth:`~plan.cron.CronSchedule.merge`.  Lines are grouped by task in
+        the order of their first jobs.
+
+        .. versionadded:: 0.6
+        """
+        return [' '.join(entry) for entry in self.compact_entries()]
+
+    def compact_entries(self):
+        """Return a list of (time, task) tuples of :meth:`compact_crons`.
+
+        .. versionadded:: 0.6
+        """
+        tasks = []
+        times = {}
+        for job in self.jobs:
+            task = job.task_in_cron_syntax
+            if task not in times:
+                tasks.append(task)
+                times[task] = []
+            times[task].append(job.schedule)
+        entries = []
+        for task in tasks:
+            for schedule in merge_schedules(times[task]):
+                entries.append((schedule.render(), task))
+        return entries
+
+    def iter_cron_entries(self):
+        """Iterate over the (time, task) tuples of registered jobs, jobs are
+        spread or compacted first if enabled.
+
+        .. versionadded:: 0.6
+        """
+        if self.spread:
+            self.spread_jobs()
+        if self.compact:
+            for entry in self.compact_entries():
+                yield entry
+        else:
+            for job in self.jobs:
+                yield job.time_in_cron_syntax, job.task_in_cron_syntax
+
     @property
     def comment_end(self):
         return "# End Plan generated jobs for: %s" % self.name
@@ -144,8 +372,110 @@ class Plan(object):
     @property
     def cron_content(self):
         """Your schedule jobs converted to cron syntax."""
-        return "\n".join([self.comment_begin] + self.environment_variables +
-                         self.crons + [self.comment_end]) + "\n"
+        return "\n".join(self.iter_cron_lines()) + "\n"
+
+    def iter_cron_lines(self):
+        """Iterate over the lines of :attr:`cron_content` without building
+        the whole content, lines have no trailing newline.
+
+        .. versionadded:: 0.6
+        """
+        yield self.comment_begin
+        for variable in self.environment_variables:
+            yield variable
+        if self.spread:
+            self.spread_jobs()
+        if self.compact:
+            for cron in self.compact_crons():
+                yield cron
+        else:
+            for job in self.jobs:
+                yield job.cron
+        yield self.comment_end
+
+    def write_cron_to(self, fileobj):
+        """Write :attr:`cron_content` into one binary file object line by
+        line.
+
+        .. versionadded:: 0.6
+
+        :param fileobj: the file object opened in binary mode.
+        """
+        write_lines(fileobj, self.iter_cron_lines())
+
+    def load_profile(self, days=7, start=None):
+        """Expand the schedules of all registered jobs into one minute
+        resolution firing calendar, NumPy is required.
+
+        .. versionadded:: 0.6
+
+        :param days: how many days the calendar covers, default to be 7.
+        :param start: the calendar starts from the midnight of this datetime,
+                      default to be today.
+        :return: one :class:`~plan.profile.LoadProfile` instance.
+        """
+        from .profile import load_profile
+        if start is None:
+            start = datetime.datetime.now()
+        if self.spread:
+            self.spread_jobs()
+        return load_profile(self.jobs, start, days)
+
+    def echo_load_profile(self):
+        """Echo the peak load of this object, used by run_type `check`.
+        Nothing is echoed if NumPy is not installed.
+        """
+        try:
+            profile = self.load_profile()
+        except PlanError:
+            return
+        if not profile.peak:
+            return
+        peak_minutes = profile.peak_minutes
+        Echo.message("peak load in the next 7 days: %d jobs at %s, "
+                     "%d minutes at this peak" %
+                     (profile.peak, peak_minutes[0].strftime('%Y-%m-%d %H:%M'),
+                      len(peak_minutes)))
+
+    def simulate(self, start=None, end=None, durations=None):
+        """Replay the schedules of all registered jobs over a time range with
+        their durations.
+
+        .. versionadded:: 0.6
+
+        :param start: the start datetime, default to be now.
+        :param end: the end datetime, default to be 7 days after start.
+        :param durations: a dictionary of durations in minutes keyed by job,
+                          job index or task, values can be one duration or
+                          a list of historical durations, the longest one is
+                          used.  Jobs not found use their declared costs.
+        :return: one :class:`~plan.simulation.SimulationReport` instance.
+        """
+        from .simulation import simulate
+        if start is None:
+            start = datetime.datetime.now().replace(second=0, microsecond=0)
+        if end is None:
+            end = start + datetime.timedelta(days=7)
+        if self.spread:
+            self.spread_jobs()
+        return simulate(self.jobs, start, end, durations)
+
+    def echo_simulation(self):
+        """Echo the simulated peak concurrency of the next 7 days, used by
+        run_type `check` when `max_concurrency` is set.
+        """
+        report = self.simulate()
+        if report.peak_time is None:
+            return
+        Echo.message("peak concurrency in the next 7 days: %d jobs at %s" %
+                     (report.peak,
+                      report.peak_time.strftime('%Y-%m-%d %H:%M')))
+        for job, overlaps in report.overlaps:
+            Echo.message("%s overlaps with its previous run %d times" %
+                         (job.task, overlaps))
+        if report.peak > self.max_concurrency:
+            Echo.fail("peak concurrency %d exceeds max_concurrency %d" %
+                      (report.peak, self.max_concurrency))
 
     def _write_to_crontab(self, action, content):
         """The inside method used to modify the current crontab cronfile.
@@ -153,60 +483,29 @@ class Plan(object):
 
         :param action: the action that is done, could be written, updated or
                        cleared.
-        :param content: the content that is written to the crontab cronfile.
-        """
-        # make sure at most 3 '\n' in a row
-        content = re.sub(r'\n{4,}', r'\n\n\n', content)
-        # strip
-        content = content.strip()
-        if content:
-            content += "\n"
-
-        tmp_cronfile = tempfile.NamedTemporaryFile()
-        tmp_cronfile.write(get_binary_content(content))
-        tmp_cronfile.flush()
-
-        # command used to write crontab
-        # $ crontab -u username cronfile
-        command = ['crontab']
-        if self.user:
-            command.extend(["-u", str(self.user)])
-        command.append(tmp_cronfile.name)
+        :param content: the content that is written to the crontab cronfile,
+                        either a string or an iterable of lines which is
+                        streamed into the cronfile.
 
-        try:
-            output, error, returncode = communicate_process(command)
-            if returncode != 0:
-                raise PlanError("couldn't write crontab; try running check to "
-                                "ensure your cronfile is valid.")
-        except OSError:
-            raise PlanError("couldn't write crontab; please make sure you "
-                            "have crontab installed")
-        else:
-            if action:
-                Echo.write("crontab file %s" % action)
-        finally:
-            tmp_cronfile.close()
+        .. versionchanged:: 0.6
+           The content can be an iterable of lines.
+        """
+        if isinstance(content, string_types):
+            content = [content]
+        # make sure at most 3 '\n' in a row and strip
+        self.backend.write(normalize_lines(content), self.user)
+        if action:
+            Echo.write("crontab file %s" % action)
 
     def write_crontab(self):
         """Write the crontab cronfile with this object's cron content, used
         by run_type `write`.  This will replace the whole cronfile.
         """
-        self._write_to_crontab("written", self.cron_content)
+        self._write_to_crontab("written", self.iter_cron_lines())
 
     def read_crontab(self):
         """Get the current working crontab cronfile content."""
-        command = ['crontab', '-l']
-        if self.user:
-            command.extend(["-u", str(self.user)])
-        try:
-            r = communicate_process(command, universal_newlines=True)
-            output, error, returncode = r
-            if returncode != 0:
-                raise PlanError("couldn't read crontab")
-        except OSError:
-            raise PlanError("couldn't read crontab; please make sure you "
-                            "have crontab installed")
-        return output
+        return self.backend.read(self.user)
 
     def update_crontab(self, update_type):
         """Update the current cronfile, used by run_type `update` or `clear`.
@@ -217,50 +516,167 @@ class Plan(object):
                             corresponding to this plan object will be replaced
                             with the new cron job entries, otherwise, they
                             will be wiped.
+        :return: False if the cronfile was left alone because the block was
+                 unchanged or there was nothing to clear, True otherwise.
+
+        .. versionchanged:: 0.6
+           The cronfile is not written when nothing changes.
         """
-        current_crontab = self.read_crontab()
+        return update_cronfile(self, update_type)
 
-        if update_type == "update":
-            action = "updated"
-            crontab_content = self.cron_content
-        elif update_type == "clear":
-            action = "cleared"
-            crontab_content = ''
-
-        # Check for unbegined or unended block
-        comment_begin_re = re.compile(r"^%s$" % self.comment_begin, re.M)
-        comment_end_re = re.compile(r"^%s$" % self.comment_end, re.M)
-        cron_block_re = re.compile(r"^%s$.+^%s$" %
-                                   (self.comment_begin, self.comment_end),
-                                   re.M | re.S)
-
-        comment_begin_match = comment_begin_re.search(current_crontab)
-        comment_end_match = comment_end_re.search(current_crontab)
-
-        if comment_begin_match and not comment_end_match:
-            raise PlanError("Your crontab file is not ended, it contains "
-                            "'%s', but no '%s'" % (self.comment_begin,
-                                                   self.comment_end))
-        elif not comment_begin_match and comment_end_match:
-            raise PlanError("Your crontab file has no begining, it contains "
-                            "'%s', but no '%s'" % (self.comment_end,
-                                                   self.comment_begin))
+    def merge_crontab(self, current_crontab, update_type):
+        """Merge the block of this object into one cronfile content.
+
+        .. versionadded:: 0.6
 
+        :param current_crontab: the current cronfile content.
+        :param update_type: update or clear.
+        :return: the chunks of the updated content, see
+                 :func:`~plan.utils.join_chunks`, or None if nothing changes.
+        """
         # Found our existing block and replace it with the new one
         # Otherwise, append out new cron jobs after others
-        if comment_begin_match and comment_end_match:
-            updated_content = cron_block_re.sub(crontab_content,
-                                                current_crontab)
+        block = self.find_block(current_crontab)
+        if block:
+            if update_type == "update" and \
+                    same_lines(iter_lines(current_crontab[block[0]:block[1]]),
+                               self.iter_cron_lines()):
+                return None
+            chunks = [current_crontab[:block[0]]]
+            if update_type == "update":
+                chunks.append(self.iter_cron_chunks())
+            chunks.append(current_crontab[block[1]:])
+        elif update_type == "clear":
+            return None
         else:
-            updated_content = "\n\n".join((current_crontab, crontab_content))
+            chunks = [current_crontab, "\n\n", self.iter_cron_chunks()]
+        return chunks
+
+    def iter_cron_chunks(self):
+        """Iterate over the lines of :attr:`cron_content` with their
+        trailing newlines.
+        """
+        for line in self.iter_cron_lines():
+            yield line + "\n"
+
+    def find_block(self, content, index=None):
+        """Find the block of this object inside one cronfile content.
 
-        # Write the updated cronfile back to crontab
-        self._write_to_crontab(action, updated_content)
+        .. versionadded:: 0.6
+
+        :param content: the cronfile content.
+        :param index: the :class:`~plan.crontab.CrontabIndex` of content if
+                      it is built already.
+        :return: the start and end offsets of the block without its trailing
+                 newline, None if there is no block.
+        """
+        if index is None:
+            index = CrontabIndex(content)
+        block = index.find(self.comment_begin, self.comment_end)
+        if block is not None:
+            return block.start, block.end
+
+    def crontab_index(self):
+        """Read the current cronfile and index the blocks inside it, use
+        its `names` to list the Plan objects present.
+
+        .. versionadded:: 0.6
+
+        :return: one :class:`~plan.crontab.CrontabIndex` instance.
+        """
+        return CrontabIndex(self.read_crontab())
+
+    def write_crond(self):
+        """Write the file of this object in :attr:`crond`, used by run_type
+        `write` and `update` when `crond` is set.
+
+        .. versionadded:: 0.6
+
+        :return: False if the file was up to date, True otherwise.
+        """
+        path = self.crond.get_path(self)
+        if self.crond.write(self):
+            Echo.write("cron.d file %s written" % path)
+            return True
+        Echo.write("cron.d file %s unchanged" % path)
+        return False
+
+    def clear_crond(self):
+        """Remove the file of this object in :attr:`crond`, used by run_type
+        `clear` when `crond` is set.
+
+        .. versionadded:: 0.6
+
+        :return: False if there was no file, True otherwise.
+        """
+        path = self.crond.get_path(self)
+        if self.crond.remove(self):
+            Echo.write("cron.d file %s cleared" % path)
+            return True
+        Echo.write("cron.d file %s unchanged" % path)
+        return False
+
+    def write_systemd(self):
+        """Write the systemd units of this object in :attr:`systemd`, used
+        by run_type `write` and `update` when `systemd` is set.  Only units
+        whose content changed are written.
+
+        .. versionadded:: 0.6
+
+        :return: one :class:`~plan.systemd.SystemdReport` instance.
+        """
+        report = self.systemd.write(self)
+        for filename in report.written:
+            Echo.write("unit file %s written" % filename)
+        for filename in report.removed:
+            Echo.write("unit file %s removed" % filename)
+        Echo.message("%d unit files written, %d unchanged, %d removed" %
+                     (len(report.written), len(report.unchanged),
+                      len(report.removed)))
+        return report
+
+    def clear_systemd(self):
+        """Remove the systemd units of this object in :attr:`systemd`, used
+        by run_type `clear` when `systemd` is set.
+
+        .. versionadded:: 0.6
+
+        :return: the removed unit file names.
+        """
+        filenames = self.systemd.remove(self)
+        Echo.write("%d unit files cleared" % len(filenames))
+        return filenames
+
+    def serve(self, concurrency=None, grace=30):
+        """Run the jobs of this object from one in-process scheduler instead
+        of cron until SIGINT or SIGTERM is received, used by run_type
+        `serve`.  See :class:`~plan.engine.Engine`, this needs Python 3.5 or
+        later.
+
+        .. versionadded:: 0.6
+
+        :param concurrency: the most runs at the same time, default to be
+                            :attr:`max_concurrency`.
+        :param grace: how many seconds running processes get to exit after
+                      stopping.
+        """
+        from .engine import Engine
+        if concurrency is None:
+            concurrency = self.max_concurrency
+        engine = Engine([self], concurrency, grace, echo=True)
+        Echo.message("serving %d jobs of plan %s" % (len(self.jobs),
+                                                      self.name))
+        engine.run()
+        Echo.done("served %d runs, %d failed" % (engine.finished,
+                                                 engine.failed))
+        return engine
 
     def run_bootstrap_commands(self):
         """Run bootstrap commands.
         """
         if self.bootstrap_commands:
+            import shlex
+            import subprocess
             Echo.secho("Starting bootstrap...", fg="green")
             for command in self.bootstrap_commands:
                 command = shlex.split(command)
@@ -271,17 +687,188 @@ class Plan(object):
         """Use this to do any action on this Plan object.
 
         :param run_type: The running type, one of ("check", "write",
-                         "update", "clear"), default to be "check"
+                         "update", "clear", "serve"), default to be "check"
+
+        .. versionchanged:: 0.6
+           The `serve` running type was added.
         """
         self.run_bootstrap_commands()
-        if run_type == "update" or run_type == "clear":
+        if run_type == "serve":
+            self.serve()
+        elif self.systemd is not None and run_type in ("write", "update"):
+            self.write_systemd()
+        elif self.systemd is not None and run_type == "clear":
+            self.clear_systemd()
+        elif self.crond is not None and run_type in ("write", "update"):
+            self.write_crond()
+        elif self.crond is not None and run_type == "clear":
+            self.clear_crond()
+        elif run_type == "update" or run_type == "clear":
             self.update_crontab(run_type)
         elif run_type == "write":
             self.write_crontab()
         else:
+            problems = self.validate()
+            if problems:
+                for problem in problems:
+                    Echo.fail("job %d %s: %s" % (problem.index,
+                                                 problem.field or 'time',
+                                                 problem.message))
+                Echo.message("Your crontab file was not updated.")
+                return
             Echo.echo(self.cron_content)
+            self.echo_load_profile()
+            if self.max_concurrency is not None:
+                self.echo_simulation()
             Echo.message("Your crontab file was not updated.")
 
     def __call__(self, run_type="check"):
         """Shortcut for :meth:`run`."""
         self.run(run_type)
+
+
+class PlanGroup(object):
+    """A group of Plan objects sharing one crontab cronfile.  Updating the
+    group reads the cronfile once, replaces the blocks of all plans in one
+    pass and writes it once, so the cronfile is never half updated.
+
+    .. versionadded:: 0.6
+
+    :param plans: a list of :class:`Plan` instances, their names must be
+                  unique and they must run `crontab` with the same user.
+    :param user: the user you want to run `crontab` command with, default to
+                 be the user of the plans.
+    :param backend: the backend reading and writing the cronfile, default to
+                    be the backend of the first plan.
+    :param retries: see :class:`Plan`, default to be the retries of the
+                    first plan.
+    :param lockfile: see :class:`Plan`, default to be the lockfile of the
+                     first plan.
+    """
+
+    def __init__(self, plans=None, user=None, backend=None, retries=None,
+                 lockfile=None):
+        self.plans = []
+        self.user = user
+        self.backend = backend
+        self.retries = retries
+        self.lockfile = lockfile
+        for plan in plans or []:
+            self.add(plan)
+
+    def add(self, plan):
+        """Add one plan into this group.
+
+        :param plan: one :class:`Plan` instance.
+        """
+        if any(plan.name == other.name for other in self.plans):
+            raise PlanError("Plan name %s is used more than once" % plan.name)
+        if self.user is None:
+            self.user = plan.user
+        elif plan.user is not None and plan.user != self.user:
+            raise PlanError("Plan %s runs crontab with user %s instead of %s"
+                            % (plan.name, plan.user, self.user))
+        if self.backend is None:
+            self.backend = plan.backend
+        if self.retries is None:
+            self.retries = plan.retries
+        if self.lockfile is None:
+            self.lockfile = plan.lockfile
+        self.plans.append(plan)
+
+    def read_crontab(self):
+        """Get the current working crontab cronfile content."""
+        return self.backend.read(self.user)
+
+    def crontab_index(self):
+        """Read the current cronfile and index the blocks inside it."""
+        return CrontabIndex(self.read_crontab())
+
+    def _write_to_crontab(self, action, content):
+        """Write lines into the crontab cronfile, see
+        :meth:`Plan._write_to_crontab`.
+        """
+        self.backend.write(normalize_lines(content), self.user)
+        if action:
+            Echo.write("crontab file %s" % action)
+
+    def write_crontab(self):
+        """Write the crontab cronfile with the cron content of all plans,
+        this will replace the whole cronfile.
+        """
+        chunks = []
+        for plan in self.plans:
+            chunks.extend([plan.iter_cron_chunks(), "\n\n"])
+        self._write_to_crontab("written", join_chunks(chunks))
+
+    def update_crontab(self, update_type):
+        """Update the blocks of all plans inside the current cronfile with
+        one read and one write, see :meth:`Plan.update_crontab`.
+
+        :param update_type: update or clear.
+        :return: False if the cronfile was left alone, True otherwise.
+        """
+        return update_cronfile(self, update_type)
+
+    def merge_crontab(self, current_crontab, update_type):
+        """Merge the blocks of all plans into one cronfile content, see
+        :meth:`Plan.merge_crontab`.
+        """
+        index = CrontabIndex(current_crontab)
+        blocks = []
+        missing = []
+        for plan in self.plans:
+            block = plan.find_block(current_crontab, index)
+            if block:
+                blocks.append((block, plan))
+            else:
+                missing.append(plan)
+        blocks.sort(key=lambda item: item[0])
+        for (previous, _), (block, plan) in zip(blocks, blocks[1:]):
+            if block[0] < previous[1]:
+                raise PlanError("The block of plan %s overlaps with another "
+                                "one" % plan.name)
+
+        if update_type == "clear":
+            unchanged = not blocks
+        else:
+            unchanged = not missing and all(
+                same_lines(iter_lines(current_crontab[start:end]),
+                           plan.iter_cron_lines())
+                for (start, end), plan in blocks)
+        if unchanged:
+            return None
+
+        chunks = []
+        position = 0
+        for (start, end), plan in blocks:
+            chunks.append(current_crontab[position:start])
+            if update_type == "update":
+                chunks.append(plan.iter_cron_chunks())
+            position = end
+        chunks.append(current_crontab[position:])
+        if update_type == "update":
+            for plan in missing:
+                chunks.extend(["\n\n", plan.iter_cron_chunks()])
+        return chunks
+
+    def run(self, run_type="check"):
+        """Use this to do any action on all plans of this group.
+
+        :param run_type: The running type, one of ("check", "write",
+                         "update", "clear"), default to be "check"
+        """
+        if run_type not in ("update", "clear", "write"):
+            for plan in self.plans:
+                plan.run(run_type)
+            return
+        for plan in self.plans:
+            plan.run_bootstrap_commands()
+        if run_type == "write":
+            self.write_crontab()
+        else:
+            self.update_crontab(run_type)
+
+    def __call__(self, run_type="check"):
+        """Shortcut for :meth:`run`."""
+        self.run(run_type)
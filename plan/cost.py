@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+    plan.cost
+    ~~~~~~~~~
+
+    Cost for Plan.  This is the expected cost of one job run, used to place
+    jobs and to simulate how busy the host will be.
+
+    :copyright: (c) 2014 by Shipeng Feng.
+    :license: BSD, see LICENSE for more details.
+"""
+
+from ._compat import integer_types
+
+
+class Cost(object):
+    """The expected cost of one job run.  Costs are immutable, so jobs with
+    equal costs can share one instance.
+
+    :param cost: can be the following values::
+
+                     None, which means one minute with cpu weight 1
+                     a number, the duration in minutes
+                     one dictionary with duration, cpu and memory keys
+                     one Cost instance
+    """
+
+    __slots__ = ('duration', 'cpu', 'memory')
+
+    def __init__(self, cost=None):
+        duration, cpu, memory = 1, 1, 0
+        if cost is None:
+            pass
+        elif isinstance(cost, Cost):
+            duration, cpu, memory = cost.duration, cost.cpu, cost.memory
+        elif isinstance(cost, integer_types + (float,)):
+            duration = cost
+        elif isinstance(cost, dict):
+            duration = cost.get('duration', duration)
+            cpu = cost.get('cpu', cpu)
+            memory = cost.get('memory', memory)
+        else:
+            raise TypeError("Illegal cost value %s" % cost)
+        if duration <= 0:
+            raise ValueError("Illegal cost duration %s" % duration)
+        object.__setattr__(self, 'duration', duration)
+        object.__setattr__(self, 'cpu', cpu)
+        object.__setattr__(self, 'memory', memory)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Cost is immutable, create one new Cost instead")
+
+    def __delattr__(self, name):
+        raise AttributeError("Cost is immutable, create one new Cost instead")
+
+    def __repr__(self):
+        return '<Cost duration=%s cpu=%s memory=%s>' % (self.duration,
+                                                        self.cpu, self.memory)
+
+    def __eq__(self, other):
+        return isinstance(other, Cost) and \
+            (self.duration, self.cpu, self.memory) == \
+            (other.duration, other.cpu, other.memory)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.duration, self.cpu, self.memory))
+
+    @property
+    def minutes(self):
+        """How many whole minutes one run occupies, at least one."""
+        return max(1, int(-(-self.duration // 1)))
+
+    def weight(self, resource='cpu'):
+        """The weight of one resource, resource can be cpu, memory or jobs,
+        jobs weight is always 1.
+        """
+        if resource == 'jobs':
+            return 1
+        return getattr(self, resource)
@@ -0,0 +1,550 @@
+# -*- coding: utf-8 -*-
+"""
+    plan.cron
+    ~~~~~~~~~
+
+    Compiled cron time syntax.  Every cron field is stored as a bitset so
+    that we can tell when a job actually fires without scanning the calendar
+    minute by minute.
+
+    :copyright: (c) 2014 by Shipeng Feng.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import datetime
+
+from .job import MINUTE, HOUR, DAY, MONTH, WEEK, MONTH_MAP, WEEK_MAP
+from .exceptions import ParseError
+
+
+# (time type, minimum, maximum, names) for every cron field in order
+FIELDS = (
+    (MINUTE, 0, 59, None),
+    (HOUR, 0, 23, None),
+    (DAY, 1, 31, None),
+    (MONTH, 1, 12, MONTH_MAP),
+    (WEEK, 0, 7, WEEK_MAP),
+)
+
+PREDEFINED_TIMES = {
+    "yearly": "0 0 1 1 *",
+    "annually": "0 0 1 1 *",
+    "monthly": "0 0 1 * *",
+    "weekly": "0 0 * * 0",
+    "daily": "0 0 * * *",
+    "hourly": "0 * * * *",
+}
+
+# How many years we look ahead before deciding one schedule never fires,
+# "0 0 29 2 *" may have to skip 2100 for example.
+MAX_YEARS_AHEAD = 9
+
+ONE_MINUTE = datetime.timedelta(minutes=1)
+ONE_DAY = datetime.timedelta(days=1)
+
+
+def next_bit(mask, start):
+    """Get the lowest set bit position in mask that is not less than start,
+    None if there is no such bit.
+
+    >>> next_bit(0b10100, 3)
+    4
+
+    :param mask: the bitset.
+    :param start: the lowest position we want.
+    """
+    mask >>= start
+    if not mask:
+        return None
+    return start + (mask & -mask).bit_length() - 1
+
+
+def bits_to_list(mask):
+    """Translate one bitset into a sorted list of positions."""
+    positions = []
+    position = 0
+    while mask:
+        if mask & 1:
+            positions.append(position)
+        mask >>= 1
+        position += 1
+    return positions
+
+
+def days_in_month(year, month):
+    """Get how many days one month has."""
+    if month == 12:
+        return 31
+    first_of_next = datetime.date(year, month + 1, 1)
+    return (first_of_next - datetime.date(year, month, 1)).days
+
+
+def cron_weekday(date):
+    """Day of week in cron numbering, 0 is Sunday."""
+    return (date.weekday() + 1) % 7
+
+
+def parse_value(value, field):
+    """Parse one single cron field value, names are allowed for month and
+    day of week fields.
+    """
+    time_type, minimum, maximum, names = field
+    if names is not None and value.lower() in names:
+        return int(names[value.lower()])
+    if not value.isdigit():
+        raise ParseError("Your cron %s value %s is invalid" %
+                         (time_type, value))
+    value = int(value)
+    if value < minimum or value > maximum:
+        raise ParseError("Your cron %s value %s is invalid, out of %s"
+                         " range[%s-%s]" % (time_type, value, time_type,
+                                            minimum, maximum))
+    return value
+
+
+def parse_field(field_value, field):
+    """Parse one cron field into a bitset.  Supports ``*``, ``a``, ``a-b``
+    and step forms like ``*/n``, ``a-b/n`` and ``a/n``, comma separated.
+
+    :param field_value: the field content.
+    :param field: one of :data:`FIELDS`.
+    """
+    time_type, minimum, maximum, names = field
+    mask = 0
+    for item in field_value.split(','):
+        if '/' in item:
+            item, step = item.split('/', 1)
+            if not step.isdigit() or int(step) == 0:
+                raise ParseError("Your cron %s step %s is invalid" %
+                                 (time_type, step))
+            step = int(step)
+        else:
+            step = None
+        if item == '*':
+            start, end = minimum, maximum
+        elif '-' in item:
+            start, end = item.split('-', 1)
+            start, end = parse_value(start, field), parse_value(end, field)
+            if start > end:
+                raise ParseError("Your cron %s range %s is invalid" %
+                                 (time_type, item))
+        else:
+            start = parse_value(item, field)
+            # "a/n" means starting from a with step n till the maximum
+            end = maximum if step is not None else start
+        for value in range(start, end + 1, step or 1):
+            mask |= 1 << value
+    return mask
+
+
+def render_progression(first, last, step, field, star):
+    """Render one run of values from first to last with one constant
+    difference step into one cron field item, step is None for one value.
+    """
+    time_type, minimum, maximum, names = field
+    if step is None:
+        return str(first)
+    if first + step == last and step > 1:
+        return '%d,%d' % (first, last)
+    if star is not False and first == minimum and last + step > maximum:
+        return '*' if step == 1 else '*/%d' % step
+    if step == 1:
+        return '%d-%d' % (first, last)
+    return '%d-%d/%d' % (first, last, step)
+
+
+def render_values(values, field, star=None):
+    """Render sorted values into the shortest comma separated cron field
+    made of ``a``, ``a-b``, ``a-b/n`` and ``*/n`` items.
+
+    :param star: None if ``*`` forms are allowed, False if they are not.
+    """
+    count = len(values)
+    # lengths[i] is the length of the shortest rendering of values[i:],
+    # which starts with items[i] and goes on at nexts[i]
+    lengths = [0] * (count + 1)
+    items = [None] * count
+    nexts = [count] * count
+    for i in range(count - 1, -1, -1):
+        best = None
+        step = None
+        for j in range(i + 1, count + 1):
+            if j - i == 2:
+                step = values[i + 1] - values[i]
+            elif j - i > 2 and values[j - 1] - values[j - 2] != step:
+                break
+            item = render_progression(values[i], values[j - 1], step, field,
+                                      star)
+            length = len(item)
+            if j < count:
+                length += 1 + lengths[j]
+            # longer items win ties, "1-3" reads better than "1,3"
+            if best is None or length <= best:
+                best = length
+                items[i] = item
+                nexts[i] = j
+        lengths[i] = best
+    parts = []
+    i = 0
+    while i < count:
+        parts.append(items[i])
+        i = nexts[i]
+    return ','.join(parts)
+
+
+# rendered fields by (bitset, time type, star), compact plans render the
+# same fields over and over
+RENDERED_FIELDS = {}
+MAX_RENDERED_FIELDS = 4096
+
+
+def render_field(mask, field, star=None):
+    """Render one bitset into the shortest equivalent cron field.
+
+    :param mask: the bitset.
+    :param field: one of :data:`FIELDS`.
+    :param star: None if the field may be rendered in any form, True if it
+                 must start with ``*``, False if it must not, this matters
+                 for the day of month and day of week fields.
+    """
+    key = (mask, field[0], star)
+    try:
+        return RENDERED_FIELDS[key]
+    except KeyError:
+        pass
+    if len(RENDERED_FIELDS) >= MAX_RENDERED_FIELDS:
+        RENDERED_FIELDS.clear()
+    best = RENDERED_FIELDS[key] = produce_field(mask, field, star)
+    return best
+
+
+def produce_field(mask, field, star=None):
+    """Render one bitset like :func:`render_field` without using the
+    rendered fields cache.
+    """
+    time_type, minimum, maximum, names = field
+    if time_type == WEEK:
+        maximum = 6
+        field = (time_type, minimum, maximum, names)
+    values = bits_to_list(mask)
+    best = None
+    if star is not True:
+        best = render_values(values, field, star)
+        if star is False:
+            return best
+    # start with one '*/n' that fits and render the rest
+    for step in range(1, maximum - minimum + 2):
+        progression = list(range(minimum, maximum + 1, step))
+        if not set(progression).issubset(values):
+            continue
+        item = '*' if step == 1 else '*/%d' % step
+        rest = sorted(set(values) - set(progression))
+        if rest:
+            item = item + ',' + render_values(rest, field, False)
+        if best is None or len(item) < len(best):
+            best = item
+    return best
+
+
+class CronSchedule(object):
+    """One compiled cron time.  Each of the five cron fields is kept as a
+    bitset, bit n is set when the field matches value n.
+
+    Day of month and day of week follow the usual cron rule: when both of
+    them are restricted (neither starts with ``*``) a day matches when
+    either field matches, otherwise both must match.
+
+    :param minutes: minute bitset.
+    :param hours: hour bitset.
+    :param days: day of month bitset.
+    :param months: month bitset.
+    :param weekdays: day of week bitset, Sunday is bit 0.
+    :param day_star: whether the day of month field starts with ``*``.
+    :param week_star: whether the day of week field starts with ``*``.
+    :param reboot: this is a ``@reboot`` schedule, it never fires on time.
+    """
+
+    def __init__(self, minutes, hours, days, months, weekdays,
+                 day_star=False, week_star=False, reboot=False):
+        self.minutes = minutes
+        self.hours = hours
+        self.days = days
+        self.months = months
+        # fold 7 into 0, both are Sunday
+        if weekdays & (1 << 7):
+            weekdays = (weekdays | 1) & ~(1 << 7)
+        self.weekdays = weekdays
+        self.day_star = day_star
+        self.week_star = week_star
+        self.reboot = reboot
+
+    @classmethod
+    def parse(cls, time):
+        """Compile cron time syntax, this can be five fields time or one of
+        the predefined ``@`` definitions.
+
+        :param time: the cron time syntax.
+        """
+        if time.startswith('@'):
+            definition = time[1:]
+            if definition == "reboot":
+                return cls(0, 0, 0, 0, 0, reboot=True)
+            if definition not in PREDEFINED_TIMES:
+                raise ParseError("Your cron time %s is invalid, unknown"
+                                 " predefined definition" % time)
+            time = PREDEFINED_TIMES[definition]
+        fields = time.split()
+        if len(fields) != 5:
+            raise ParseError("Your cron time %s is invalid, it should have"
+                             " exactly 5 fields" % time)
+        masks = [parse_field(value, field)
+                 for value, field in zip(fields, FIELDS)]
+        return cls(*masks, day_star=fields[2].startswith('*'),
+                   week_star=fields[4].startswith('*'))
+
+    def __eq__(self, other):
+        return isinstance(other, CronSchedule) and \
+            self.fields == other.fields
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.fields)
+
+    def __repr__(self):
+        return '<CronSchedule %s>' % ' '.join(
+            ','.join(map(str, bits_to_list(mask)))
+            for mask in self.fields[:5])
+
+    def render(self):
+        """Render this schedule into the shortest equivalent cron time
+        syntax, using ``a-b``, ``*/n`` and ``a-b/n`` forms.
+
+        .. versionadded:: 0.6
+        """
+        if self.reboot:
+            return '@reboot'
+        # Once one day field starts with '*' both day fields must match no
+        # matter how the other one is written.
+        if self.day_star:
+            day_star, week_star = True, None
+        elif self.week_star:
+            day_star, week_star = None, True
+        else:
+            day_star, week_star = False, False
+        return ' '.join([
+            render_field(self.minutes, FIELDS[0]),
+            render_field(self.hours, FIELDS[1]),
+            render_field(self.days, FIELDS[2], day_star),
+            render_field(self.months, FIELDS[3]),
+            render_field(self.weekdays, FIELDS[4], week_star),
+        ])
+
+    def merge(self, other):
+        """Merge two schedules differing in only one field into one schedule
+        firing at exactly the same times as both of them.  None is returned
+        if they can not be merged, that is when they differ in more than one
+        field, fire at the same time, or the day rule gets in the way.
+
+        .. versionadded:: 0.6
+
+        :param other: another :class:`CronSchedule`.
+        """
+        if self.reboot or other.reboot or \
+                self.fields[5:] != other.fields[5:]:
+            return None
+        masks, others = list(self.fields[:5]), other.fields[:5]
+        differing = [i for i in range(5) if masks[i] != others[i]]
+        if len(differing) != 1:
+            return None
+        index = differing[0]
+        if masks[index] & others[index] or not self.can_merge(index):
+            return None
+        masks[index] |= others[index]
+        return CronSchedule(*masks, day_star=self.day_star,
+                            week_star=self.week_star)
+
+    def can_merge(self, index):
+        """Tell whether schedules like this one differing only in the field
+        at index can be merged by combining that field.
+
+        .. versionadded:: 0.6
+        """
+        if self.reboot:
+            return False
+        # With both day fields restricted a day matches when either one
+        # does, runs matched by the other day field would be lost.  Fields
+        # starting with '*' can not take arbitrary values.
+        if index == 2:
+            return not self.day_star and self.week_star
+        if index == 4:
+            return not self.week_star and self.day_star
+        return True
+
+    @property
+    def fields(self):
+        return (self.minutes, self.hours, self.days, self.months,
+                self.weekdays, self.day_star, self.week_star, self.reboot)
+
+    def match_day(self, date):
+        """Tell whether the schedule fires on one date."""
+        if not self.months >> date.month & 1:
+            return False
+        day_match = self.days >> date.day & 1
+        week_match = self.weekdays >> cron_weekday(date) & 1
+        if self.day_star or self.week_star:
+            return bool(day_match and week_match)
+        return bool(day_match or week_match)
+
+    def match(self, time):
+        """Tell whether the schedule fires on the minute of one datetime."""
+        if self.reboot:
+            return False
+        return bool(self.minutes >> time.minute & 1 and
+                    self.hours >> time.hour & 1 and
+                    self.match_day(time))
+
+    def __contains__(self, time):
+        return self.match(time)
+
+    def next_day(self, date):
+        """Get the first day not before date in the same month that fires,
+        None if there is no such day.
+        """
+        last = days_in_month(date.year, date.month)
+        day_candidate = next_bit(self.days, date.day)
+        if day_candidate is not None and day_candidate > last:
+            day_candidate = None
+        offset = next_bit(self.weekdays | self.weekdays << 7,
+                          cron_weekday(date))
+        week_candidate = None
+        if offset is not None:
+            week_candidate = date.day + offset - cron_weekday(date)
+            if week_candidate > last:
+                week_candidate = None
+
+        if not (self.day_star or self.week_star):
+            candidates = [c for c in (day_candidate, week_candidate)
+                          if c is not None]
+            return min(candidates) if candidates else None
+        # Both fields need to match from here on
+        if self.days == FULL_DAYS:
+            return week_candidate
+        elif self.weekdays == FULL_WEEKDAYS:
+            return day_candidate
+        day = day_candidate
+        while day is not None and day <= last:
+            if self.match_day(date.replace(day=day)):
+                return day
+            day = next_bit(self.days, day + 1)
+        return None
+
+    def next_fire(self, after):
+        """Get the first time this schedule fires strictly after one
+        datetime, None if it never fires.
+
+        :param after: one :class:`datetime.datetime`.
+        """
+        if self.reboot or not (self.minutes and self.hours and self.months
+                               and (self.days or self.weekdays)):
+            return None
+        time = after.replace(second=0, microsecond=0) + ONE_MINUTE
+        last_year = time.year + MAX_YEARS_AHEAD
+        while time.year <= last_year:
+            month = next_bit(self.months, time.month)
+            if month is None:
+                time = time.replace(year=time.year + 1, month=1, day=1,
+                                    hour=0, minute=0)
+                continue
+            if month != time.month:
+                time = time.replace(month=month, day=1, hour=0, minute=0)
+            day = self.next_day(time.date())
+            if day is None:
+                if time.month == 12:
+                    time = time.replace(year=time.year + 1, month=1, day=1,
+                                        hour=0, minute=0)
+                else:
+                    time = time.replace(month=time.month + 1, day=1,
+                                        hour=0, minute=0)
+                continue
+            if day != time.day:
+                time = time.replace(day=day, hour=0, minute=0)
+            hour = next_bit(self.hours, time.hour)
+            if hour is None:
+                time = time.replace(hour=0, minute=0) + ONE_DAY
+                continue
+            if hour != time.hour:
+                time = time.replace(hour=hour, minute=0)
+            minute = next_bit(self.minutes, time.minute)
+            if minute is None:
+                time = time.replace(minute=0) + datetime.timedelta(hours=1)
+                continue
+            return time.replace(minute=minute)
+        return None
+
+    def iter_fires(self, start, end):
+        """Iterate over all the fire times in ``[start, end)``.
+
+        :param start: the start :class:`datetime.datetime`, included if the
+                      schedule fires on it.
+        :param end: the end :class:`datetime.datetime`, excluded.
+        """
+        if start.second or start.microsecond:
+            # the first minute fully inside the range
+            start = start.replace(second=0, microsecond=0) + ONE_MINUTE
+        time = self.next_fire(start - ONE_MINUTE)
+        while time is not None and time < end:
+            yield time
+            time = self.next_fire(time)
+
+
+FULL_DAYS = parse_field('*', FIELDS[2])
+FULL_WEEKDAYS = parse_field('*', FIELDS[4]) & ~(1 << 7) | 1
+
+
+def merge_schedules(schedules):
+    """Merge schedules with :meth:`CronSchedule.merge` until no more of
+    them can be merged.
+
+    .. versionadded:: 0.6
+
+    :param schedules: a list of :class:`CronSchedule` instances.
+    :return: a list of merged schedules, in the order of their first parts.
+    """
+    schedules = list(schedules)
+    changed = True
+    while changed:
+        changed = False
+        for index in range(5):
+            # schedules equal in every other field share one bucket, the
+            # field at index of disjoint ones is combined in one pass
+            buckets = {}
+            entries = []
+            for schedule in schedules:
+                if not schedule.can_merge(index):
+                    entries.append([schedule, None])
+                    continue
+                fields = schedule.fields
+                rest = fields[:index] + fields[index + 1:]
+                groups = buckets.setdefault(rest, [])
+                mask = fields[index]
+                for entry in groups:
+                    if not entry[1] & mask:
+                        entry[1] |= mask
+                        changed = True
+                        break
+                else:
+                    entry = [schedule, mask]
+                    groups.append(entry)
+                    entries.append(entry)
+            schedules = []
+            for schedule, mask in entries:
+                if mask is not None and mask != schedule.fields[index]:
+                    masks = list(schedule.fields[:5])
+                    masks[index] = mask
+                    schedule = CronSchedule(*masks,
+                                            day_star=schedule.day_star,
+                                            week_star=schedule.week_star)
+                schedules.append(schedule)
+    return schedules
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+    plan.crond
+    ~~~~~~~~~~
+
+    Cron directory output for Plan.  Every Plan object gets its own file in
+    one cron.d style directory like ``/etc/cron.d``, lines there carry the
+    user column, so plans are deployed independently of each other and of
+    the user crontabs.
+
+    :copyright: (c) 2014 by Shipeng Feng.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import os
+import re
+import errno
+import itertools
+
+from .exceptions import PlanError
+from .utils import atomic_write, iter_lines, same_lines
+
+
+# cron ignores files in cron.d with names containing other characters
+FILENAME_INVALID_RE = re.compile(r'[^A-Za-z0-9_-]')
+
+
+class CronDirectory(object):
+    """One cron.d style directory.
+
+    .. versionadded:: 0.6
+
+    :param directory: the directory, default to be ``/etc/cron.d``.
+    :param mode: the permission bits of written files, cron refuses files
+                 writable by group or others.
+    """
+
+    def __init__(self, directory='/etc/cron.d', mode=0o644):
+        self.directory = directory
+        self.mode = mode
+
+    def get_path(self, plan):
+        """Get the file path of one Plan object, characters not allowed in
+        cron.d file names are replaced with underscores.
+        """
+        return os.path.join(self.directory,
+                            FILENAME_INVALID_RE.sub('_', plan.name))
+
+    def iter_lines(self, plan):
+        """Iterate over the lines of the file of one Plan object, jobs run
+        as the plan user or the current user.
+        """
+        import getpass
+        user = str(plan.user or getpass.getuser())
+        yield plan.comment_begin
+        for variable in plan.environment_variables:
+            yield variable
+        for time, task in plan.iter_cron_entries():
+            yield ' '.join([time, user, task])
+        yield plan.comment_end
+
+    def read(self, plan):
+        """Get the file content of one Plan object, None if it does not
+        exist.
+        """
+        try:
+            with open(self.get_path(plan)) as f:
+                return f.read()
+        except (IOError, OSError) as e:
+            if e.errno == errno.ENOENT:
+                return None
+            raise PlanError("couldn't read cron.d file; %s" % e)
+
+    def write(self, plan):
+        """Write the file of one Plan object, the file is left alone if its
+        content is the same.
+
+        :return: True if the file was written, False otherwise.
+        """
+        content = self.read(plan)
+        if content is not None and same_lines(
+                iter_lines(content),
+                itertools.chain(self.iter_lines(plan), [''])):
+            return False
+        try:
+            atomic_write(self.get_path(plan), self.iter_lines(plan),
+                         self.mode)
+        except (IOError, OSError) as e:
+            raise PlanError("couldn't write cron.d file; %s" % e)
+        return True
+
+    def remove(self, plan):
+        """Remove the file of one Plan object.
+
+        :return: True if the file was removed, False if it did not exist.
+        """
+        try:
+            os.unlink(self.get_path(plan))
+        except OSError as e:
+            if e.errno == errno.ENOENT:
+                return False
+            raise PlanError("couldn't remove cron.d file; %s" % e)
+        return True
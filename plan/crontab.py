@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+    plan.crontab
+    ~~~~~~~~~~~~
+
+    Crontab cronfile index for Plan.  This finds all blocks generated by Plan
+    objects in one pass over the cronfile content, only comment lines are
+    looked at, so it stays fast on huge cronfiles.
+
+    :copyright: (c) 2014 by Shipeng Feng.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import collections
+
+from .exceptions import PlanError
+
+
+#: The comment lines around the block of one Plan object, see
+#: :attr:`Plan.comment_begin <plan.Plan.comment_begin>`.
+BEGIN_PREFIX = "# Begin Plan generated jobs for: "
+END_PREFIX = "# End Plan generated jobs for: "
+
+
+#: One block found by :class:`CrontabIndex`, start and end are the offsets of
+#: the block without its trailing newline, first_line and last_line are the
+#: zero based line numbers of its begin and end comments.
+Block = collections.namedtuple('Block', ['name', 'start', 'end',
+                                         'first_line', 'last_line'])
+
+
+class CrontabIndex(object):
+    """The index of comment lines inside one cronfile content.  The block of
+    one Plan object runs from the first begin comment to the last end comment
+    after it.
+
+    :param content: the cronfile content.
+    """
+
+    def __init__(self, content):
+        self.content = content
+        # comment line -> (start, end, line number) of its first occurrence
+        self.first = {}
+        # comment line -> (start, end, line number) of its last occurrence
+        self.last = {}
+        self.parse()
+
+    def parse(self):
+        content = self.content
+        start = 0 if content.startswith('#') else content.find('\n#')
+        lineno = 0
+        counted = 0
+        while start != -1:
+            if content[start] == '\n':
+                start += 1
+            end = content.find('\n', start)
+            if end == -1:
+                end = len(content)
+            lineno += content.count('\n', counted, start)
+            counted = start
+            comment = content[start:end]
+            occurrence = (start, end, lineno)
+            if comment not in self.first:
+                self.first[comment] = occurrence
+            self.last[comment] = occurrence
+            start = content.find('\n#', end)
+
+    def find(self, begin, end):
+        """Find the block between one begin comment and one end comment.
+
+        :param begin: the begin comment line.
+        :param end: the end comment line.
+        :return: one :class:`Block` or None if neither comment is present,
+                 the name of the block is None.
+        """
+        first = self.first.get(begin)
+        last = self.last.get(end)
+        if first and not last:
+            raise PlanError("Your crontab file is not ended, it contains "
+                            "'%s', but no '%s'" % (begin, end))
+        elif not first and last:
+            raise PlanError("Your crontab file has no begining, it contains "
+                            "'%s', but no '%s'" % (end, begin))
+        elif not first:
+            return None
+        if last[0] <= first[0]:
+            raise PlanError("Your crontab file is not ended, it contains "
+                            "'%s' before '%s'" % (end, begin))
+        return Block(None, first[0], last[1], first[2], last[2])
+
+    def get(self, name):
+        """Get the block of the Plan object with name, None if it is not
+        present.
+        """
+        block = self.find(BEGIN_PREFIX + name, END_PREFIX + name)
+        if block is not None:
+            block = block._replace(name=name)
+        return block
+
+    @property
+    def blocks(self):
+        """All blocks generated by Plan objects, ordered by their
+        positions.  Unended or unbegun blocks raise :class:`PlanError`.
+        """
+        blocks = []
+        for comment in self.first:
+            if comment.startswith(BEGIN_PREFIX):
+                blocks.append(self.get(comment[len(BEGIN_PREFIX):]))
+        for comment in self.last:
+            if comment.startswith(END_PREFIX) and \
+                    BEGIN_PREFIX + comment[len(END_PREFIX):] not in self.first:
+                self.get(comment[len(END_PREFIX):])
+        blocks.sort(key=lambda block: block.start)
+        return blocks
+
+    @property
+    def names(self):
+        """The names of all Plan objects present, ordered by the positions
+        of their blocks.
+        """
+        return [block.name for block in self.blocks]
+
+    @property
+    def regions(self):
+        """The (start, end) offsets of the content outside all blocks, the
+        content between two blocks is one region even if it is empty.
+        """
+        regions = []
+        position = 0
+        for block in self.blocks:
+            if block.start < position:
+                raise PlanError("The block of plan %s overlaps with another "
+                                "one" % block.name)
+            regions.append((position, block.start))
+            position = block.end
+        regions.append((position, len(self.content)))
+        return regions
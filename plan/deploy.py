@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+    plan.deploy
+    ~~~~~~~~~~~
+
+    Deployment for Plan.  This applies plans to the cronfiles of lots of
+    users at the same time with a bounded pool of threads, every user gets
+    one :class:`DeployResult` no matter what happens to the others.
+
+    :copyright: (c) 2014 by Shipeng Feng.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import time
+import threading
+
+from .core import Plan, PlanGroup
+from ._compat import PY2
+
+if PY2:
+    import Queue as queue
+else:
+    import queue
+
+
+class DeployResult(object):
+    """The result of deploying plans to one user.
+
+    :param user: the user.
+    :param run_type: the running type, write, update or clear.
+    """
+
+    def __init__(self, user, run_type):
+        self.user = user
+        self.run_type = run_type
+        #: Whether the cronfile was changed, False if it was up to date.
+        self.changed = False
+        #: The error message if the deployment failed.
+        self.error = None
+        #: How many seconds the deployment took.
+        self.seconds = 0
+
+    @property
+    def ok(self):
+        """Whether the deployment succeeded."""
+        return self.error is None
+
+    def __repr__(self):
+        if self.ok:
+            state = 'changed' if self.changed else 'unchanged'
+        else:
+            state = 'failed'
+        return '<DeployResult %s %s %.3fs>' % (self.user, state, self.seconds)
+
+
+def deploy_user(user, plans, run_type='update'):
+    """Deploy plans to the cronfile of one user, the cronfile is read and
+    written at most once.  Errors are recorded in the result instead of
+    being raised.
+
+    :param user: the user.
+    :param plans: a list of :class:`~plan.Plan` instances.
+    :param run_type: write, update or clear.
+    :return: one :class:`DeployResult` instance.
+    """
+    result = DeployResult(user, run_type)
+    start = time.time()
+    try:
+        group = PlanGroup(plans, user=user)
+        if run_type == 'write':
+            group.write_crontab()
+            result.changed = True
+        elif run_type in ('update', 'clear'):
+            result.changed = group.update_crontab(run_type)
+        else:
+            raise ValueError("Illegal run type %s" % run_type)
+    except Exception as e:
+        result.error = '%s: %s' % (e.__class__.__name__, e)
+    result.seconds = time.time() - start
+    return result
+
+
+def deploy(targets, run_type='update', workers=8):
+    """Deploy plans to the cronfiles of lots of users concurrently.
+
+    :param targets: a dictionary mapping every user to one
+                    :class:`~plan.Plan` instance or a list of them.
+    :param run_type: write, update or clear, default to be update.
+    :param workers: the most users deployed at the same time.
+    :return: a list of :class:`DeployResult` instances ordered by user.
+    """
+    tasks = queue.Queue()
+    rendered = set()
+    for user in sorted(targets, key=str):
+        plans = targets[user]
+        if isinstance(plans, Plan):
+            plans = [plans]
+        # render once here, so the threads only read cached lines
+        for plan in plans:
+            if id(plan) not in rendered and run_type != 'clear':
+                rendered.add(id(plan))
+                for line in plan.iter_cron_lines():
+                    pass
+        tasks.put((user, plans))
+
+    results = []
+    lock = threading.Lock()
+
+    def work():
+        while True:
+            try:
+                user, plans = tasks.get_nowait()
+            except queue.Empty:
+                return
+            result = deploy_user(user, plans, run_type)
+            with lock:
+                results.append(result)
+
+    threads = [threading.Thread(target=work)
+               for i in range(max(1, min(workers, tasks.qsize())))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.sort(key=lambda result: str(result.user))
+    return results
+
+
+def load_plans(path):
+    """Load all :class:`~plan.Plan` instances defined at the top level of
+    one schedule file, the ``if __name__ == "__main__"`` part is not run.
+
+    :param path: the filepath of the schedule file.
+    """
+    import runpy
+    namespace = runpy.run_path(path, run_name='__plan_deploy__')
+    plans = []
+    for value in namespace.values():
+        if isinstance(value, Plan) and \
+                not any(value is plan for plan in plans):
+            plans.append(value)
+    plans.sort(key=lambda plan: plan.name)
+    return plans
@@ -0,0 +1,529 @@
+# -*- coding: utf-8 -*-
+"""
+    plan.engine
+    ~~~~~~~~~~~
+
+    In-process scheduler engine for Plan.  This runs the jobs of Plan objects
+    from one asyncio event loop instead of cron, the next fire time of every
+    job sits in one heap, so the loop sleeps until the earliest one no matter
+    how many jobs there are.  Jobs running every few seconds, which cron
+    can not run, sit in one :class:`~plan.wheel.TimingWheel` ticking once a
+    second instead.
+
+    The engine needs Python 3.5 or later.
+
+    :copyright: (c) 2014 by Shipeng Feng.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import os
+import sys
+import heapq
+import signal
+import asyncio
+import datetime
+import itertools
+import threading
+import traceback
+import subprocess
+
+from .utils import Echo
+from .job import FunctionJob
+from .wheel import TimingWheel
+from .output import parse_output
+
+
+#: The longest time the engine sleeps at once, so it notices changes of the
+#: system clock.
+MAX_SLEEP = 60
+
+
+def next_second_delay(second, frequency):
+    """Get how many seconds after second of one minute one job running every
+    frequency seconds fires next, jobs fire on the seconds that are
+    multiples of frequency.
+    """
+    following = (second // frequency + 1) * frequency
+    return min(following, 60) - second
+
+
+def redirect_output(output):
+    """Redirect stdout and stderr of the current process the way one output
+    redirection of one job does.
+    """
+    settings = parse_output(output)
+    if settings is None:
+        raise ValueError("Output %s can not be redirected without a shell"
+                         % output)
+    for key, value in settings:
+        fd = 1 if key == 'StandardOutput' else 2
+        if value == 'null':
+            target = os.open(os.devnull, os.O_WRONLY)
+        else:
+            target = os.open(value[len('append:'):],
+                             os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        os.dup2(target, fd)
+        os.close(target)
+
+
+def string_environment(variables):
+    """Get the environment variables with a value as strings, None values
+    are skipped like they are in the crontab.
+    """
+    return dict((str(variable), str(value))
+                for variable, value in (variables or {}).items()
+                if value is not None)
+
+
+def fork_call(function, path, environment, output):
+    """Call one function in one forked child process.
+
+    :return: the process id of the child.
+    """
+    pid = os.fork()
+    if pid:
+        return pid
+    status = 1
+    try:
+        # signals of the child must not reach the event loop of the parent
+        signal.set_wakeup_fd(-1)
+        for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGUSR1):
+            signal.signal(signum, signal.SIG_DFL)
+        if path:
+            os.chdir(path)
+        os.environ.update(environment)
+        redirect_output(output)
+        function()
+        status = 0
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(status)
+
+
+def thread_call(loop, function):
+    """Call one function in one new daemon thread, so one hung function
+    never keeps the process from exiting.
+
+    :return: one asyncio future of the result.
+    """
+    future = loop.create_future()
+
+    def resolve(result, error):
+        if future.done():
+            return
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+
+    def target():
+        result, error = None, None
+        try:
+            result = function()
+        except Exception as e:
+            error = e
+        try:
+            loop.call_soon_threadsafe(resolve, result, error)
+        except RuntimeError:
+            # the loop is closed, the run was abandoned
+            pass
+
+    thread = threading.Thread(target=target)
+    thread.daemon = True
+    thread.start()
+    return future
+
+
+def wait_status(pid):
+    """Wait for one child process, return its exit status like
+    :attr:`subprocess.Popen.returncode`.
+    """
+    status = os.waitpid(pid, 0)[1]
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+class Run(object):
+    """One run of one job started by :class:`Engine`.
+
+    :param plan: the :class:`~plan.Plan` instance of the job.
+    :param job: the job.
+    :param scheduled: the :class:`datetime.datetime` the run was due.
+    """
+
+    def __init__(self, plan, job, scheduled):
+        self.plan = plan
+        self.job = job
+        self.scheduled = scheduled
+        #: The shell command, the rendered task part of the cron line.
+        self.command = job.task_in_cron_syntax
+        #: The name echoed, the task for function jobs, the command
+        #: otherwise.
+        self.name = self.command
+        if isinstance(job, FunctionJob):
+            self.name = job.task
+        #: When the process was started, None if the run is still waiting.
+        self.started = None
+        #: When the process exited.
+        self.finished = None
+        #: The process id.
+        self.pid = None
+        #: The exit status of the process.
+        self.returncode = None
+        #: The error message if the process could not be started.
+        self.error = None
+        self.process = None
+
+    @property
+    def ok(self):
+        """Whether the run succeeded."""
+        return self.error is None and self.returncode == 0
+
+    @property
+    def seconds(self):
+        """How many seconds the process ran so far."""
+        if self.started is None:
+            return 0
+        end = self.finished or datetime.datetime.now()
+        return (end - self.started).total_seconds()
+
+    def terminate(self):
+        """Send SIGTERM to the process if it is still running."""
+        self.signal(signal.SIGTERM)
+
+    def kill(self):
+        """Send SIGKILL to the process if it is still running."""
+        self.signal(signal.SIGKILL)
+
+    def signal(self, signum):
+        """Send one signal to the process group of the shell, so the
+        processes started by the task get it too, or to the forked child
+        of one function.
+        """
+        if self.pid is None or self.finished is not None:
+            return
+        try:
+            if self.process is not None:
+                if self.process.returncode is None:
+                    os.killpg(self.pid, signum)
+            else:
+                os.kill(self.pid, signum)
+        except OSError:
+            pass
+
+    def __repr__(self):
+        return '<Run %s %r>' % (self.plan.name, self.job.task)
+
+
+class Engine(object):
+    """The scheduler running the jobs of Plan objects without cron.  Jobs
+    fire on the same times cron would run them, every run starts the task
+    part of the cron line with ``/bin/sh -c``, so path, environment and
+    output work like they do in the crontab.  The environment variables of
+    every Plan object are set for its jobs.  Runs missed while the engine
+    was busy or asleep are skipped like cron does, ``@reboot`` jobs run once
+    when the engine starts.  Jobs with second related every values like
+    ``"15.second"`` are run too, see
+    :attr:`~plan.Job.second_frequency`.  The functions of
+    :class:`~plan.job.FunctionJob` jobs are called inside the engine
+    process instead of starting one interpreter.
+
+    Jobs run as the user running the engine, the user of Plan objects is not
+    looked at.
+
+    .. versionadded:: 0.6
+
+    :param plans: a list of :class:`~plan.Plan` instances.
+    :param concurrency: the most runs at the same time, runs over the limit
+                        wait for one to finish, default to be unlimited.
+    :param grace: how many seconds running processes get to exit after the
+                  engine was stopped, then they are terminated, and killed
+                  after another grace period.  Functions called in threads
+                  can not be stopped, they are abandoned then.
+    :param clock: the function giving the current local
+                  :class:`datetime.datetime`, default to be
+                  :meth:`datetime.datetime.now`.
+    :param echo: echo every start and finish of runs.
+    """
+
+    def __init__(self, plans, concurrency=None, grace=30, clock=None,
+                 echo=False):
+        self.plans = list(plans)
+        self.concurrency = concurrency
+        self.grace = grace
+        self.clock = clock or datetime.datetime.now
+        self.echo = echo
+        #: The heap of (fire time, sequence, plan, job) tuples.
+        self.heap = []
+        #: The :class:`~plan.wheel.TimingWheel` of jobs running every few
+        #: seconds, one tick is one second after `wheel_start`.
+        self.wheel = TimingWheel()
+        self.wheel_start = None
+        #: The runs whose processes are running.
+        self.running = []
+        #: How many runs were started, finished and failed.
+        self.started = 0
+        self.finished = 0
+        self.failed = 0
+        #: The runs of functions called in threads still running when the
+        #: engine gave up waiting for them.
+        self.abandoned = []
+        self.stopping = False
+        self.counter = itertools.count()
+        self.tasks = set()
+        self.wakeup = None
+        self.semaphore = None
+
+    def iter_jobs(self):
+        """Iterate over the (plan, job) tuples of all plans."""
+        for plan in self.plans:
+            if plan.spread:
+                plan.spread_jobs()
+            for job in plan.jobs:
+                yield plan, job
+
+    def push(self, fire, plan, job):
+        heapq.heappush(self.heap, (fire, next(self.counter), plan, job))
+
+    def schedule(self, now):
+        """Fill the heap with the first fire time of every job after now.
+
+        :param now: the current :class:`datetime.datetime`.
+        """
+        self.heap = []
+        self.wheel = TimingWheel()
+        self.wheel_start = now.replace(microsecond=0)
+        for plan, job in self.iter_jobs():
+            frequency = job.second_frequency
+            if frequency:
+                self.wheel.add(next_second_delay(self.wheel_start.second,
+                                                 frequency), (plan, job))
+                continue
+            schedule = job.schedule
+            if schedule.reboot:
+                self.push(now, plan, job)
+                continue
+            fire = schedule.next_fire(now)
+            if fire is not None:
+                self.push(fire, plan, job)
+
+    @property
+    def next_fire(self):
+        """The earliest time the engine has to wake up, the next tick of the
+        wheel if it has timers, None if no job will fire.
+        """
+        fires = []
+        if self.heap:
+            fires.append(self.heap[0][0])
+        if self.wheel:
+            fires.append(self.wheel_start + datetime.timedelta(
+                seconds=self.wheel.next_time))
+        if fires:
+            return min(fires)
+
+    def pop_due(self, now):
+        """Pop the jobs due at now and push their next fire times.
+
+        :param now: the current :class:`datetime.datetime`.
+        :return: a list of :class:`Run` instances.
+        """
+        runs = []
+        heap = self.heap
+        while heap and heap[0][0] <= now:
+            fire, _, plan, job = heapq.heappop(heap)
+            runs.append(Run(plan, job, fire))
+            schedule = job.schedule
+            if schedule.reboot:
+                continue
+            fire = schedule.next_fire(max(fire, now))
+            if fire is not None:
+                self.push(fire, plan, job)
+        if self.wheel:
+            wheel = self.wheel
+            timers = wheel.advance_to(
+                (now - self.wheel_start).total_seconds())
+            second = (self.wheel_start + datetime.timedelta(
+                seconds=wheel.current)).second
+            for timer in timers:
+                plan, job = timer.item
+                runs.append(Run(plan, job, self.wheel_start +
+                                datetime.timedelta(seconds=timer.expires)))
+                # ticks missed while catching up are skipped
+                wheel.add(next_second_delay(second, job.second_frequency),
+                          timer.item)
+        return runs
+
+    async def serve(self):
+        """Run jobs until :meth:`stop` is called, then wait for the running
+        processes.
+        """
+        self.stopping = False
+        self.wakeup = asyncio.Event()
+        if self.concurrency:
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.schedule(self.clock())
+        while not self.stopping:
+            for run in self.pop_due(self.clock()):
+                self.launch(run)
+            timeout = MAX_SLEEP
+            if self.next_fire is not None:
+                seconds = (self.next_fire - self.clock()).total_seconds()
+                timeout = min(max(seconds, 0), MAX_SLEEP)
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        await self.shutdown()
+
+    def launch(self, run):
+        task = asyncio.ensure_future(self.execute(run))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def execute(self, run):
+        """Run one job, waiting for a free slot first if concurrency is
+        limited.  Runs still waiting when the engine stops are dropped.
+        """
+        if self.semaphore is not None:
+            await self.semaphore.acquire()
+        try:
+            if not self.stopping:
+                await self.spawn(run)
+        finally:
+            if self.semaphore is not None:
+                self.semaphore.release()
+
+    async def spawn(self, run):
+        run.started = self.clock()
+        self.running.append(run)
+        self.started += 1
+        if self.echo:
+            Echo.message("run %s" % run.name)
+        try:
+            if isinstance(run.job, FunctionJob):
+                await self.call(run)
+            else:
+                environment = dict(os.environ)
+                environment.update(string_environment(run.plan.envs))
+                run.process = await asyncio.create_subprocess_exec(
+                    '/bin/sh', '-c', run.command, stdin=subprocess.DEVNULL,
+                    env=environment, start_new_session=True)
+                run.pid = run.process.pid
+                run.returncode = await run.process.wait()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            run.error = '%s: %s' % (e.__class__.__name__, e)
+        finally:
+            run.finished = self.clock()
+            self.running.remove(run)
+        self.finished += 1
+        if not run.ok:
+            self.failed += 1
+        if self.echo:
+            if run.ok:
+                Echo.done("%s in %.2fs" % (run.name, run.seconds))
+            else:
+                Echo.fail("%s exited with %s" % (
+                    run.name, run.error or run.returncode))
+
+    async def call(self, run):
+        """Call the function of one function job inside this process, in
+        one thread or in one forked child depending on its isolation.
+        """
+        job = run.job
+        loop = asyncio.get_event_loop()
+        try:
+            function = job.load()
+            if job.isolation == 'fork':
+                environment = string_environment(run.plan.envs)
+                environment.update(string_environment(job.environment))
+                run.pid = fork_call(function, job.path, environment,
+                                    job.output)
+                run.returncode = await loop.run_in_executor(
+                    None, wait_status, run.pid)
+            else:
+                await thread_call(loop, function)
+                run.returncode = 0
+        except Exception as e:
+            run.returncode = 1
+            run.error = '%s: %s' % (e.__class__.__name__, e)
+
+    async def shutdown(self):
+        """Wait `grace` seconds for the running processes, then terminate
+        them, and kill them after another `grace` seconds.  Runs still going
+        after that, which are functions called in threads, are abandoned.
+        """
+        if not self.tasks:
+            return
+        done, pending = await asyncio.wait(list(self.tasks),
+                                           timeout=self.grace)
+        if not pending:
+            return
+        for run in list(self.running):
+            run.terminate()
+        done, pending = await asyncio.wait(pending, timeout=self.grace)
+        if not pending:
+            return
+        for run in list(self.running):
+            run.kill()
+        if any(run.pid is not None for run in self.running):
+            done, pending = await asyncio.wait(pending, timeout=self.grace)
+        for run in list(self.running):
+            run.error = 'abandoned'
+            self.abandoned.append(run)
+            if self.echo:
+                Echo.fail("%s abandoned after %.0fs" % (run.name,
+                                                        run.seconds))
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending)
+
+    def stop(self):
+        """Stop starting new runs, :meth:`serve` returns once the running
+        processes exited.
+        """
+        self.stopping = True
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    def echo_status(self):
+        """Echo the running processes and the run counts."""
+        for run in self.running:
+            Echo.message("running %d for %.0fs: %s" % (run.pid or 0,
+                                                       run.seconds,
+                                                       run.name))
+        Echo.message("%d running, %d started, %d finished, %d failed, "
+                     "%d abandoned" % (len(self.running), self.started,
+                                       self.finished, self.failed,
+                                       len(self.abandoned)))
+        if self.wheel:
+            Echo.message("%d timers, tick lag %.3fs, mean %.3fs, max %.3fs" %
+                         (len(self.wheel), self.wheel.lag,
+                          self.wheel.mean_lag, self.wheel.max_lag))
+
+    def run(self):
+        """Run :meth:`serve` in one new event loop until SIGINT or SIGTERM
+        is received, SIGUSR1 echoes the status.
+        """
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        signals = (signal.SIGINT, signal.SIGTERM)
+        for signum in signals:
+            loop.add_signal_handler(signum, self.stop)
+        loop.add_signal_handler(signal.SIGUSR1, self.echo_status)
+        try:
+            loop.run_until_complete(self.serve())
+        finally:
+            for signum in signals + (signal.SIGUSR1,):
+                loop.remove_signal_handler(signum)
+            asyncio.set_event_loop(None)
+            loop.close()
@@ -12,13 +12,25 @@ from ._compat import text_type, PY2
 
 
 class BaseError(Exception):
-    """Baseclass for all Plan errors."""
+    """Baseclass for all Plan errors.
+
+    .. versionchanged:: 0.6
+       The `field` parameter was added.
+
+    :param message: the error message.
+    :param field: the job parameter that is wrong, like every or at.
+    """
+
+    #: The job parameter that is wrong, None if unknown.
+    field = None
 
     if PY2:
-        def __init__(self, message=None):
+        def __init__(self, message=None, field=None):
             if message is not None:
                 message = text_type(message).encode('utf-8')
             Exception.__init__(self, message)
+            if field is not None:
+                self.field = field
 
         @property
         def message(self):
@@ -30,8 +42,10 @@ class BaseError(Exception):
         def __unicode__(self):
             return self.message or u''
     else:
-        def __init__(self, message=None):
+        def __init__(self, message=None, field=None):
             Exception.__init__(self, message)
+            if field is not None:
+                self.field = field
 
         @property
         def message(self):
@@ -9,16 +9,19 @@
     :license: BSD, see LICENSE for more details.
 """
 
+import os
 import sys
 import re
 import collections
 
 from .output import Output
+from .cost import Cost
 from .exceptions import ParseError, ValidationError
-from ._compat import iteritems
+from ._compat import iteritems, intern, string_types, shell_quote
 
 
 # Time types
+SECOND = "second"
 MINUTE = "minute"
 HOUR = "hour"
 DAY = "day of month"
@@ -79,7 +82,10 @@ def get_frequency(every):
 
     :param every: One every type value.
     """
-    return int(every[:every.find('.')])
+    try:
+        return int(every[:every.find('.')])
+    except ValueError:
+        raise ParseError("Your every value %s is invalid" % every, 'every')
 
 
 def get_moment(at):
@@ -90,7 +96,191 @@ def get_moment(at):
 
     :param at: One at type value.
     """
-    return int(at[at.find('.') + 1:])
+    try:
+        return int(at[at.find('.') + 1:])
+    except ValueError:
+        raise ParseError("Your at value %s is invalid" % at, 'at')
+
+
+def function_task(function):
+    """Get the ``module:name`` task of one function.  Functions defined in
+    one file that is not imported as a module, like the schedule file, get
+    ``/path/to/file.py:name`` instead.
+
+    :param function: one function defined at the top level of one module or
+                     one ``module:name`` string.
+    """
+    if isinstance(function, string_types):
+        return function
+    name = getattr(function, '__qualname__', function.__name__)
+    if '<' in name:
+        raise ValueError("Function %s can not be imported, define it at the "
+                         "top level of one module" % name)
+    module = function.__module__
+    if module == '__main__' or module not in sys.modules:
+        module = os.path.abspath(function.__globals__['__file__'])
+        if module.endswith('.pyc'):
+            module = module[:-1]
+    return '%s:%s' % (module, name)
+
+
+def load_function(task):
+    """Import the function of one ``module:name`` task, see
+    :func:`function_task`.
+    """
+    module, name = task.split(':', 1)
+    names = name.split('.')
+    if module.endswith('.py'):
+        import runpy
+        namespace = runpy.run_path(module, run_name='__plan_function__')
+        function = namespace[names.pop(0)]
+    else:
+        import importlib
+        function = importlib.import_module(module)
+    for name in names:
+        function = getattr(function, name)
+    return function
+
+
+def call_function(task):
+    """Import and call the function of one ``module:name`` task, this is
+    what the cron line of :class:`FunctionJob` runs.
+    """
+    return load_function(task)()
+
+
+# The moments used when the at value does not set them
+DEFAULT_MOMENTS = {MINUTE: '0', HOUR: '0'}
+
+# Put in place of the default moments in cached cron times, so jobs with
+# different default moments share one parse result
+MOMENT_PLACEHOLDERS = {MINUTE: '{minute}', HOUR: '{hour}'}
+
+# Tells unset attributes apart from None
+_missing = object()
+
+# Equal environments and costs shared by jobs, the tables are emptied when
+# they reach MAX_INTERNED entries, so long running processes loading lots
+# of plans do not keep every value ever seen
+INTERNED_ENVIRONMENTS = {}
+INTERNED_COSTS = {}
+MAX_INTERNED = 4096
+
+
+def intern_string(value):
+    """Get the shared copy of one string, other values are returned as they
+    are.
+    """
+    if isinstance(value, str):
+        return intern(value)
+    return value
+
+
+def intern_value(table, key, value):
+    """Get the shared value of key from one intern table, value is added
+    if there is none yet.
+    """
+    try:
+        return table[key]
+    except KeyError:
+        if len(table) >= MAX_INTERNED:
+            table.clear()
+        table[key] = value
+        return value
+
+
+def intern_environment(environment):
+    """Get the shared copy of one environment dictionary, jobs with equal
+    environments share one copy, so do not modify it in place.  The
+    dictionary given is never shared, changing it later does not change
+    any job.
+    """
+    if not environment:
+        return environment
+    try:
+        key = tuple(sorted(iteritems(environment)))
+        shared = INTERNED_ENVIRONMENTS.get(key)
+    except TypeError:
+        return dict(environment)
+    if shared is None:
+        shared = intern_value(INTERNED_ENVIRONMENTS, key, dict(environment))
+    return shared
+
+
+def intern_cost(cost):
+    """Get the shared copy of one :class:`~plan.cost.Cost`."""
+    return intern_value(INTERNED_COSTS, cost, cost)
+
+
+def normalize_at(at):
+    """Normalize one at value so that equivalent at values share the same
+    parse result, multiple spaces in a row are treated as one.
+
+    :param at: One at value.
+    """
+    if not at:
+        return None
+    return ' '.join(at.split())
+
+
+class ParseCache(object):
+    """Bounded cache for every and at parse results.  It is shared by all the
+    jobs, so plans with lots of jobs only parse each distinct every and at
+    combination once.  Parse errors are cached too, and raised again on every
+    lookup.
+
+    .. versionadded:: 0.6
+
+    :param maxsize: how many parse results we keep at most, the least
+                    recently used one is dropped first.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.results = collections.OrderedDict()
+
+    def get(self, key, parse):
+        """Get the parse result for key, call parse to produce it if it is
+        not cached yet.
+
+        :param key: the hashable cache key.
+        :param parse: the function used to produce the parse result.
+        """
+        try:
+            result = self.results.pop(key)
+        except KeyError:
+            self.misses += 1
+            try:
+                result = (parse(), None)
+            except (ParseError, ValidationError) as e:
+                result = (None, (e.__class__, e.message, e.field))
+            if len(self.results) >= self.maxsize:
+                self.results.popitem(last=False)
+        else:
+            self.hits += 1
+        self.results[key] = result
+        value, error = result
+        if error is not None:
+            error_class, message, field = error
+            raise error_class(message, field)
+        return value
+
+    def clear(self):
+        """Drop all cached results and reset the counters."""
+        self.results.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def info(self):
+        """Return a dictionary of hits, misses, size and maxsize."""
+        return dict(hits=self.hits, misses=self.misses,
+                    size=len(self.results), maxsize=self.maxsize)
+
+
+#: The parse cache shared by all jobs.
+parse_cache = ParseCache()
 
 
 class Job(object):
@@ -103,16 +293,57 @@ class Job(object):
                  default to be current working directory.
     :param environment: the environment you want to run the task under.
     :param output: the output redirection for the task.
+    :param cost: the expected cost of one run, see :class:`~plan.cost.Cost`.
+    :param window: the time window like ``"01:00-05:00"`` the job may be
+                   placed in by :meth:`Plan.place`, runs are placed to end
+                   inside it when they fit.
+
+    Jobs keep their attributes in slots and share equal strings,
+    environments and costs with other jobs, so plans with lots of jobs stay
+    small.  `default_moments` holds the moments used when the at value does
+    not set them, Plan may assign per job moments there to spread jobs out.
+
+    .. versionchanged:: 0.6
+       The `cost` and `window` parameters were added.
     """
 
+    __slots__ = ('task', 'every', 'at', 'path', 'environment', 'output',
+                 'cost', 'window', 'default_moments', '_task_cron', '_cron')
+
     def __init__(self, task, every, at=None, path=None,
-                 environment=None, output=None):
-        self.task = task
-        self.every = every
-        self.at = at
-        self.path = path
-        self.environment = environment
-        self.output = str(Output(output))
+                 environment=None, output=None, cost=None, window=None):
+        # the rendered line caches are empty, skip the check in __setattr__
+        set_slot = object.__setattr__
+        set_slot(self, 'task', intern_string(task))
+        set_slot(self, 'every', intern_string(every))
+        set_slot(self, 'at', intern_string(at))
+        set_slot(self, 'path', intern_string(path))
+        set_slot(self, 'environment', intern_environment(environment))
+        set_slot(self, 'output', intern_string(str(Output(output))))
+        set_slot(self, 'cost', intern_cost(Cost(cost)))
+        set_slot(self, 'window', intern_string(window))
+        set_slot(self, 'default_moments', DEFAULT_MOMENTS)
+        set_slot(self, '_task_cron', None)
+        set_slot(self, '_cron', None)
+
+    def __setattr__(self, name, value):
+        # subclasses may assign attributes before calling Job.__init__
+        if (getattr(self, '_cron', None) is not None or
+                getattr(self, '_task_cron', None) is not None) and \
+                name[0] != '_' and getattr(self, name, _missing) != value:
+            self.invalidate()
+        object.__setattr__(self, name, value)
+
+    def invalidate(self):
+        """Drop the rendered cron line of this job.  This is done whenever
+        one attribute is assigned a different value, you only need to call
+        it yourself after modifying one attribute like `environment` in
+        place.
+
+        .. versionadded:: 0.6
+        """
+        object.__setattr__(self, '_task_cron', None)
+        object.__setattr__(self, '_cron', None)
 
     @property
     def env(self):
@@ -206,7 +437,12 @@ class Job(object):
         """
         every = self.every
 
-        if '.minute' in every:
+        if '.second' in every:
+            every_type, frequency = SECOND, get_frequency(every)
+            if frequency not in range(1, 61):
+                raise ParseError("Your every value %s is invalid, out of"
+                                 " second range[1-60]" % every)
+        elif '.minute' in every:
             every_type, frequency = MINUTE, get_frequency(every)
             if frequency not in range(1, 61):
                 raise ParseError("Your every value %s is invalid, out of"
@@ -233,8 +469,6 @@ class Job(object):
             if frequency not in range(1, 2):
                 raise ParseError("Your every value %s is invalid, out of"
                                  " year range[1]" % every)
-            # Just handle months internally
-            self.every = "12.months"
         elif is_week(every):
             every_type = WEEK
         else:
@@ -270,7 +504,7 @@ class Job(object):
         if not self.at:
             return pairs
 
-        processed_at = self.preprocess_at(self.at)
+        processed_at = self.preprocess_at(normalize_at(self.at))
         ats = processed_at.split(' ')
         at_map = collections.defaultdict(list)
 
@@ -316,7 +550,7 @@ class Job(object):
 
         every can be::
 
-            [1-60].minute [1-24].hour [1-31].day
+            [1-60].second [1-60].minute [1-24].hour [1-31].day
             [1-12].month [1].year
             jan feb mar apr may jun jul aug sep oct nov dec
             sun mon tue wed thu fri sat weekday weekend
@@ -325,7 +559,7 @@ class Job(object):
 
         at::
 
-            when every is minute, can not be set
+            when every is second or minute, can not be set
             when every is hour, can be minute.[0-59]
             when every is day of month, can be minute.[0-59], hour.[0-23]
             when every is month, can be day.[1-31], day of week,
@@ -334,37 +568,55 @@ class Job(object):
 
             at can also be multiple at values seperated by one space.
         """
-        every_type, every = self.parse_every(), self.every
-        ats = self.parse_at()
-        if every_type == MINUTE:
+        try:
+            every_type, every = self.parse_every(), self.every
+        except ParseError as e:
+            e.field = 'every'
+            raise
+        if '.year' in every:
+            # Just handle months internally
+            every = "12.months"
+        try:
+            ats = self.parse_at()
+        except ParseError as e:
+            e.field = 'at'
+            raise
+        if every_type in (SECOND, MINUTE):
             if ats:
                 raise ValidationError("at can not be set when every is"
-                                      " minute related")
+                                      " %s related" % every_type,
+                                      field='at')
         elif every_type == HOUR:
             for at_type in ats:
                 if at_type not in (MINUTE):
                     raise ValidationError("%s can not be set when every is"
-                                          " hour related" % at_type)
+                                          " hour related" % at_type,
+                                          field='at')
         elif every_type == DAY:
             for at_type in ats:
                 if at_type not in (MINUTE, HOUR):
                     raise ValidationError("%s can not be set when every is"
-                                          " month day related" % at_type)
+                                          " month day related" % at_type,
+                                          field='at')
         elif every_type == MONTH:
             for at_type in ats:
                 if at_type not in (MINUTE, HOUR, DAY, WEEK):
                     raise ValidationError("%s can not be set when every is"
-                                          " month related" % at_type)
+                                          " month related" % at_type,
+                                          field='at')
         elif every_type == WEEK:
             for at_type in ats:
                 if at_type not in (MINUTE, HOUR):
                     raise ValidationError("%s can not be set when every is"
-                                          " week day related" % at_type)
+                                          " week day related" % at_type,
+                                          field='at')
 
         return every_type, every, ats
 
-    def parse_time(self):
-        """Parse every and at into cron time syntax::
+    def parse_time(self, moments=None):
+        """Parse every and at into cron time syntax, `moments` are used for
+        the minute and hour not set by at, default to be
+        :attr:`default_moments`::
 
             # * * * * *  command to execute
             # ┬ ┬ ┬ ┬ ┬
@@ -378,36 +630,52 @@ class Job(object):
 
         """
         every_type, every, ats = self.validate_time()
+        if every_type == SECOND:
+            raise ValidationError("Your every value %s can not be written "
+                                  "into cron, which runs jobs once a minute "
+                                  "at most, serve the plan instead" % every,
+                                  field='every')
         time = ['*'] * 5
+        if moments is None:
+            moments = self.default_moments
+        minute = moments.get(MINUTE, '0')
+        hour = moments.get(HOUR, '0')
 
         if every_type == MINUTE:
             frequency = get_frequency(every)
             time[0] = self.produce_frequency_time(frequency, 59)
         elif every_type == HOUR:
             frequency = get_frequency(every)
-            time[0] = ats.get(MINUTE, '0')
+            time[0] = ats.get(MINUTE, minute)
             time[1] = self.produce_frequency_time(frequency, 23)
         elif every_type == DAY:
             frequency = get_frequency(every)
-            time[0] = ats.get(MINUTE, '0')
-            time[1] = ats.get(HOUR, '0')
+            time[0] = ats.get(MINUTE, minute)
+            time[1] = ats.get(HOUR, hour)
             time[2] = self.produce_frequency_time(frequency, 31, 1)
         elif every_type == MONTH:
-            time[0] = ats.get(MINUTE, '0')
-            time[1] = ats.get(HOUR, '0')
+            time[0] = ats.get(MINUTE, minute)
+            time[1] = ats.get(HOUR, hour)
             time[2] = ats.get(DAY, '1')
             time[3] = self.parse_month(every)
             time[4] = ats.get(WEEK, '*')
         else:
-            time[0] = ats.get(MINUTE, '0')
-            time[1] = ats.get(HOUR, '0')
+            time[0] = ats.get(MINUTE, minute)
+            time[1] = ats.get(HOUR, hour)
             time[4] = self.parse_week(every)
 
         return ' '.join(time)
 
     @property
     def task_in_cron_syntax(self):
-        """Cron content task part.
+        """Cron content task part.  The result is kept until the job changes.
+        """
+        if self._task_cron is None:
+            self._task_cron = self.produce_cron_task()
+        return self._task_cron
+
+    def produce_cron_task(self):
+        """Render the task part without using the rendered line cache.
         """
         kwargs = {
             "path": self.path,
@@ -422,25 +690,105 @@ class Job(object):
 
     @property
     def time_in_cron_syntax(self):
-        """Cron content time part.
+        """Cron content time part.  The time is looked up in
+        :data:`parse_cache` first, with placeholders for the default moments
+        which are filled in for this job.
+        """
+        time = self.time_template
+        if '{' in time:
+            moments = self.default_moments
+            time = time.format(minute=moments.get(MINUTE, '0'),
+                               hour=moments.get(HOUR, '0'))
+        return time
+
+    @property
+    def time_template(self):
+        """The cron time with ``{minute}`` and ``{hour}`` in place of the
+        default moments, looked up in :data:`parse_cache` first.
+
+        .. versionadded:: 0.6
+        """
+        key = (self.every, normalize_at(self.at))
+        return parse_cache.get(
+            key, lambda: self.produce_cron_time(MOMENT_PLACEHOLDERS))
+
+    def produce_cron_time(self, moments=None):
+        """Translate every and at into cron time syntax without using the
+        parse cache, see :meth:`parse_time` for `moments`.
         """
         if CRON_TIME_SYNTAX_RE.match(self.every):
+            from .cron import CronSchedule
+            try:
+                CronSchedule.parse(self.every)
+            except ParseError as e:
+                e.field = 'every'
+                raise
             return self.every
         elif self.every in PREDEFINED_DEFINITIONS:
             return "@%s" % self.every
         else:
-            return self.parse_time()
+            return self.parse_time(moments)
+
+    @property
+    def schedule(self):
+        """The compiled :class:`~plan.cron.CronSchedule` for this job, use
+        this to find out when the job actually fires.
+
+        .. versionadded:: 0.6
+        """
+        from .cron import CronSchedule, FIELDS, parse_field
+        template = self.time_template
+        schedule = parse_cache.get((CronSchedule, template), lambda: (
+            CronSchedule.parse(template.format(minute='0', hour='0'))))
+        if '{' not in template:
+            return schedule
+        # fill in the default moments of this job
+        moments = self.default_moments
+        fields = template.split()
+        minutes, hours = schedule.minutes, schedule.hours
+        if fields[0] == MOMENT_PLACEHOLDERS[MINUTE]:
+            minutes = parse_field(moments.get(MINUTE, '0'), FIELDS[0])
+        if fields[1] == MOMENT_PLACEHOLDERS[HOUR]:
+            hours = parse_field(moments.get(HOUR, '0'), FIELDS[1])
+        return CronSchedule(minutes, hours, schedule.days, schedule.months,
+                            schedule.weekdays, day_star=schedule.day_star,
+                            week_star=schedule.week_star)
+
+    @property
+    def second_frequency(self):
+        """How many seconds apart the job runs when every is second related,
+        like 15 for ``"15.second"``, None otherwise.  Such jobs fire on the
+        seconds of every minute that are multiples of it and can only be
+        run by :meth:`Plan.serve <plan.Plan.serve>` or systemd timers.
+
+        .. versionadded:: 0.6
+        """
+        if '.second' not in self.every:
+            return None
+        try:
+            self.parse_every()
+        except ParseError as e:
+            e.field = 'every'
+            raise
+        return get_frequency(self.every)
 
     @property
     def cron(self):
-        """Job in cron syntax."""
-        return ' '.join([self.time_in_cron_syntax, self.task_in_cron_syntax])
+        """Job in cron syntax.  The rendered line is kept until the job
+        changes, see :meth:`invalidate`.
+        """
+        if self._cron is None:
+            self._cron = ' '.join([self.time_in_cron_syntax,
+                                   self.task_in_cron_syntax])
+        return self._cron
 
 
 class CommandJob(Job):
     """The command job.
     """
 
+    __slots__ = ()
+
     def task_template(self):
         """Template::
 
@@ -449,37 +797,123 @@ class CommandJob(Job):
         return '{task} {output}'
 
 
-class ScriptJob(Job):
+class PythonJob(Job):
+    """The base class of jobs running one Python interpreter.
+
+    .. versionadded:: 0.6
+
+    :param zygote: the socket path of one :class:`~plan.zygote.Zygote`, the
+                   job asks it to fork one child running the task instead
+                   of starting one interpreter, the interpreter is still
+                   started if the zygote is not running.
+    """
+
+    __slots__ = ('zygote',)
+
+    def __init__(self, task, *args, **kwargs):
+        zygote = kwargs.pop('zygote', None)
+        Job.__init__(self, task, *args, **kwargs)
+        self.zygote = intern_string(zygote)
+
+    @property
+    def interpreter(self):
+        """The command running the task, :data:`sys.executable` or the
+        zygote client.
+        """
+        if not self.zygote:
+            return sys.executable
+        command = '%s -m plan.zygote %s' % (sys.executable,
+                                            shell_quote(self.zygote))
+        return command.replace('{', '{{').replace('}', '}}')
+
+
+class ScriptJob(PythonJob):
     """The script job.
     """
 
+    __slots__ = ()
+
     def task_template(self):
         """Template::
 
             'cd {path} && {environment} %s {task} {output}' % sys.executable
         """
-        return 'cd {path} && {environment} %s {task} {output}' % sys.executable
+        return 'cd {path} && {environment} %s {task} {output}' % \
+            self.interpreter
 
 
-class ModuleJob(Job):
+class ModuleJob(PythonJob):
     """The module job.
     """
 
+    __slots__ = ()
+
     def task_template(self):
         """Template::
 
             '{environment} %s -m {task} {output}' % sys.executable
         """
-        return '{environment} %s -m {task} {output}' % sys.executable
+        return '{environment} %s -m {task} {output}' % self.interpreter
 
 
 class RawJob(Job):
     """The raw job.
     """
 
+    __slots__ = ()
+
     def task_template(self):
         """Template::
 
             '{task}'
         """
         return '{task}'
+
+
+class FunctionJob(Job):
+    """The function job, the task is one function taking no arguments or
+    its ``module:name`` string.  :meth:`Plan.serve <plan.Plan.serve>` calls
+    the function inside the serving process, so the imports are paid once,
+    cron runs one new interpreter importing and calling it every time.
+
+    .. versionadded:: 0.6
+
+    :param isolation: how the serving process calls the function, ``thread``
+                      calls it in one thread of the serving process, path,
+                      environment and output are not used then; ``fork``
+                      calls it in one forked child process, which changes
+                      into path, sets environment and redirects output
+                      first.
+    """
+
+    __slots__ = ('function', 'isolation')
+
+    def __init__(self, task, *args, **kwargs):
+        isolation = kwargs.pop('isolation', 'thread')
+        if isolation not in ('thread', 'fork'):
+            raise ValueError("Illegal isolation value %s" % isolation)
+        Job.__init__(self, function_task(task), *args, **kwargs)
+        self.function = None if isinstance(task, string_types) else task
+        self.isolation = isolation
+
+    def load(self):
+        """Get the function, imported from the task the first time if the
+        job was not given the function itself.
+        """
+        if self.function is None:
+            self.function = load_function(self.task)
+        return self.function
+
+    def task_template(self):
+        """Template::
+
+            'cd {path} && {environment} %s -c {code} {output}' % sys.executable
+
+        The code imports and calls the function with
+        :func:`call_function`.
+        """
+        code = 'from plan.job import call_function; call_function(%r)' % \
+            self.task
+        command = shell_quote(code).replace('{', '{{').replace('}', '}}')
+        return 'cd {path} && {environment} %s -c %s {output}' % (
+            sys.executable, command)
@@ -9,9 +9,16 @@
     :license: BSD, see LICENSE for more details.
 """
 
+import re
+
 from ._compat import string_types
 
 
+# output redirections that map to StandardOutput and StandardError
+APPEND_OUTPUT_RE = re.compile(r'^(?:>> (?P<stdout>\S+))? ?'
+                              r'(?:2>> (?P<stderr>\S+))?$')
+
+
 class Output(object):
     """The plan output class used for command line output redirection.
     """
@@ -48,3 +55,29 @@ class Output(object):
             return "2>> {stderr}".format(stderr=stderr)
         else:
             return ''
+
+
+def parse_output(output):
+    """Translate the output redirection of one job into systemd like
+    StandardOutput and StandardError settings, None if it can not be
+    translated.  This is used by systemd units and by the engine, which
+    redirects the output of functions without one shell.
+
+    .. versionadded:: 0.6
+    """
+    if not output:
+        return []
+    if output == '> /dev/null 2>&1':
+        return [('StandardOutput', 'null'), ('StandardError', 'null')]
+    match = APPEND_OUTPUT_RE.match(output)
+    if not match:
+        return None
+    settings = []
+    for stream, key in (('stdout', 'StandardOutput'),
+                        ('stderr', 'StandardError')):
+        path = match.group(stream)
+        if path == '/dev/null':
+            settings.append((key, 'null'))
+        elif path:
+            settings.append((key, 'append:%s' % path))
+    return settings
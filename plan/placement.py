@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+    plan.placement
+    ~~~~~~~~~~~~~~
+
+    Job placement for Plan.  Jobs that do not pin their minute or hour run
+    at minute 0 and hour 0 by default, this module assigns them moments
+    that keep them away from each other, either by spreading them or by
+    placing them according to their expected costs.
+
+    :copyright: (c) 2014 by Shipeng Feng.
+    :license: BSD, see LICENSE for more details.
+"""
+
+from .job import SECOND, MINUTE, HOUR, CRON_TIME_SYNTAX_RE
+from .job import PREDEFINED_DEFINITIONS
+from .cron import bits_to_list
+from .exceptions import BaseError, ParseError
+from ._compat import get_binary_content
+
+
+MINUTES_PER_DAY = 1440
+ALL_HOURS = list(range(24))
+ALL_MINUTES = list(range(60))
+
+
+def job_identity(job):
+    """Get one stable integer identity for a job, this is the same across
+    processes and runs as long as the job definition does not change.
+    """
+    import hashlib
+    identity = '%s %s %s %s' % (job.__class__.__name__, job.task, job.every,
+                                job.at)
+    return int(hashlib.md5(get_binary_content(identity)).hexdigest(), 16)
+
+
+def free_moments(job):
+    """Get the time types among minute and hour that are not pinned by the
+    job's at value and fall back to :attr:`~plan.Job.default_moments`.
+    """
+    if CRON_TIME_SYNTAX_RE.match(job.every) or \
+            job.every in PREDEFINED_DEFINITIONS:
+        return ()
+    try:
+        every_type, every, ats = job.validate_time()
+    except BaseError:
+        return ()
+    if every_type in (SECOND, MINUTE):
+        return ()
+    free = []
+    if MINUTE not in ats:
+        free.append(MINUTE)
+    if every_type != HOUR and HOUR not in ats:
+        free.append(HOUR)
+    return tuple(free)
+
+
+def placeable(job):
+    """Tell whether one job can be placed by :func:`place`, that is a daily,
+    weekly or monthly job pinning neither its minute nor its hour.
+    """
+    return free_moments(job) == (MINUTE, HOUR)
+
+
+def add_footprint(load, hours, minutes, weight=1):
+    """Add weight to every (hour, minute) slot of one day load list."""
+    for hour in hours:
+        for minute in minutes:
+            load[hour * 60 + minute] += weight
+
+
+def nearest_lowest(costs, preference):
+    """Get the index of the lowest cost, the one nearest after preference
+    wins when there are several.
+    """
+    lowest = min(costs)
+    length = len(costs)
+    start = preference % length
+    for offset in range(length):
+        index = (start + offset) % length
+        if costs[index] == lowest:
+            return index
+
+
+def choose_moment(load, hours, minutes, preference):
+    """Choose the (hour, minute) moment with the lowest load for one job.
+    Either hours or minutes is None when that time type is free.
+
+    :return: the chosen hour and minute, the pinned one is None.
+    """
+    if hours is None and minutes is None:
+        index = nearest_lowest(load, preference)
+        return divmod(index, 60)
+    elif hours is None:
+        costs = [sum(load[hour * 60 + minute] for minute in minutes)
+                 for hour in ALL_HOURS]
+        return nearest_lowest(costs, preference), None
+    else:
+        if hours == ALL_HOURS:
+            costs = [sum(load[minute::60]) for minute in ALL_MINUTES]
+        else:
+            costs = [sum(load[hour * 60 + minute] for hour in hours)
+                     for minute in ALL_MINUTES]
+        return None, nearest_lowest(costs, preference)
+
+
+def spread(jobs, exclude=()):
+    """Spread jobs that do not pin their minute or hour over the day.  The
+    moment of every job is chosen among the least loaded ones, jobs are
+    handled in the order of their identities and prefer the moment derived
+    from their identities, so the result is the same on every run.
+
+    Jobs pinning their moments are counted as load, but never moved.
+
+    :param jobs: a list of :class:`~plan.Job` instances.
+    :param exclude: jobs that are left alone and not counted as load, like
+                    the ones placed by :func:`place`.
+    """
+    exclude = set(map(id, exclude))
+    load = [0] * MINUTES_PER_DAY
+    movable = []
+    for job in jobs:
+        if id(job) in exclude:
+            continue
+        free = free_moments(job)
+        if free:
+            movable.append((job_identity(job), job, free))
+            continue
+        try:
+            schedule = job.schedule
+        except BaseError:
+            continue
+        add_footprint(load, bits_to_list(schedule.hours),
+                      bits_to_list(schedule.minutes))
+
+    movable.sort(key=lambda item: item[0])
+    for identity, job, free in movable:
+        # moments of free time types are ignored here, the previous ones
+        # are kept so unchanged jobs keep their rendered lines
+        schedule = job.schedule
+        hours = None if HOUR in free else bits_to_list(schedule.hours)
+        minutes = None if MINUTE in free else bits_to_list(schedule.minutes)
+        hour, minute = choose_moment(load, hours, minutes, identity)
+        add_footprint(load, hours or [hour], minutes or [minute])
+        moments = {}
+        if hour is not None:
+            moments[HOUR] = str(hour)
+        if minute is not None:
+            moments[MINUTE] = str(minute)
+        job.default_moments = moments
+
+
+def parse_clock(clock):
+    """Parse "hour:minute" into minutes of the day, "24:00" is allowed."""
+    hour, minute = clock.strip().split(':')
+    hour, minute = int(hour), int(minute)
+    if hour not in range(25) or minute not in range(60) or \
+            (hour == 24 and minute):
+        raise ValueError(clock)
+    return hour * 60 + minute
+
+
+def parse_window(window):
+    """Parse one window value like ``"01:00-05:00"`` into the list of
+    minutes of the day a job may start at, the end is excluded.  Windows
+    like ``"22:00-02:00"`` wrap over midnight, no window means the whole day.
+
+    :param window: the window value.
+    """
+    if not window:
+        return list(range(MINUTES_PER_DAY))
+    try:
+        begin, end = window.split('-')
+        begin, end = parse_clock(begin), parse_clock(end)
+    except ValueError:
+        raise ParseError("Your window value %s is invalid" % window,
+                         field='window')
+    begin, end = begin % MINUTES_PER_DAY, end % MINUTES_PER_DAY
+    if begin < end:
+        return list(range(begin, end))
+    return list(range(begin, MINUTES_PER_DAY)) + list(range(end))
+
+
+def add_cost(load, starts, minutes, weight):
+    """Add weight to the load of every minute occupied by runs starting at
+    starts and lasting minutes, wrapping over midnight.
+    """
+    for start in starts:
+        for offset in range(minutes):
+            load[(start + offset) % MINUTES_PER_DAY] += weight
+
+
+class PlacementReport(object):
+    """The result of :func:`place`.
+
+    :param resource: the resource the jobs were placed by.
+    :param load: the load of every minute of one day after placement.
+    :param moments: a list of (job, hour, minute) tuples for placed jobs.
+    """
+
+    def __init__(self, resource, load, moments):
+        self.resource = resource
+        self.load = load
+        self.moments = moments
+
+    @property
+    def peak(self):
+        """The peak concurrent load of the day."""
+        return max(self.load)
+
+    @property
+    def jobs(self):
+        """The placed jobs."""
+        return [job for job, hour, minute in self.moments]
+
+
+def place(jobs, resource='cpu', step=5):
+    """Place daily, weekly and monthly jobs that pin neither their minute nor
+    their hour into the start moments that keep the peak concurrent cost of
+    the day lowest, inside their windows.  Runs are placed to end inside
+    the window too, jobs running longer than their window only start inside
+    it.  The other jobs are counted as load with their declared costs.
+
+    Every placed job is counted as if it ran every day, so the reported peak
+    is an upper bound.  Heavier jobs are placed first, the moment derived
+    from the job identity wins among equally good ones, so the result is the
+    same on every run.
+
+    :param jobs: a list of :class:`~plan.Job` instances.
+    :param resource: place by cpu, memory or jobs.
+    :param step: only consider start minutes that are multiples of step.
+    :return: one :class:`PlacementReport` instance.
+    """
+    if resource not in ('cpu', 'memory', 'jobs'):
+        raise ValueError("Illegal resource %s" % resource)
+    load = [0] * MINUTES_PER_DAY
+    movable = []
+    for job in jobs:
+        if placeable(job):
+            movable.append((job_identity(job), job))
+            continue
+        try:
+            schedule = job.schedule
+        except BaseError:
+            continue
+        starts = [hour * 60 + minute
+                  for hour in bits_to_list(schedule.hours)
+                  for minute in bits_to_list(schedule.minutes)]
+        add_cost(load, starts, job.cost.minutes, job.cost.weight(resource))
+
+    movable.sort(key=lambda item: (-item[1].cost.minutes *
+                                   item[1].cost.weight(resource), item[0]))
+    moments = []
+    for identity, job in movable:
+        minutes = job.cost.minutes
+        weight = job.cost.weight(resource)
+        window = parse_window(job.window)
+        if len(window) < MINUTES_PER_DAY:
+            # runs should end inside the window too, unless none can
+            window = window[:len(window) - minutes + 1] or window
+        candidates = [start for start in window if start % step == 0] or \
+            window
+        # wrap over midnight without modulo in the inner loop
+        extended = load + load[:minutes]
+        best, best_key = None, None
+        preference = identity % len(candidates)
+        for offset in range(len(candidates)):
+            start = candidates[(preference + offset) % len(candidates)]
+            occupied = extended[start:start + minutes]
+            key = (max(occupied), sum(occupied))
+            if best_key is None or key < best_key:
+                best, best_key = start, key
+        add_cost(load, [best], minutes, weight)
+        hour, minute = divmod(best, 60)
+        job.default_moments = {HOUR: str(hour), MINUTE: str(minute)}
+        moments.append((job, hour, minute))
+    return PlacementReport(resource, load, moments)
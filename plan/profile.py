@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+    plan.profile
+    ~~~~~~~~~~~~
+
+    Load profile for Plan.  This expands the schedules of all jobs into one
+    minute resolution firing calendar, so we can see how many jobs are
+    started at the same minute.  NumPy is required.
+
+    :copyright: (c) 2014 by Shipeng Feng.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import datetime
+
+from .exceptions import PlanError
+
+
+MINUTES_PER_DAY = 1440
+
+
+def import_numpy():
+    """Import NumPy, raise :class:`~plan.PlanError` if it is not installed.
+    """
+    try:
+        import numpy
+    except ImportError:
+        raise PlanError("load profile needs NumPy; please make sure you have "
+                        "numpy installed")
+    return numpy
+
+
+def bit_matrix(np, masks, values):
+    """Look up positions in bitsets, row i column j tells whether bit
+    values[j] is set in masks[i].
+    """
+    masks = np.asarray(masks, dtype=np.int64)
+    values = np.asarray(values, dtype=np.int64)
+    return ((masks[:, None] >> values[None, :]) & 1).astype(bool)
+
+
+class LoadProfile(object):
+    """The firing calendar of a group of jobs.  Jobs sharing the same
+    schedule share one row of the occupancy matrix.
+
+    :param start: the first minute of this profile.
+    :param jobs: the jobs of this profile.
+    :param rows: the occupancy row index of every job.
+    :param occupancy: a boolean NumPy array of schedules x minutes, tells
+                      whether the schedule fires at that minute.
+    :param weights: how many jobs every occupancy row stands for.
+    """
+
+    def __init__(self, start, jobs, rows, occupancy, weights):
+        self.start = start
+        self.jobs = jobs
+        self.rows = rows
+        self.occupancy = occupancy
+        #: How many jobs are started at every minute.
+        self.counts = weights.dot(occupancy)
+
+    @property
+    def minutes(self):
+        """How many minutes this profile covers."""
+        return self.occupancy.shape[1]
+
+    @property
+    def matrix(self):
+        """The jobs x minutes boolean occupancy matrix."""
+        return self.occupancy[self.rows]
+
+    @property
+    def peak(self):
+        """The maximum number of jobs started at one minute."""
+        if not self.minutes:
+            return 0
+        return int(self.counts.max())
+
+    @property
+    def peak_minutes(self):
+        """All the minutes when :attr:`peak` jobs are started."""
+        if not self.peak:
+            return []
+        return [self.time(index)
+                for index in self.counts.nonzero()[0]
+                if self.counts[index] == self.peak]
+
+    def time(self, index):
+        """Translate one minute index into datetime."""
+        return self.start + datetime.timedelta(minutes=int(index))
+
+    def index(self, time):
+        """Translate one datetime into minute index."""
+        return int((time - self.start).total_seconds() // 60)
+
+    def jobs_at(self, time):
+        """Get the jobs started at one minute.
+
+        :param time: the datetime or minute index.
+        """
+        if isinstance(time, datetime.datetime):
+            time = self.index(time)
+        firing = self.occupancy[:, time]
+        return [job for job, row in zip(self.jobs, self.rows)
+                if firing[row]]
+
+    def peaks(self, limit=10):
+        """Get the busiest minutes as a list of (time, count, jobs) tuples,
+        busiest and earliest first.
+
+        :param limit: how many minutes we want at most.
+        """
+        np = import_numpy()
+        order = np.lexsort((np.arange(self.minutes), -self.counts))
+        peaks = []
+        for index in order[:limit]:
+            count = int(self.counts[index])
+            if not count:
+                break
+            peaks.append((self.time(index), count, self.jobs_at(index)))
+        return peaks
+
+
+def load_profile(jobs, start, days=7):
+    """Expand the schedules of jobs into one :class:`LoadProfile`.
+
+    :param jobs: a list of :class:`~plan.Job` instances.
+    :param start: the profile starts from the midnight of this datetime.
+    :param days: how many days the profile covers.
+    """
+    np = import_numpy()
+    start = datetime.datetime(start.year, start.month, start.day)
+
+    rows, schedules, schedule_rows = [], [], {}
+    for job in jobs:
+        schedule = job.schedule
+        if schedule not in schedule_rows:
+            schedule_rows[schedule] = len(schedules)
+            schedules.append(schedule)
+        rows.append(schedule_rows[schedule])
+    rows = np.array(rows, dtype=np.intp)
+    weights = np.bincount(rows, minlength=len(schedules))
+
+    # day level calendar
+    first = np.datetime64(start.date())
+    dates = np.arange(first, first + days)
+    months = dates.astype('datetime64[M]')
+    month_numbers = months.astype(np.int64) % 12 + 1
+    day_numbers = (dates - months.astype('datetime64[D]')).astype(np.int64) + 1
+    # 1970-01-01 is Thursday
+    weekdays = (dates.astype(np.int64) + 4) % 7
+
+    def column(name):
+        return [getattr(schedule, name) for schedule in schedules]
+
+    month_match = bit_matrix(np, column('months'), month_numbers)
+    day_match = bit_matrix(np, column('days'), day_numbers)
+    week_match = bit_matrix(np, column('weekdays'), weekdays)
+    either_star = np.array([s.day_star or s.week_star for s in schedules],
+                           dtype=bool)[:, None]
+    days_firing = month_match & np.where(either_star,
+                                         day_match & week_match,
+                                         day_match | week_match)
+
+    # minute level calendar inside one day
+    minute_of_day = np.arange(MINUTES_PER_DAY)
+    minutes_firing = bit_matrix(np, column('hours'), minute_of_day // 60) & \
+        bit_matrix(np, column('minutes'), minute_of_day % 60)
+
+    occupancy = days_firing[:, :, None] & minutes_firing[:, None, :]
+    occupancy = occupancy.reshape(len(schedules), days * MINUTES_PER_DAY)
+    return LoadProfile(start, list(jobs), rows, occupancy, weights)
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+    plan.simulation
+    ~~~~~~~~~~~~~~~
+
+    Simulation for Plan.  This replays the schedules of jobs over a time
+    range with their durations, so we know how many jobs run at the same
+    time before we update the crontab.
+
+    :copyright: (c) 2014 by Shipeng Feng.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import datetime
+
+from ._compat import integer_types
+
+
+def get_duration(job, index, durations):
+    """Get the duration in minutes of one job.  Durations can be looked up by
+    the job itself, its index or its task, a list of durations means
+    historical durations and the longest one is used.  The declared cost
+    duration is used if nothing is found.
+    """
+    for key in (job, index, job.task):
+        try:
+            duration = durations[key]
+        except (KeyError, TypeError, IndexError):
+            continue
+        if not isinstance(duration, integer_types + (float,)):
+            duration = max(duration)
+        return duration
+    return job.cost.duration
+
+
+class SimulationReport(object):
+    """The result of :func:`simulate`.
+
+    :param start: the simulation start datetime.
+    :param end: the simulation end datetime.
+    """
+
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+        #: The maximum number of simultaneous jobs.
+        self.peak = 0
+        #: When :attr:`peak` is first reached.
+        self.peak_time = None
+        #: The jobs running at :attr:`peak_time`.
+        self.peak_jobs = []
+        #: The maximum simultaneous cpu weight.
+        self.peak_cpu = 0
+        #: Runs of every job, a list of (job, runs) tuples.
+        self.runs = []
+        #: Runs started while the previous run of the same job is still
+        #: running, a list of (job, overlaps) tuples, only jobs that overlap
+        #: with themselves are listed.
+        self.overlaps = []
+        # cpu weight multiplied by minutes
+        self.cpu_minutes = 0
+
+    @property
+    def minutes(self):
+        """How many minutes the simulation covers."""
+        return (self.end - self.start).total_seconds() / 60
+
+    @property
+    def cpu_demand(self):
+        """Time weighted average cpu demand."""
+        if self.minutes <= 0:
+            return 0
+        return self.cpu_minutes / float(self.minutes)
+
+
+def simulate(jobs, start, end, durations=None):
+    """Replay the schedules of jobs over ``[start, end)``.  Runs started
+    before start that are still running at start are counted too.
+
+    :param jobs: a list of :class:`~plan.Job` instances.
+    :param start: the start datetime.
+    :param end: the end datetime.
+    :param durations: a dictionary of durations in minutes, see
+                      :func:`get_duration`.
+    :return: one :class:`SimulationReport` instance.
+    """
+    durations = durations or {}
+    report = SimulationReport(start, end)
+    # (time, kind, job index), ends sort before starts at the same time
+    events = []
+    for index, job in enumerate(jobs):
+        duration = datetime.timedelta(
+            minutes=get_duration(job, index, durations))
+        if duration <= datetime.timedelta(0):
+            # zero length runs never run at the same time as anything
+            runs = sum(1 for _ in job.schedule.iter_fires(start, end))
+            report.runs.append((job, runs))
+            continue
+        runs = overlaps = 0
+        previous_end = None
+        for fire in job.schedule.iter_fires(start - duration, end):
+            fire_end = fire + duration
+            if fire_end <= start:
+                continue
+            if previous_end is not None and fire < previous_end:
+                overlaps += 1
+            previous_end = fire_end
+            if fire >= start:
+                runs += 1
+            events.append((max(fire, start), 1, index))
+            events.append((min(fire_end, end), 0, index))
+        report.runs.append((job, runs))
+        if overlaps:
+            report.overlaps.append((job, overlaps))
+    events.sort()
+
+    running = {}
+    concurrency = cpu = 0
+    last_time = start
+    for time, kind, index in events:
+        report.cpu_minutes += cpu * (time - last_time).total_seconds() / 60
+        last_time = time
+        weight = jobs[index].cost.cpu
+        if kind:
+            concurrency += 1
+            cpu += weight
+            running[index] = running.get(index, 0) + 1
+            if concurrency > report.peak:
+                report.peak = concurrency
+                report.peak_time = time
+                report.peak_jobs = [jobs[i] for i in sorted(running)]
+            report.peak_cpu = max(report.peak_cpu, cpu)
+        else:
+            concurrency -= 1
+            cpu -= weight
+            running[index] -= 1
+            if not running[index]:
+                del running[index]
+    return report
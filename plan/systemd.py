@@ -0,0 +1,370 @@
+# -*- coding: utf-8 -*-
+"""
+    plan.systemd
+    ~~~~~~~~~~~~
+
+    Systemd timer output for Plan.  Every job becomes one ``.service`` unit
+    running its task and one ``.timer`` unit firing when the cron time of
+    the job would, the units are plain files in one directory.
+
+    :copyright: (c) 2014 by Shipeng Feng.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import os
+import re
+import sys
+import errno
+import collections
+
+from .job import CommandJob, ScriptJob, ModuleJob
+from .cron import bits_to_list, FULL_DAYS, FULL_WEEKDAYS
+from .exceptions import PlanError
+from .utils import atomic_write, iter_lines
+from .output import parse_output
+from ._compat import get_binary_content
+
+
+WEEKDAY_NAMES = ('Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat')
+
+# systemd weeks start on Monday
+WEEKDAY_ORDER = (1, 2, 3, 4, 5, 6, 0)
+
+FULL_MINUTES = (1 << 60) - 1
+FULL_HOURS = (1 << 24) - 1
+FULL_MONTHS = ((1 << 13) - 1) & ~1
+
+# characters not allowed in unit names
+UNIT_INVALID_RE = re.compile(r'[^A-Za-z0-9:_.-]')
+
+
+def unit_identity(job):
+    """Get the id of the units of one job, it only depends on the task, so
+    changing the time of one job only rewrites its timer.
+    """
+    import hashlib
+    identity = '%s %s' % (job.__class__.__name__, job.task)
+    return hashlib.md5(get_binary_content(identity)).hexdigest()[:8]
+
+
+def render_runs(values, names=None, width=1):
+    """Render a list of values with runs of three or more values written as
+    ``a..b``.
+    """
+    def name(value):
+        if names is not None:
+            return names[value]
+        return '%0*d' % (width, value)
+
+    parts = []
+    index = 0
+    while index < len(values):
+        end = index
+        while end + 1 < len(values) and values[end + 1] == values[end] + 1:
+            end += 1
+        if end - index >= 2:
+            parts.append('%s..%s' % (name(values[index]), name(values[end])))
+        else:
+            parts.extend(name(value) for value in values[index:end + 1])
+        index = end + 1
+    return ','.join(parts)
+
+
+def render_mask(mask, full, width=1):
+    """Render one field bitset, ``*`` if the field is full."""
+    if mask == full:
+        return '*'
+    return render_runs(bits_to_list(mask), width=width)
+
+
+def render_weekdays(weekdays):
+    """Render the day of week bitset in Monday first order, empty if every
+    day matches.
+    """
+    if weekdays == FULL_WEEKDAYS:
+        return ''
+    positions = [WEEKDAY_ORDER.index(day) for day in bits_to_list(weekdays)]
+    ordered = tuple(WEEKDAY_NAMES[day] for day in WEEKDAY_ORDER)
+    return render_runs(sorted(positions), ordered)
+
+
+def on_calendar(schedule):
+    """Translate one :class:`~plan.cron.CronSchedule` into a list of systemd
+    ``OnCalendar`` values, the timer fires when any of them matches.  Cron
+    matches either day field when both are restricted, which needs two
+    values since systemd always matches both.
+
+    :param schedule: one :class:`~plan.cron.CronSchedule` instance.
+    """
+    time = '%s:%s:00' % (render_mask(schedule.hours, FULL_HOURS, 2),
+                         render_mask(schedule.minutes, FULL_MINUTES, 2))
+    months = render_mask(schedule.months, FULL_MONTHS, 2)
+
+    def value(weekdays, days):
+        weekdays = render_weekdays(weekdays)
+        date = '*-%s-%s' % (months, render_mask(days, FULL_DAYS, 2))
+        return ' '.join(part for part in (weekdays, date, time) if part)
+
+    if schedule.day_star or schedule.week_star or \
+            schedule.days == FULL_DAYS or schedule.weekdays == FULL_WEEKDAYS:
+        if not (schedule.day_star or schedule.week_star):
+            # either field matching every day makes every day match
+            return [value(FULL_WEEKDAYS, FULL_DAYS)]
+        return [value(schedule.weekdays, schedule.days)]
+    return [value(FULL_WEEKDAYS, schedule.days),
+            value(schedule.weekdays, FULL_DAYS)]
+
+
+def on_calendar_seconds(frequency):
+    """Get the systemd ``OnCalendar`` value of one job running every
+    frequency seconds, it fires on the seconds of every minute that are
+    multiples of frequency like :meth:`Plan.serve <plan.Plan.serve>` does.
+
+    :param frequency: the :attr:`~plan.Job.second_frequency` of the job.
+    """
+    if frequency == 60:
+        return '*-*-* *:*:00'
+    return '*-*-* *:*:00/%d' % frequency
+
+
+def quote(argument):
+    """Quote one ExecStart argument, systemd expands ``%`` specifiers and
+    ``$`` variables unless they are doubled.
+    """
+    argument = argument.replace('%', '%%').replace('$', '$$')
+    if argument and not re.search(r'[\s"\'\\;]', argument):
+        return argument
+    return '"%s"' % argument.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def quote_environment(variable, value):
+    """Quote one Environment assignment, systemd expands ``%`` specifiers
+    there but no ``$`` variables.
+    """
+    assignment = ('%s=%s' % (variable, value)).replace('%', '%%')
+    if not re.search(r'[\s"\'\\]', assignment):
+        return assignment
+    return '"%s"' % assignment.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def environment_settings(variables):
+    """Get the Environment settings of a dictionary of variables, None
+    values are skipped like they are in the crontab.
+    """
+    return [('Environment', quote_environment(variable, value))
+            for variable, value in sorted((variables or {}).items())
+            if value is not None]
+
+
+def service_settings(job, variables=None):
+    """Get the ``[Service]`` settings running the task of one job.  Scripts
+    and modules are run directly with their path and environment, other
+    jobs run their task with ``/bin/sh -c`` like cron does.
+
+    :param variables: the environment variables of the plan, set for every
+                      job like the crontab variables.
+    """
+    settings = [('Type', 'oneshot')]
+    settings.extend(environment_settings(variables))
+    output = parse_output(job.output)
+    if isinstance(job, (ScriptJob, ModuleJob)) and output is not None:
+        if isinstance(job, ScriptJob) and job.path:
+            settings.append(('WorkingDirectory', job.path))
+        settings.extend(environment_settings(job.environment))
+        command = [sys.executable]
+        if isinstance(job, ModuleJob):
+            command.append('-m')
+        command = ' '.join(quote(arg) for arg in command) + ' ' + \
+            job.task.replace('%', '%%').replace('$', '$$')
+    elif isinstance(job, CommandJob) and output is not None:
+        command = '/bin/sh -c %s' % quote(job.task)
+    else:
+        # raw jobs run their task as it is, output included, like in cron
+        output = []
+        command = '/bin/sh -c %s' % quote(job.task_in_cron_syntax)
+    settings.append(('ExecStart', command))
+    settings.extend(output)
+    return settings
+
+
+def render_unit(sections):
+    """Render a list of (section, settings) tuples into unit file lines."""
+    lines = []
+    for section, settings in sections:
+        if lines:
+            lines.append('')
+        lines.append('[%s]' % section)
+        for key, value in settings:
+            lines.append('%s=%s' % (key, value))
+    return lines
+
+
+class SystemdReport(object):
+    """The result of :meth:`SystemdDirectory.write`."""
+
+    def __init__(self):
+        #: The unit files written.
+        self.written = []
+        #: The unit files left alone since they were up to date.
+        self.unchanged = []
+        #: The unit files of jobs no longer in the plan which were removed.
+        self.removed = []
+
+
+class SystemdDirectory(object):
+    """One directory of systemd unit files, like ``/etc/systemd/system``.
+    Units of one Plan object are named ``plan-<name>-<id>``, the id comes
+    from the job definition, so adding or removing one job never renames the
+    units of the others, and changing the time of one job only rewrites its
+    timer.
+
+    Systemd is not needed to render the units, enable the timers yourself
+    after writing, like ``systemctl daemon-reload`` and
+    ``systemctl enable --now plan-main-*.timer``.
+
+    .. versionadded:: 0.6
+
+    :param directory: the unit directory, default to be
+                      ``/etc/systemd/system``.
+    :param randomized_delay: the ``RandomizedDelaySec`` of every timer,
+                             spreads the runs of timers firing at the same
+                             time, like ``"5min"``.
+    :param accuracy: the ``AccuracySec`` of every timer, default to be
+                     ``"1min"`` like cron.  Timers of second related jobs
+                     like ``"15.second"`` always get ``"1s"``.
+    :param persistent: run missed jobs after the host was down.
+    """
+
+    def __init__(self, directory='/etc/systemd/system',
+                 randomized_delay=None, accuracy='1min', persistent=False):
+        self.directory = directory
+        self.randomized_delay = randomized_delay
+        self.accuracy = accuracy
+        self.persistent = persistent
+
+    def get_prefix(self, plan):
+        """Get the unit name prefix of one Plan object."""
+        return 'plan-%s-' % UNIT_INVALID_RE.sub('_', plan.name)
+
+    def iter_names(self, plan):
+        """Iterate over the (unit name, job) tuples of one Plan object."""
+        prefix = self.get_prefix(plan)
+        seen = set()
+        for job in plan.jobs:
+            identity = prefix + unit_identity(job)
+            name = identity
+            count = 1
+            while name in seen:
+                count += 1
+                name = '%s-%d' % (identity, count)
+            seen.add(name)
+            yield name, job
+
+    def render(self, plan):
+        """Render the units of one Plan object.
+
+        :return: an ordered dictionary mapping unit file names to lists of
+                 lines.
+        """
+        if plan.spread:
+            plan.spread_jobs()
+        units = collections.OrderedDict()
+        for name, job in self.iter_names(plan):
+            service = service_settings(job, plan.envs)
+            if plan.user:
+                service.insert(1, ('User', str(plan.user)))
+            units[name + '.service'] = render_unit([
+                ('Unit', [('Description', 'Plan %s job: %s' %
+                           (plan.name, job.task))]),
+                ('Service', service),
+            ])
+            timer = []
+            accuracy = self.accuracy
+            frequency = job.second_frequency
+            if frequency is not None:
+                job.validate_time()
+                timer.append(('OnCalendar', on_calendar_seconds(frequency)))
+                accuracy = '1s'
+            elif job.schedule.reboot:
+                timer.append(('OnBootSec', '0'))
+            else:
+                for calendar in on_calendar(job.schedule):
+                    timer.append(('OnCalendar', calendar))
+            if accuracy:
+                timer.append(('AccuracySec', accuracy))
+            if self.randomized_delay:
+                timer.append(('RandomizedDelaySec', self.randomized_delay))
+            if self.persistent:
+                timer.append(('Persistent', 'true'))
+            units[name + '.timer'] = render_unit([
+                ('Unit', [('Description', 'Plan %s timer: %s' %
+                           (plan.name, job.task))]),
+                ('Timer', timer),
+                ('Install', [('WantedBy', 'timers.target')]),
+            ])
+        return units
+
+    def read(self, filename):
+        """Get the content of one unit file, None if it does not exist."""
+        try:
+            with open(os.path.join(self.directory, filename)) as f:
+                return f.read()
+        except (IOError, OSError) as e:
+            if e.errno == errno.ENOENT:
+                return None
+            raise PlanError("couldn't read unit file; %s" % e)
+
+    def list_units(self, plan):
+        """List the unit files of one Plan object present in the
+        directory.
+        """
+        unit_re = re.compile(r'^%s[0-9a-f]{8}(-\d+)?\.(service|timer)$' %
+                             re.escape(self.get_prefix(plan)))
+        try:
+            filenames = os.listdir(self.directory)
+        except OSError as e:
+            raise PlanError("couldn't list unit files; %s" % e)
+        return sorted(filter(unit_re.match, filenames))
+
+    def write(self, plan):
+        """Write the units of one Plan object, units whose content did not
+        change are left alone and units of removed jobs are removed.
+
+        :return: one :class:`SystemdReport` instance.
+        """
+        report = SystemdReport()
+        units = self.render(plan)
+        for filename, lines in units.items():
+            content = self.read(filename)
+            if content is not None and \
+                    list(iter_lines(content)) == lines + ['']:
+                report.unchanged.append(filename)
+                continue
+            try:
+                atomic_write(os.path.join(self.directory, filename), lines)
+            except (IOError, OSError) as e:
+                raise PlanError("couldn't write unit file; %s" % e)
+            report.written.append(filename)
+        for filename in self.list_units(plan):
+            if filename not in units:
+                self.remove_unit(filename)
+                report.removed.append(filename)
+        return report
+
+    def remove_unit(self, filename):
+        """Remove one unit file."""
+        try:
+            os.unlink(os.path.join(self.directory, filename))
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise PlanError("couldn't remove unit file; %s" % e)
+
+    def remove(self, plan):
+        """Remove all units of one Plan object.
+
+        :return: the removed unit file names.
+        """
+        filenames = self.list_units(plan)
+        for filename in filenames:
+            self.remove_unit(filename)
+        return filenames
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+    plan.testsuite.backends
+    ~~~~~~~~~~~~~~~~~~~~~~~
+
+    Tests the crontab backends for Plan.
+
+    :copyright: (c) 2014 by Shipeng Feng.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import os
+import shutil
+import getpass
+import signal
+import tempfile
+import unittest
+
+from plan.testsuite import BaseTestCase
+from plan.core import Plan
+from plan.backends import SpoolBackend
+from plan.exceptions import PlanError
+
+
+class SpoolBackendTestCase(BaseTestCase):
+
+    def setup(self):
+        self.directory = tempfile.mkdtemp()
+        self.backend = SpoolBackend(self.directory)
+        self.user = getpass.getuser()
+
+    def teardown(self):
+        shutil.rmtree(self.directory)
+
+    def test_read_and_write(self):
+        self.assert_equal(self.backend.read(self.user), '')
+        self.backend.write(['* * * * * test', '# end'], self.user)
+        self.assert_equal(self.backend.read(self.user),
+                          '* * * * * test\n# end\n')
+        self.assert_equal(os.listdir(self.directory), [self.user])
+        mode = os.stat(self.backend.get_path(self.user)).st_mode
+        self.assert_equal(mode & 0o777, 0o600)
+
+    def test_header(self):
+        with open(os.path.join(self.directory, 'bob'), 'w') as f:
+            f.write('# DO NOT EDIT THIS FILE - edit the master and '
+                    'reinstall.\n'
+                    '# (/tmp/crontab.x installed on Mon Feb 16 2015)\n'
+                    '# (Cron version -- $Id: crontab.c,v 2.13 $)\n'
+                    '* * * * * test\n')
+        self.assert_equal(self.backend.read('bob'), '* * * * * test\n')
+
+    def test_failed_write(self):
+        self.backend.write(['* * * * * old'], self.user)
+
+        def lines():
+            yield '* * * * * new'
+            raise ValueError('broken')
+        self.assert_raises(ValueError, self.backend.write, lines(), self.user)
+        self.assert_equal(self.backend.read(self.user), '* * * * * old\n')
+        self.assert_equal(os.listdir(self.directory), [self.user])
+
+    def test_reload(self):
+        received = []
+        handler = signal.signal(signal.SIGUSR1,
+                                lambda *args: received.append(args[0]))
+        try:
+            pidfile = os.path.join(self.directory, 'cron.pid')
+            with open(pidfile, 'w') as f:
+                f.write('%d\n' % os.getpid())
+            backend = SpoolBackend(self.directory, pidfile=pidfile,
+                                   reload_signal=signal.SIGUSR1)
+            backend.write(['* * * * * test'], self.user)
+            self.assert_equal(received, [signal.SIGUSR1])
+            with open(pidfile, 'w') as f:
+                f.write('unknown')
+            self.assert_raises(PlanError, backend.write, [], self.user)
+        finally:
+            signal.signal(signal.SIGUSR1, handler)
+
+    def test_plan(self):
+        self.backend.write(['* * * * * other'], self.user)
+        plan = Plan(user=self.user, backend=self.backend)
+        plan.command('ls /tmp', every='1.day', at='12:00')
+        plan.update_crontab('update')
+        self.assert_equal(plan.read_crontab(), """\
+* * * * * other
+
+
+# Begin Plan generated jobs for: main
+0 12 * * * ls /tmp
+# End Plan generated jobs for: main
+""")
+        inode = os.stat(self.backend.get_path(self.user)).st_ino
+        self.assert_false(plan.update_crontab('update'))
+        self.assert_equal(os.stat(self.backend.get_path(self.user)).st_ino,
+                          inode)
+        plan.update_crontab('clear')
+        self.assert_equal(plan.read_crontab(), '* * * * * other\n')
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(SpoolBackendTestCase))
+    return suite
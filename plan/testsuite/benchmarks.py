@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+    plan.testsuite.benchmarks
+    ~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Tests the benchmark suite for Plan.
+
+    :copyright: (c) 2014 by Shipeng Feng.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from plan.testsuite import BaseTestCase
+from plan.benchmarks.suite import bench_parse, bench_render, bench_update, \
+    compare, main, TIME_FORMS
+
+
+class SuiteTestCase(BaseTestCase):
+
+    def setup(self):
+        self.directory = tempfile.mkdtemp()
+
+    def teardown(self):
+        shutil.rmtree(self.directory)
+
+    def test_parse(self):
+        results = bench_parse(1, count=10)
+        self.assert_equal(len(results), len(TIME_FORMS))
+        self.assert_in('parse_time every=1.day at=12:15', results)
+
+    def test_render(self):
+        results = bench_render(1, sizes=[50])
+        self.assert_equal(results['cron_content jobs=50']['ops'], 50)
+
+    def test_update(self):
+        path = os.environ.get('PATH')
+        results = bench_update(1, sizes=[3], jobs=5)
+        self.assert_equal(os.environ.get('PATH'), path)
+        self.assert_in('update_crontab replace blocks=3', results)
+        self.assert_in('update_crontab unchanged blocks=3', results)
+
+    def test_compare(self):
+        baseline = {'a': {'seconds': 1.0, 'peak_bytes': 100},
+                    'b': {'seconds': 1.0},
+                    'gone': {'seconds': 1.0}}
+        results = {'a': {'seconds': 1.2, 'peak_bytes': 200},
+                   'b': {'seconds': 2.0},
+                   'new': {'seconds': 5.0}}
+        self.assert_equal(compare(results, baseline, 0.25),
+                          [('a', 'peak_bytes', 100, 200),
+                           ('b', 'seconds', 1.0, 2.0)])
+        self.assert_equal(compare(results, baseline, 1.5), [])
+
+    def test_main(self):
+        output = os.path.join(self.directory, 'results.json')
+        self.assert_equal(main(['--only', 'render', '--sizes', '20',
+                                '--repeat', '1', '--output', output]), 0)
+        with open(output) as f:
+            report = json.load(f)
+        self.assert_equal(list(report['results']),
+                          ['cron_content jobs=20'])
+        report['results']['cron_content jobs=20']['seconds'] = 1e-9
+        baseline = os.path.join(self.directory, 'baseline.json')
+        with open(baseline, 'w') as f:
+            json.dump(report, f)
+        self.assert_equal(main(['--only', 'render', '--sizes', '20',
+                                '--repeat', '1', '--output', output,
+                                '--baseline', baseline]), 1)
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(SuiteTestCase))
+    return suite
@@ -9,11 +9,22 @@
     :license: BSD, see LICENSE for more details.
 """
 
+import io
+import os
 import sys
+import shutil
+import tempfile
+import threading
 import unittest
 
+import click
+from click.testing import CliRunner
+
 from plan.testsuite import BaseTestCase
-from plan.core import Plan
+from plan.core import Plan, PlanGroup, Problem
+from plan.backends import SpoolBackend
+from plan.crontab import CrontabIndex
+from plan.utils import file_lock
 from plan.exceptions import PlanError
 
 
@@ -79,6 +90,106 @@ MAILTO="user@example.com"
 """ % sys.executable
         self.assert_equal(plan.cron_content, desired_cron_content)
 
+    def test_global_environment_copy(self):
+        environment = {'key': 'value'}
+        plan = Plan('test', environment=environment)
+        plan.command('command', every='1.day')
+        plan.command('other', every='1.day')
+        first, second = plan.jobs
+        self.assert_true(first.environment is second.environment)
+        self.assert_true(first.environment is not environment)
+        environment['key'] = 'changed'
+        self.assert_equal(first.environment, {'key': 'value'})
+
+    def test_zygote(self):
+        plan = Plan('test', path='/web/scripts', zygote='/run/zygote.sock')
+        plan.script('script.py', every='1.day')
+        plan.script('other.py', every='1.day', zygote='/run/other.sock')
+        plan.command('top', every='1.day')
+        self.assert_equal(plan.crons, [
+            '0 0 * * * cd /web/scripts && %s -m plan.zygote /run/zygote.sock '
+            'script.py' % sys.executable,
+            '0 0 * * * cd /web/scripts && %s -m plan.zygote /run/other.sock '
+            'other.py' % sys.executable,
+            '0 0 * * * top'])
+
+    def test_compact_cron_content(self):
+        plan = Plan(compact=True)
+        plan.command('command', every='2.minute')
+        plan.command('report', every='1.day', at='12:00')
+        plan.command('report', every='1.day', at='13:00')
+        plan.command('weekday', every='weekday', at='9:00')
+        plan.command('report', every='1.day', at='13:00')
+        plan.command('boot', every='reboot')
+        desired_cron_content = """\
+# Begin Plan generated jobs for: main
+*/2 * * * * command
+0 12-13 * * * report
+0 13 * * * report
+0 9 * * 1-5 weekday
+@reboot boot
+# End Plan generated jobs for: main
+"""
+        self.assert_equal(plan.cron_content, desired_cron_content)
+
+    def test_iter_cron_lines(self):
+        plan = Plan()
+        plan.env('MAILTO', 'admin@example.com')
+        plan.command('ls /tmp', every='1.day', at='12:00')
+        self.assert_equal(list(plan.iter_cron_lines()),
+                          ['# Begin Plan generated jobs for: main',
+                           'MAILTO="admin@example.com"',
+                           '0 12 * * * ls /tmp',
+                           '# End Plan generated jobs for: main'])
+        fileobj = io.BytesIO()
+        plan.write_cron_to(fileobj)
+        self.assert_equal(fileobj.getvalue().decode('utf-8'),
+                          plan.cron_content)
+
+    def test_validate(self):
+        plan = Plan()
+        plan.command('good', every='1.day')
+        plan.command('bad every', every='1.century')
+        plan.command('bad at', every='1.day', at='minute.60')
+        plan.command('bad combination', every='1.minute', at='minute.1')
+        plan.command('bad raw', every='0 25 * * *')
+        plan.command('bad window', every='1.day', window='1-2')
+        problems = plan.validate()
+        self.assert_equal([(p.index, p.field) for p in problems],
+                          [(1, 'every'), (2, 'at'), (3, 'at'), (4, 'every'),
+                           (5, 'window')])
+        self.assert_isinstance(problems[0], Problem)
+        self.assert_true(problems[1].job is plan.jobs[2])
+        self.assert_equal(problems[2].message, 'at can not be set when every'
+                                               ' is minute related')
+        # the cached errors keep their fields
+        self.assert_equal([p.field for p in plan.validate()],
+                          ['every', 'at', 'at', 'every', 'window'])
+
+    def test_validate_bad_numbers(self):
+        plan = Plan()
+        plan.command('bad frequency', every='x.day')
+        plan.command('bad moment', every='1.day', at='hour.x')
+        plan.command('bad time', every='1.day', at='1:xx')
+        plan.command('bad month', every='jan', at='day.x')
+        self.assert_equal([(p.index, p.field) for p in plan.validate()],
+                          [(0, 'every'), (1, 'at'), (2, 'at'), (3, 'at')])
+
+    def test_check_reports_all_problems(self):
+        plan = Plan()
+        plan.command('bad every', every='1.century')
+        plan.command('bad at', every='1.day', at='minute.60')
+
+        @click.command()
+        def command():
+            plan.run('check')
+        output = CliRunner().invoke(command).output
+        self.assert_in('[fail] job 0 every: Your every value 1.century is'
+                       ' invalid', output)
+        self.assert_in('[fail] job 1 at: Your at value minute.60 is invalid',
+                       output)
+        self.assert_not_in('# Begin Plan generated jobs', output)
+
 
 class CrontabTestCase(BaseTestCase):
     """TestCase for communicating with crontab process."""
@@ -118,6 +229,26 @@ class CrontabTestCase(BaseTestCase):
         self.write_crontab('', test_crontab_content)
         self.assert_raises(PlanError, self.plan.update_crontab, 'update')
 
+    def test_update_crontab(self):
+        self.write_crontab('', '* * * * * other\n\n\n\n\n')
+        self.plan.command('ls /tmp', every='1.day', at='12:00')
+        self.plan.update_crontab('update')
+        self.assert_equal(self.plan.read_crontab(), """\
+* * * * * other
+
+
+# Begin Plan generated jobs for: main
+0 12 * * * ls /tmp
+# End Plan generated jobs for: main
+""")
+        self.assert_false(self.plan.update_crontab('update'))
+        self.plan.jobs[0].at = '13:00'
+        self.assert_true(self.plan.update_crontab('update'))
+        self.assert_in('0 13 * * * ls /tmp', self.plan.read_crontab())
+        self.assert_true(self.plan.update_crontab('clear'))
+        self.assert_equal(self.plan.read_crontab(), '* * * * * other\n')
+        self.assert_false(self.plan.update_crontab('clear'))
+
     def test_write_crontab_error(self):
         test_crontab_content = """\
 test
@@ -130,8 +261,147 @@ test
         self.plan = None
 
 
+class CountingBackend(SpoolBackend):
+
+    def __init__(self, *args, **kwargs):
+        SpoolBackend.__init__(self, *args, **kwargs)
+        self.reads = self.writes = 0
+
+    def read(self, user=None):
+        self.reads += 1
+        return SpoolBackend.read(self, user)
+
+    def write(self, lines, user=None):
+        self.writes += 1
+        return SpoolBackend.write(self, lines, user)
+
+
+class RacingBackend(SpoolBackend):
+    """Another deployer adds its block right after the first reads."""
+
+    def __init__(self, *args, **kwargs):
+        SpoolBackend.__init__(self, *args, **kwargs)
+        self.races = 1
+        self.reads = 0
+
+    def read(self, user=None):
+        content = SpoolBackend.read(self, user)
+        self.reads += 1
+        if self.races:
+            self.races -= 1
+            other = Plan('other%d' % self.races, backend=SpoolBackend(
+                self.directory))
+            other.command('other', every='1.day')
+            other.update_crontab('update')
+        return content
+
+
+class PlanGroupTestCase(BaseTestCase):
+
+    def setup(self):
+        self.directory = tempfile.mkdtemp()
+        self.backend = CountingBackend(self.directory)
+
+    def teardown(self):
+        shutil.rmtree(self.directory)
+
+    def make_plan(self, name, task):
+        plan = Plan(name, backend=self.backend)
+        plan.command(task, every='1.day')
+        return plan
+
+    def test_update(self):
+        self.backend.write(['* * * * * other', '',
+                            '# Begin Plan generated jobs for: b',
+                            '0 0 * * * old',
+                            '# End Plan generated jobs for: b', '',
+                            '* * * * * last'])
+        plans = [self.make_plan(name, name) for name in 'abc']
+        group = PlanGroup(plans)
+        self.backend.reads = self.backend.writes = 0
+        self.assert_true(group.update_crontab('update'))
+        self.assert_equal((self.backend.reads, self.backend.writes), (1, 1))
+        self.assert_equal(group.read_crontab(), """\
+* * * * * other
+
+# Begin Plan generated jobs for: b
+0 0 * * * b
+# End Plan generated jobs for: b
+
+
+* * * * * last
+
+
+# Begin Plan generated jobs for: a
+0 0 * * * a
+# End Plan generated jobs for: a
+
+
+# Begin Plan generated jobs for: c
+0 0 * * * c
+# End Plan generated jobs for: c
+""")
+        self.assert_false(group.update_crontab('update'))
+        self.assert_true(group.update_crontab('clear'))
+        self.assert_equal(group.read_crontab(),
+                          '* * * * * other\n\n\n* * * * * last\n')
+        self.assert_false(group.update_crontab('clear'))
+
+    def test_same_as_plans(self):
+        plans = [self.make_plan(name, name) for name in 'ab']
+        for plan in plans:
+            plan.update_crontab('update')
+        content = self.backend.read()
+        self.backend.write([])
+        PlanGroup(plans).update_crontab('update')
+        self.assert_equal(self.backend.read(), content)
+
+    def test_lost_update(self):
+        backend = RacingBackend(self.directory)
+        plan = Plan('main', backend=backend)
+        plan.command('main', every='1.day')
+        plan.update_crontab('update')
+        self.assert_equal(CrontabIndex(backend.read()).names, ['main'])
+
+    def test_retries(self):
+        backend = RacingBackend(self.directory)
+        plan = Plan('main', backend=backend, retries=3)
+        plan.command('main', every='1.day')
+        self.assert_true(plan.update_crontab('update'))
+        self.assert_equal(CrontabIndex(backend.read()).names,
+                          ['other0', 'main'])
+        backend.races = 10
+        plan.jobs[0].at = 'hour.1'
+        self.assert_raises(PlanError, plan.update_crontab, 'update')
+        group = PlanGroup([plan])
+        self.assert_equal(group.retries, 3)
+
+    def test_lockfile(self):
+        lockfile = os.path.join(self.directory, 'plan.lock')
+        plan = Plan('main', backend=self.backend, lockfile=lockfile)
+        plan.command('main', every='1.day')
+        with file_lock(lockfile):
+            thread = threading.Thread(target=plan.update_crontab,
+                                      args=('update',))
+            thread.start()
+            thread.join(0.2)
+            self.assert_true(thread.is_alive())
+            self.assert_equal(self.backend.writes, 0)
+        thread.join()
+        self.assert_equal(self.backend.writes, 1)
+
+    def test_conflicts(self):
+        plan = self.make_plan('a', 'a')
+        self.assert_raises(PlanError, PlanGroup, [plan, plan])
+        self.assert_raises(PlanError, PlanGroup,
+                           [Plan('a', user='alice'), Plan('b', user='bob')])
+        group = PlanGroup([Plan('a', user='alice'), Plan('b')])
+        self.assert_equal(group.user, 'alice')
+
+
 def suite():
     suite = unittest.TestSuite()
     suite.addTest(unittest.makeSuite(PlanTestCase))
     suite.addTest(unittest.makeSuite(CrontabTestCase))
+    suite.addTest(unittest.makeSuite(PlanGroupTestCase))
     return suite
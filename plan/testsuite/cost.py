@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+    plan.testsuite.cost
+    ~~~~~~~~~~~~~~~~~~~
+
+    Tests the cost for Plan.
+
+    :copyright: (c) 2014 by Shipeng Feng.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import unittest
+
+from plan.cost import Cost
+from plan.testsuite import BaseTestCase
+
+
+class CostTestCase(BaseTestCase):
+
+    def test_from_none(self):
+        cost = Cost()
+        self.assert_equal((cost.duration, cost.cpu, cost.memory), (1, 1, 0))
+
+    def test_from_number(self):
+        self.assert_equal(Cost(30).duration, 30)
+        self.assert_equal(Cost(2.5).minutes, 3)
+        self.assert_equal(Cost(0.1).minutes, 1)
+
+    def test_from_dict(self):
+        cost = Cost(dict(duration=20, cpu=4, memory=2))
+        self.assert_equal((cost.duration, cost.cpu, cost.memory), (20, 4, 2))
+        self.assert_equal(cost.weight('cpu'), 4)
+        self.assert_equal(cost.weight('memory'), 2)
+        self.assert_equal(cost.weight('jobs'), 1)
+
+    def test_from_cost(self):
+        cost = Cost(dict(duration=20, cpu=4, memory=2))
+        self.assert_equal(Cost(cost), cost)
+        self.assert_false(Cost(cost) is cost)
+
+    def test_immutable(self):
+        cost = Cost(30)
+        self.assert_raises(AttributeError, setattr, cost, 'duration', 5)
+        self.assert_raises(AttributeError, delattr, cost, 'cpu')
+        self.assert_equal(cost.duration, 30)
+
+    def test_hash(self):
+        self.assert_equal(hash(Cost(30)), hash(Cost(dict(duration=30))))
+        self.assert_equal(len(set([Cost(30), Cost(30), Cost(20)])), 2)
+
+    def test_illegal(self):
+        self.assert_raises(TypeError, Cost, 'long')
+        self.assert_raises(ValueError, Cost, 0)
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(CostTestCase))
+    return suite
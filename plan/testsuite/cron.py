@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+    plan.testsuite.cron
+    ~~~~~~~~~~~~~~~~~~~
+
+    Tests the compiled cron schedule for Plan.
+
+    :copyright: (c) 2014 by Shipeng Feng.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import unittest
+from datetime import datetime
+
+from plan.testsuite import BaseTestCase
+from plan.cron import CronSchedule, next_bit, bits_to_list
+from plan.cron import FIELDS, render_field, merge_schedules
+from plan.job import CommandJob
+from plan.exceptions import ParseError
+
+
+class BasicTestCase(BaseTestCase):
+
+    def test_next_bit(self):
+        self.assert_equal(next_bit(0b10100, 0), 2)
+        self.assert_equal(next_bit(0b10100, 3), 4)
+        self.assert_equal(next_bit(0b10100, 5), None)
+
+    def test_bits_to_list(self):
+        self.assert_equal(bits_to_list(0b10101), [0, 2, 4])
+        self.assert_equal(bits_to_list(0), [])
+
+
+class CronScheduleTestCase(BaseTestCase):
+
+    def test_parse(self):
+        schedule = CronSchedule.parse('*/15 1-3 1,15 jan-mar sun-tue')
+        self.assert_equal(bits_to_list(schedule.minutes), [0, 15, 30, 45])
+        self.assert_equal(bits_to_list(schedule.hours), [1, 2, 3])
+        self.assert_equal(bits_to_list(schedule.days), [1, 15])
+        self.assert_equal(bits_to_list(schedule.months), [1, 2, 3])
+        self.assert_equal(bits_to_list(schedule.weekdays), [0, 1, 2])
+        schedule = CronSchedule.parse('5/20 0-10/5 * * 7')
+        self.assert_equal(bits_to_list(schedule.minutes), [5, 25, 45])
+        self.assert_equal(bits_to_list(schedule.hours), [0, 5, 10])
+        self.assert_equal(bits_to_list(schedule.weekdays), [0])
+
+    def test_parse_predefined(self):
+        self.assert_equal(CronSchedule.parse('@daily'),
+                          CronSchedule.parse('0 0 * * *'))
+        self.assert_equal(CronSchedule.parse('@weekly'),
+                          CronSchedule.parse('0 0 * * 0'))
+        self.assert_true(CronSchedule.parse('@reboot').reboot)
+
+    def test_parse_error(self):
+        for time in ('* * * *', '* * * * * *', '60 * * * *', '* 24 * * *',
+                     '* * 0 * *', '* * * 13 *', '* * * * 8', '*/0 * * * *',
+                     '5-1 * * * *', 'x * * * *', '@often', '0 0 * junk *',
+                     '0 0 * * sunxyz', '0 0 * january *'):
+            self.assert_raises(ParseError, CronSchedule.parse, time)
+
+    def test_next_fire(self):
+        schedule = CronSchedule.parse('30 2 * * *')
+        self.assert_equal(schedule.next_fire(datetime(2015, 1, 1, 2, 29)),
+                          datetime(2015, 1, 1, 2, 30))
+        self.assert_equal(schedule.next_fire(datetime(2015, 1, 1, 2, 30)),
+                          datetime(2015, 1, 2, 2, 30))
+        schedule = CronSchedule.parse('0 0 1 1 *')
+        self.assert_equal(schedule.next_fire(datetime(2015, 6, 1)),
+                          datetime(2016, 1, 1))
+        schedule = CronSchedule.parse('0 0 29 2 *')
+        self.assert_equal(schedule.next_fire(datetime(2097, 1, 1)),
+                          datetime(2104, 2, 29))
+        schedule = CronSchedule.parse('0 0 30 2 *')
+        self.assert_equal(schedule.next_fire(datetime(2015, 1, 1)), None)
+        self.assert_equal(CronSchedule.parse('@reboot').next_fire(
+            datetime(2015, 1, 1)), None)
+
+    def test_next_fire_day_rule(self):
+        # both restricted, either one matches
+        schedule = CronSchedule.parse('0 0 13 * fri')
+        self.assert_equal(schedule.next_fire(datetime(2015, 2, 1)),
+                          datetime(2015, 2, 6))
+        self.assert_equal(schedule.next_fire(datetime(2015, 2, 12)),
+                          datetime(2015, 2, 13))
+        # day of month is '*' like, both need to match
+        schedule = CronSchedule.parse('0 0 */2 * mon')
+        self.assert_equal(schedule.next_fire(datetime(2015, 2, 1)),
+                          datetime(2015, 2, 9))
+
+    def test_iter_fires(self):
+        schedule = CronSchedule.parse('0,30 9 * * 1-5')
+        fires = list(schedule.iter_fires(datetime(2015, 2, 13, 9, 0),
+                                         datetime(2015, 2, 17)))
+        self.assert_equal(fires, [datetime(2015, 2, 13, 9, 0),
+                                  datetime(2015, 2, 13, 9, 30),
+                                  datetime(2015, 2, 16, 9, 0),
+                                  datetime(2015, 2, 16, 9, 30)])
+        # fires before start in the same minute are not included
+        fires = list(schedule.iter_fires(datetime(2015, 2, 13, 9, 0, 30),
+                                         datetime(2015, 2, 13, 10)))
+        self.assert_equal(fires, [datetime(2015, 2, 13, 9, 30)])
+
+    def test_match(self):
+        schedule = CronSchedule.parse('*/10 * * * sat,sun')
+        self.assert_in(datetime(2015, 2, 14, 12, 20), schedule)
+        self.assert_not_in(datetime(2015, 2, 14, 12, 21), schedule)
+        self.assert_not_in(datetime(2015, 2, 13, 12, 20), schedule)
+
+    def test_job_schedule(self):
+        job = CommandJob('task', every='1.day', at='hour.12 minute.15')
+        self.assert_equal(job.schedule.next_fire(datetime(2015, 1, 1)),
+                          datetime(2015, 1, 1, 12, 15))
+        job = CommandJob('task', every='weekly')
+        self.assert_equal(job.schedule, CronSchedule.parse('0 0 * * 0'))
+
+    def test_job_raw_every_validation(self):
+        job = CommandJob('task', every='61 * * * *')
+        self.assert_raises(ParseError, lambda: job.cron)
+        job = CommandJob('task', every='0 1 2 3 4 5')
+        self.assert_raises(ParseError, lambda: job.cron)
+
+
+class RenderTestCase(BaseTestCase):
+
+    def render(self, time):
+        return CronSchedule.parse(time).render()
+
+    def test_render_field(self):
+        minute, day, week = FIELDS[0], FIELDS[2], FIELDS[4]
+        self.assert_equal(render_field(0b1111, minute), '0-3')
+        self.assert_equal(render_field(0b10101, minute), '0-4/2')
+        self.assert_equal(render_field(0b100, minute), '2')
+        self.assert_equal(render_field(0b1111111, week), '*')
+        self.assert_equal(render_field(0b1111111, week, False), '0-6')
+        self.assert_equal(render_field(0b1000001, week), '0,6')
+        days = sum(1 << i for i in range(1, 32, 2))
+        self.assert_equal(render_field(days, day, True), '*/2')
+        self.assert_equal(render_field(days, day, False), '1-31/2')
+
+    def test_render(self):
+        self.assert_equal(self.render(
+            '0,10,20,30,40,50 0,3,6,9,12,15,18,21 1 1,3,5,7,9,11 *'),
+            '*/10 */3 1 */2 *')
+        self.assert_equal(self.render('11,22,33,44,55 0 * * 1,2,3,4,5'),
+                          '11-55/11 0 * * 1-5')
+        self.assert_equal(self.render('*/2,5 * * * *'), '*/2,5 * * * *')
+        self.assert_equal(self.render('0 0 1-31 * 1'), '0 0 1-31 * 1')
+        self.assert_equal(self.render('0 0 * * 0-7'), '0 0 * * *')
+        self.assert_equal(self.render('@reboot'), '@reboot')
+
+    def test_merge(self):
+        schedule = CronSchedule.parse('0 12 * * *').merge(
+            CronSchedule.parse('0 13 * * *'))
+        self.assert_equal(schedule.render(), '0 12-13 * * *')
+        schedule = CronSchedule.parse('0 9 * * 1-5').merge(
+            CronSchedule.parse('0 9 * * 0,6'))
+        self.assert_equal(schedule.render(), '0 9 * * *')
+        # same minute would run twice
+        self.assert_equal(CronSchedule.parse('0,30 12 * * *').merge(
+            CronSchedule.parse('30 12 * * *')), None)
+        # differs in two fields
+        self.assert_equal(CronSchedule.parse('0 12 * * *').merge(
+            CronSchedule.parse('1 13 * * *')), None)
+        # either day field matches
+        self.assert_equal(CronSchedule.parse('0 0 1 * 1').merge(
+            CronSchedule.parse('0 0 1 * 2')), None)
+
+    def test_merge_schedules(self):
+        schedules = [CronSchedule.parse('0 %d * * *' % hour)
+                     for hour in range(8, 18)]
+        schedules.append(CronSchedule.parse('0 12 * * *'))
+        merged = merge_schedules(schedules)
+        self.assert_equal([s.render() for s in merged],
+                          ['0 8-17 * * *', '0 12 * * *'])
+
+    def test_merge_schedules_grid(self):
+        schedules = [CronSchedule.parse('%d %d * * *' % (minute, hour))
+                     for hour in range(24) for minute in range(60)]
+        merged = merge_schedules(schedules)
+        self.assert_equal([s.render() for s in merged], ['* * * * *'])
+        schedules = [CronSchedule.parse('%d %d * * *' % ((i * 7) % 60,
+                                                         i % 24))
+                     for i in range(3000)]
+        merged = merge_schedules(schedules)
+        fires = []
+        for schedule in merged:
+            fires.extend((hour, minute)
+                         for hour in bits_to_list(schedule.hours)
+                         for minute in bits_to_list(schedule.minutes))
+        self.assert_equal(sorted(fires), sorted((i % 24, (i * 7) % 60)
+                                                for i in range(3000)))
+        self.assert_true(len(merged) < len(schedules))
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(BasicTestCase))
+    suite.addTest(unittest.makeSuite(CronScheduleTestCase))
+    suite.addTest(unittest.makeSuite(RenderTestCase))
+    return suite
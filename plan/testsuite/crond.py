@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+    plan.testsuite.crond
+    ~~~~~~~~~~~~~~~~~~~~
+
+    Tests the cron directory output for Plan.
+
+    :copyright: (c) 2014 by Shipeng Feng.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from plan.testsuite import BaseTestCase
+from plan.core import Plan
+from plan.crond import CronDirectory
+
+
+class CronDirectoryTestCase(BaseTestCase):
+
+    def setup(self):
+        self.directory = tempfile.mkdtemp()
+
+    def teardown(self):
+        shutil.rmtree(self.directory)
+
+    def make_plan(self, name='main', **kwargs):
+        plan = Plan(name, user='deploy', crond=self.directory, **kwargs)
+        plan.env('MAILTO', 'admin@example.com')
+        plan.command('ls /tmp', every='1.day', at='12:00')
+        plan.command('date', every='weekly')
+        return plan
+
+    def test_write(self):
+        plan = self.make_plan()
+        self.assert_true(plan.write_crond())
+        with open(os.path.join(self.directory, 'main')) as f:
+            self.assert_equal(f.read(), """\
+# Begin Plan generated jobs for: main
+MAILTO="admin@example.com"
+0 12 * * * deploy ls /tmp
+@weekly deploy date
+# End Plan generated jobs for: main
+""")
+        mode = os.stat(os.path.join(self.directory, 'main')).st_mode
+        self.assert_equal(mode & 0o777, 0o644)
+        self.assert_false(plan.write_crond())
+        plan.jobs[0].at = '13:00'
+        self.assert_true(plan.write_crond())
+        self.assert_equal(os.listdir(self.directory), ['main'])
+
+    def test_compact(self):
+        plan = Plan(crond=CronDirectory(self.directory), user='root',
+                    compact=True)
+        plan.command('task', every='1.day', at='hour.12')
+        plan.command('task', every='1.day', at='hour.13')
+        lines = list(plan.crond.iter_lines(plan))
+        self.assert_equal(lines[1], '0 12-13 * * * root task')
+
+    def test_run(self):
+        plans = [self.make_plan('web.app'), self.make_plan('worker')]
+        for plan in plans:
+            plan.run('update')
+        self.assert_equal(sorted(os.listdir(self.directory)),
+                          ['web_app', 'worker'])
+        plans[0].run('clear')
+        self.assert_equal(os.listdir(self.directory), ['worker'])
+        self.assert_false(plans[0].clear_crond())
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(CronDirectoryTestCase))
+    return suite
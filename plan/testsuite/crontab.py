@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+    plan.testsuite.crontab
+    ~~~~~~~~~~~~~~~~~~~~~~
+
+    Tests the crontab cronfile index for Plan.
+
+    :copyright: (c) 2014 by Shipeng Feng.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import unittest
+
+from plan.testsuite import BaseTestCase
+from plan.core import Plan
+from plan.crontab import CrontabIndex, Block
+from plan.exceptions import PlanError
+
+
+CONTENT = """\
+# Begin Plan generated jobs for: a
+* * * * * a
+# End Plan generated jobs for: a
+* * * * * other
+# comment
+# Begin Plan generated jobs for: b.*
+* * * * * b
+# End Plan generated jobs for: b.*"""
+
+
+class CrontabIndexTestCase(BaseTestCase):
+
+    def test_blocks(self):
+        index = CrontabIndex(CONTENT)
+        self.assert_equal(index.names, ['a', 'b.*'])
+        a, b = index.blocks
+        self.assert_equal(a, Block('a', 0, CONTENT.index('\n* * * * * other'),
+                                   0, 2))
+        self.assert_equal(CONTENT[b.start:b.end], '\n'.join(
+            CONTENT.split('\n')[5:]))
+        self.assert_equal((b.first_line, b.last_line), (5, 7))
+        self.assert_equal(index.get('b'), None)
+        self.assert_equal(index.regions, [(0, 0), (a.end, b.start),
+                                          (b.end, b.end)])
+
+    def test_errors(self):
+        for content in ('# Begin Plan generated jobs for: a\n',
+                        '# End Plan generated jobs for: a\n',
+                        '# End Plan generated jobs for: a\n'
+                        '# Begin Plan generated jobs for: a\n'):
+            index = CrontabIndex(content)
+            self.assert_raises(PlanError, index.get, 'a')
+            self.assert_raises(PlanError, lambda: index.blocks)
+
+    def test_greedy(self):
+        content = ('# Begin Plan generated jobs for: a\n'
+                   '# End Plan generated jobs for: a\n'
+                   'x\n'
+                   '# End Plan generated jobs for: a\n')
+        block = CrontabIndex(content).get('a')
+        self.assert_equal(block.end, len(content) - 1)
+        self.assert_equal(block.last_line, 3)
+
+    def test_plan_name_with_metacharacters(self):
+        plan = Plan('b.*')
+        plan.command('b', every='1.day')
+        self.assert_equal(plan.find_block(CONTENT),
+                          CrontabIndex(CONTENT).get('b.*')[1:3])
+        self.assert_equal(Plan('b..').find_block(CONTENT), None)
+
+    def test_huge(self):
+        lines = ['* * * * * job%d' % i for i in range(100000)]
+        lines[50000:50000] = ['# Begin Plan generated jobs for: main',
+                              '# End Plan generated jobs for: main']
+        index = CrontabIndex('\n'.join(lines))
+        self.assert_equal(index.get('main')[3:], (50000, 50001))
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(CrontabIndexTestCase))
+    return suite
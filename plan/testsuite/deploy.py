@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+    plan.testsuite.deploy
+    ~~~~~~~~~~~~~~~~~~~~~
+
+    Tests the deployment for Plan.
+
+    :copyright: (c) 2014 by Shipeng Feng.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from click.testing import CliRunner
+
+from plan.testsuite import BaseTestCase
+from plan.core import Plan
+from plan.backends import SpoolBackend
+from plan.commands import deploy as deploy_command
+from plan.deploy import deploy, load_plans
+from plan.exceptions import PlanError
+
+
+class TestBackend(SpoolBackend):
+    """Spool backend failing for the user named broken."""
+
+    def write(self, lines, user=None):
+        if user == 'broken':
+            raise PlanError("couldn't write crontab")
+        SpoolBackend.write(self, lines, user)
+
+    def get_owner(self, user=None):
+        return None
+
+
+SCHEDULE = """\
+from plan import Plan
+from plan.testsuite.deploy import TestBackend
+
+cron = Plan('deploy', backend=TestBackend(%r))
+cron.command('date', every='1.day')
+
+if __name__ == "__main__":
+    raise SystemExit('should not run')
+"""
+
+
+class DeployTestCase(BaseTestCase):
+
+    def setup(self):
+        self.directory = tempfile.mkdtemp()
+        self.backend = TestBackend(self.directory)
+
+    def teardown(self):
+        shutil.rmtree(self.directory)
+
+    def make_plan(self, name):
+        plan = Plan(name, backend=self.backend)
+        plan.command(name, every='1.day')
+        return plan
+
+    def test_deploy(self):
+        plans = [self.make_plan('a'), self.make_plan('b')]
+        users = ['user%d' % i for i in range(20)] + ['broken']
+        results = deploy(dict((user, plans) for user in users), workers=4)
+        self.assert_equal([result.user for result in results], sorted(users))
+        failed = [result for result in results if not result.ok]
+        self.assert_equal([result.user for result in failed], ['broken'])
+        self.assert_in("couldn't write crontab", failed[0].error)
+        for result in results:
+            if result.ok:
+                self.assert_true(result.changed)
+                self.assert_in('0 0 * * * b', self.backend.read(result.user))
+        results = deploy({'user0': plans[0]}, workers=4)
+        self.assert_false(results[0].changed)
+        self.assert_true(results[0].seconds >= 0)
+
+    def test_clear(self):
+        plan = self.make_plan('a')
+        deploy({'user0': plan, 'user1': plan})
+        results = deploy({'user0': plan}, run_type='clear')
+        self.assert_true(results[0].changed)
+        self.assert_equal(self.backend.read('user0'), '')
+        self.assert_in('0 0 * * * a', self.backend.read('user1'))
+        results = deploy({'user0': plan}, run_type='run')
+        self.assert_false(results[0].ok)
+
+    def test_cli(self):
+        path = os.path.join(self.directory, 'schedule.py')
+        with open(path, 'w') as f:
+            f.write(SCHEDULE % self.directory)
+        self.assert_equal([plan.name for plan in load_plans(path)],
+                          ['deploy'])
+        runner = CliRunner()
+        result = runner.invoke(deploy_command, [path, '-u', 'alice',
+                                                '-u', 'broken'])
+        self.assert_equal(result.exit_code, 1)
+        self.assert_in('[message] alice updated', result.output)
+        self.assert_in('[fail] broken PlanError', result.output)
+        self.assert_in('0 0 * * * date', self.backend.read('alice'))
+        result = runner.invoke(deploy_command, [path])
+        self.assert_equal(result.exit_code, 2)
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(DeployTestCase))
+    return suite
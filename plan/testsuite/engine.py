@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""
+    plan.testsuite.engine
+    ~~~~~~~~~~~~~~~~~~~~~
+
+    Tests the in-process scheduler engine for Plan.
+
+    :copyright: (c) 2014 by Shipeng Feng.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import os
+import sys
+import time
+import threading
+import shutil
+import datetime
+import tempfile
+import unittest
+
+from plan.testsuite import BaseTestCase
+from plan.core import Plan
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+
+CALLS = []
+
+
+def record():
+    CALLS.append(threading.current_thread().name)
+
+
+def fail():
+    raise RuntimeError('failed')
+
+
+def report():
+    print('%s %s %s' % (os.getcwd(), os.environ['GREETING'], os.getppid()))
+
+
+HANG = threading.Event()
+
+
+def hang():
+    HANG.wait()
+
+
+def is_alive(pid):
+    """Tell whether one process is running, zombies are not."""
+    try:
+        with open('/proc/%d/stat' % pid) as f:
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except IOError:
+        pass
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+def make_clock(start):
+    """Get one clock starting at start and running in real time."""
+    began = time.time()
+
+    def clock():
+        return start + datetime.timedelta(seconds=time.time() - began)
+    return clock
+
+
+@unittest.skipIf(sys.version_info < (3, 5), 'the engine needs Python 3.5')
+class EngineTestCase(BaseTestCase):
+
+    def setup(self):
+        self.directory = tempfile.mkdtemp()
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def teardown(self):
+        asyncio.set_event_loop(None)
+        self.loop.close()
+        shutil.rmtree(self.directory)
+
+    def make_engine(self, plan, **kwargs):
+        from plan.engine import Engine
+        return Engine([plan], **kwargs)
+
+    def serve(self, engine, until):
+        """Serve until the until function returns True, stop the engine
+        then.
+        """
+        def check():
+            if until():
+                engine.stop()
+            else:
+                self.loop.call_later(0.01, check)
+        self.loop.call_soon(check)
+        self.loop.run_until_complete(asyncio.wait_for(engine.serve(), 10))
+
+    def test_heap(self):
+        plan = Plan()
+        for minute in range(1000):
+            plan.command('job%d' % minute, every='1.hour',
+                         at='minute.%d' % (minute % 60))
+        plan.command('boot', every='reboot')
+        engine = self.make_engine(plan)
+        now = datetime.datetime(2014, 6, 1, 12, 0, 30)
+        engine.schedule(now)
+        self.assert_equal(len(engine.heap), 1001)
+        self.assert_equal(engine.next_fire, now)
+        self.assert_equal([run.job.task for run in engine.pop_due(now)],
+                          ['boot'])
+        self.assert_equal(engine.next_fire, datetime.datetime(2014, 6, 1,
+                                                              12, 1))
+        runs = engine.pop_due(datetime.datetime(2014, 6, 1, 12, 1, 0, 5))
+        self.assert_equal(len(runs), 17)
+        self.assert_equal(len(engine.heap), 1000)
+        # every job ran late once, missed runs are skipped
+        later = datetime.datetime(2014, 6, 1, 20, 30)
+        runs = engine.pop_due(later)
+        self.assert_equal(len(runs), 1000)
+        self.assert_equal(len(engine.heap), 1000)
+        self.assert_true(all(fire > later for fire, _, _, _ in engine.heap))
+
+    def test_seconds(self):
+        plan = Plan()
+        plan.command('fast', every='15.second')
+        plan.command('slow', every='7.second')
+        plan.command('minute', every='1.minute')
+        engine = self.make_engine(plan)
+        now = datetime.datetime(2014, 6, 1, 12, 0, 50, 300)
+        engine.schedule(now)
+        self.assert_equal(len(engine.heap), 1)
+        self.assert_equal(len(engine.wheel), 2)
+        # the wheel ticks every second
+        self.assert_equal(engine.next_fire, datetime.datetime(2014, 6, 1,
+                                                              12, 0, 51))
+        fires = []
+        for second in range(1, 60):
+            now = datetime.datetime(2014, 6, 1, 12, 0, 50, 300) + \
+                datetime.timedelta(seconds=second)
+            fires.extend((run.job.task, run.scheduled.second)
+                         for run in engine.pop_due(now))
+        self.assert_equal(fires, [
+            ('slow', 56), ('minute', 0), ('fast', 0), ('slow', 0),
+            ('slow', 7), ('slow', 14), ('fast', 15), ('slow', 21),
+            ('slow', 28), ('fast', 30), ('slow', 35), ('slow', 42),
+            ('fast', 45), ('slow', 49)])
+        self.assert_equal(engine.wheel.ticks, 59)
+        # ticks missed while asleep are skipped
+        now = datetime.datetime(2014, 6, 1, 12, 5, 20)
+        runs = engine.pop_due(now)
+        self.assert_equal(sorted(run.job.task for run in runs),
+                          ['fast', 'minute', 'slow'])
+        self.assert_equal(engine.wheel.lag, 0)
+        self.assert_true(engine.wheel.max_lag > 200)
+        self.assert_equal(engine.next_fire, datetime.datetime(2014, 6, 1,
+                                                              12, 5, 21))
+
+    def test_serve(self):
+        path = self.directory + '/out'
+        plan = Plan(path=self.directory)
+        plan.env('GREETING', 'hello')
+        plan.env('MAILTO', None)
+        plan.env('RETRIES', 3)
+        plan.command('echo $GREETING ${MAILTO-unset} $RETRIES',
+                     every='1.minute', output=dict(stdout=path))
+        plan.command('exit 3', every='reboot')
+        engine = self.make_engine(plan, clock=make_clock(
+            datetime.datetime(2014, 6, 1, 11, 59, 59, 800000)))
+        self.serve(engine, lambda: engine.finished == 2)
+        self.assert_equal(engine.started, 2)
+        self.assert_equal(engine.failed, 1)
+        self.assert_equal(engine.running, [])
+        with open(path) as f:
+            self.assert_equal(f.read(), 'hello unset 3\n')
+
+    def test_function(self):
+        path = self.directory + '/out'
+        plan = Plan(path=self.directory)
+        plan.env('GREETING', 'hello')
+        plan.env('MAILTO', None)
+        plan.function(record, every='reboot')
+        plan.function('plan.testsuite.engine:fail', every='reboot')
+        plan.function(report, every='reboot', isolation='fork',
+                      output=dict(stdout=path))
+        plan.function(fail, every='reboot', isolation='fork', output='null')
+        del CALLS[:]
+        engine = self.make_engine(plan)
+        self.serve(engine, lambda: engine.finished == 4)
+        self.assert_equal(len(CALLS), 1)
+        self.assert_true(CALLS[0] != threading.current_thread().name)
+        self.assert_equal(engine.failed, 2)
+        with open(path) as f:
+            self.assert_equal(f.read(), '%s hello %d\n' % (
+                os.path.realpath(self.directory), os.getpid()))
+
+    def test_concurrency(self):
+        path = self.directory + '/out'
+        plan = Plan()
+        for index in range(3):
+            plan.command('echo start >> %s; sleep 0.2; echo end >> %s' %
+                         (path, path), every='reboot')
+        engine = self.make_engine(plan, concurrency=1)
+        self.serve(engine, lambda: engine.finished == 3)
+        with open(path) as f:
+            self.assert_equal(f.read().split(), ['start', 'end'] * 3)
+
+    def test_shutdown(self):
+        plan = Plan()
+        plan.command('sleep 30', every='reboot')
+        engine = self.make_engine(plan, grace=0.1)
+        runs = []
+
+        def started():
+            runs.extend(run for run in engine.running if run.pid)
+            return runs
+        start = time.time()
+        self.serve(engine, started)
+        run = runs[0]
+        self.assert_true(time.time() - start < 5)
+        self.assert_true(run.returncode < 0)
+        self.assert_equal(engine.running, [])
+
+    def test_shutdown_process_group(self):
+        path = self.directory + '/pid'
+        plan = Plan()
+        plan.command('sleep 30 & echo $! > %s; wait' % path, every='reboot')
+        engine = self.make_engine(plan, grace=0.1)
+        self.serve(engine, lambda: os.path.exists(path) and
+                   os.path.getsize(path))
+        with open(path) as f:
+            pid = int(f.read())
+        deadline = time.time() + 5
+        while is_alive(pid) and time.time() < deadline:
+            time.sleep(0.05)
+        self.assert_false(is_alive(pid))
+
+    def test_shutdown_thread(self):
+        plan = Plan()
+        plan.function(hang, every='reboot')
+        engine = self.make_engine(plan, grace=0.1)
+        HANG.clear()
+        try:
+            start = time.time()
+            self.serve(engine, lambda: engine.running)
+            self.assert_true(time.time() - start < 5)
+        finally:
+            HANG.set()
+        self.assert_equal(len(engine.abandoned), 1)
+        self.assert_equal(engine.abandoned[0].error, 'abandoned')
+        self.assert_equal(engine.running, [])
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(EngineTestCase))
+    return suite
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+    plan.testsuite.imports
+    ~~~~~~~~~~~~~~~~~~~~~~
+
+    Tests the import cost of Plan.
+
+    :copyright: (c) 2014 by Shipeng Feng.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import os
+import sys
+import unittest
+import subprocess
+
+from plan.testsuite import BaseTestCase
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+# the Plan modules needed to define jobs and render the cron content
+EAGER_MODULES = set(['plan', 'plan.core', 'plan.job', 'plan.cron',
+                     'plan.crontab', 'plan.utils', 'plan.output', 'plan.cost',
+                     'plan.exceptions', 'plan._compat'])
+
+# modules only needed when writing crontabs or using the command line
+DEFERRED_MODULES = ('click', 'subprocess', 'tempfile', 'shlex', 'getpass',
+                    'hashlib', 'queue', 'asyncio', 'signal')
+
+
+def imported_modules(statement):
+    """Run statement in one new interpreter with ``-X importtime``.
+
+    :return: the set of modules imported by statement.
+    """
+    environ = dict(os.environ)
+    environ['PYTHONPATH'] = ROOT
+    p = subprocess.Popen([sys.executable, '-X', 'importtime', '-c',
+                          statement], stdout=subprocess.PIPE,
+                         stderr=subprocess.PIPE, env=environ)
+    output, error = p.communicate()
+    modules = set()
+    for line in error.decode('utf-8').splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            modules.add(parts[2].strip())
+    return modules
+
+
+@unittest.skipIf(sys.version_info < (3, 7), '-X importtime needs Python 3.7')
+class ImportTestCase(BaseTestCase):
+
+    def test_import(self):
+        modules = imported_modules('import plan')
+        self.assert_equal(set(module for module in modules
+                              if module.startswith('plan')), EAGER_MODULES)
+        for module in DEFERRED_MODULES:
+            self.assert_not_in(module, modules)
+
+    def test_cron_content(self):
+        modules = imported_modules('from plan import Plan;'
+                                   'plan = Plan(spread=True);'
+                                   'plan.command("ls", every="1.day");'
+                                   'plan.cron_content')
+        for module in ('click', 'subprocess', 'tempfile', 'plan.backends'):
+            self.assert_not_in(module, modules)
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(ImportTestCase))
+    return suite
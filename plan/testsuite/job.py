@@ -9,12 +9,16 @@
     :license: BSD, see LICENSE for more details.
 """
 
+import os
 import sys
 import unittest
 
 from plan.testsuite import BaseTestCase
 from plan.job import is_month, is_week, get_frequency, get_moment
+from plan.job import normalize_at, ParseCache, parse_cache, MINUTE, HOUR
 from plan.job import Job, CommandJob, ScriptJob, ModuleJob, RawJob
+from plan.job import FunctionJob, function_task, load_function
+from plan.job import INTERNED_ENVIRONMENTS, INTERNED_COSTS, MAX_INTERNED
 from plan.exceptions import ParseError, ValidationError
 
 
@@ -39,10 +43,12 @@ class BasicTestCase(BaseTestCase):
     def test_get_frequency(self):
         self.assert_equal(3, get_frequency('3.month'))
         self.assert_equal(3, get_frequency('3.'))
+        self.assert_raises(ParseError, get_frequency, 'x.day')
 
     def test_get_moment(self):
         self.assert_equal(3, get_moment('day.3'))
         self.assert_equal(3, get_moment('.3'))
+        self.assert_raises(ParseError, get_moment, 'hour.x')
 
 
 class JobTestCase(BaseTestCase):
@@ -87,6 +93,19 @@ class JobTestCase(BaseTestCase):
         job = CommandJob('task', every='11.minute')
         self.assert_equal(job.cron, '11,22,33,44,55 * * * * task')
 
+    def test_second_every(self):
+        job = CommandJob('task', every='15.second')
+        self.assert_equal(job.second_frequency, 15)
+        self.assert_equal(CommandJob('task', every='1.minute')
+                          .second_frequency, None)
+        self.assert_raises(ValidationError, lambda: job.cron)
+        job = CommandJob('task', every='0.second')
+        self.assert_raises(ParseError, lambda: job.second_frequency)
+        job = CommandJob('task', every='61.second')
+        self.assert_raises(ParseError, lambda: job.second_frequency)
+        job = CommandJob('task', every='1.second', at='minute.1')
+        self.assert_raises(ValidationError, lambda: job.cron)
+
     def test_hour_every(self):
         job = CommandJob('task', every='1.hour')
         self.assert_equal(job.cron, '0 * * * * task')
@@ -284,13 +303,190 @@ class JobTestCase(BaseTestCase):
         self.assert_equal(job.cron, '0 0 * * * key=value %s -m calendar'
                                     ' > /dev/null 2>&1' % sys.executable)
 
+    def test_zygote(self):
+        job = ScriptJob('script.py', every='1.day', path='/tmp',
+                        zygote='/run/plan zygote.sock')
+        self.assert_equal(job.cron, "0 0 * * * cd /tmp && %s -m plan.zygote "
+                          "'/run/plan zygote.sock' script.py" %
+                          sys.executable)
+        job = ModuleJob('calendar', every='1.day', zygote='/run/zygote.sock')
+        self.assert_equal(job.cron, '0 0 * * * %s -m plan.zygote '
+                          '/run/zygote.sock -m calendar' % sys.executable)
+
     def test_raw_job(self):
         job = RawJob('raw ????  my job', every='1.day')
         self.assert_equal(job.cron, '0 0 * * * raw ???? my job')
 
 
+class FunctionJobTestCase(BaseTestCase):
+
+    def test_function_task(self):
+        self.assert_equal(function_task(get_frequency),
+                          'plan.job:get_frequency')
+        self.assert_equal(function_task('os.path:join'), 'os.path:join')
+        self.assert_true(load_function('os.path:join') is os.path.join)
+        self.assert_true(load_function('plan.job:Job.invalidate') is
+                         Job.invalidate)
+        self.assert_raises(ValueError, function_task, lambda: None)
+
+    def test_function_job(self):
+        job = FunctionJob(get_frequency, every='1.day', path='/tmp',
+                          output='null')
+        self.assert_true(job.load() is get_frequency)
+        self.assert_equal(job.cron, "0 0 * * * cd /tmp && %s -c 'from "
+                          "plan.job import call_function; call_function("
+                          "'\"'\"'plan.job:get_frequency'\"'\"')' "
+                          "> /dev/null 2>&1" % sys.executable)
+        job = FunctionJob('os.path:join', every='1.day')
+        self.assert_true(job.load() is os.path.join)
+        self.assert_equal(job.isolation, 'thread')
+        self.assert_raises(ValueError, FunctionJob, 'os.path:join',
+                           every='1.day', isolation='process')
+
+
+class ParseCacheTestCase(BaseTestCase):
+
+    def setup(self):
+        parse_cache.clear()
+
+    def test_normalize_at(self):
+        self.assert_equal(normalize_at(None), None)
+        self.assert_equal(normalize_at(''), None)
+        self.assert_equal(normalize_at(' hour.1  minute.2 '),
+                          'hour.1 minute.2')
+
+    def test_shared_results(self):
+        for i in range(10):
+            job = CommandJob('task%d' % i, every='1.day', at='12:15')
+            self.assert_equal(job.cron, '15 12 * * * task%d' % i)
+        job = CommandJob('task', every='1.day', at='12:15  ')
+        self.assert_equal(job.cron, '15 12 * * * task')
+        self.assert_equal(parse_cache.misses, 1)
+        self.assert_equal(parse_cache.hits, 10)
+
+    def test_shared_between_job_types(self):
+        CommandJob('task', every='1.day', at='12:15').cron
+        ScriptJob('task.py', every='1.day', at='12:15').cron
+        self.assert_equal(parse_cache.misses, 1)
+
+    def test_year_every(self):
+        for i in range(2):
+            job = CommandJob('task', every='1.year')
+            self.assert_equal(job.cron, '0 0 1 1 * task')
+            self.assert_equal(job.every, '1.year')
+
+    def test_cached_error(self):
+        for i in range(3):
+            job = CommandJob('task', every='1.minute', at='minute.1')
+            self.assert_raises(ValidationError, lambda: job.cron)
+        self.assert_equal(parse_cache.info(),
+                          dict(hits=2, misses=1, size=1, maxsize=4096))
+
+    def test_bounded(self):
+        cache = ParseCache(maxsize=2)
+        cache.get('a', lambda: 'a')
+        cache.get('b', lambda: 'b')
+        cache.get('a', lambda: 'a')
+        cache.get('c', lambda: 'c')
+        self.assert_equal(list(cache.results), ['a', 'c'])
+        self.assert_raises(ParseError, cache.get, 'd',
+                           lambda: CommandJob('t', every='x').parse_every())
+        self.assert_equal(list(cache.results), ['c', 'd'])
+
+
+class CompactJobTestCase(BaseTestCase):
+
+    def test_no_instance_dict(self):
+        for job_class in (CommandJob, ScriptJob, ModuleJob, RawJob,
+                          FunctionJob):
+            job = job_class('task:main', every='1.day')
+            self.assert_false(hasattr(job, '__dict__'))
+            self.assert_raises(AttributeError, setattr, job, 'other', 1)
+
+    def test_shared_values(self):
+        jobs = [CommandJob('task', every=''.join(['1.', 'day']),
+                           environment={'ENV': 'production'},
+                           output=dict(stdout='/tmp/out.log'), cost=3)
+                for i in range(2)]
+        first, second = jobs
+        self.assert_true(first.every is second.every)
+        self.assert_true(first.environment is second.environment)
+        self.assert_true(first.output is second.output)
+        self.assert_true(first.cost is second.cost)
+        job = CommandJob('task', every='1.day',
+                         environment={'ENV': 'staging'})
+        self.assert_equal(job.environment, {'ENV': 'staging'})
+        self.assert_true(job.environment is not first.environment)
+
+    def test_shared_environment_copy(self):
+        environment = {'ENV': 'qa'}
+        job = CommandJob('task', every='1.day', environment=environment)
+        line = job.cron
+        environment['ENV'] = 'changed'
+        self.assert_equal(job.environment, {'ENV': 'qa'})
+        self.assert_equal(job.cron, line)
+
+    def test_intern_tables_bounded(self):
+        for i in range(MAX_INTERNED + 10):
+            CommandJob('task', every='1.day', environment={'ID': str(i)},
+                       cost=i + 1)
+        self.assert_true(len(INTERNED_ENVIRONMENTS) <= MAX_INTERNED)
+        self.assert_true(len(INTERNED_COSTS) <= MAX_INTERNED)
+
+    def test_default_moments(self):
+        job = CommandJob('task', every='1.day')
+        job.default_moments = {MINUTE: '30', HOUR: '2'}
+        self.assert_equal(job.cron, '30 2 * * * task')
+        self.assert_equal(CommandJob('task', every='1.day').cron,
+                          '0 0 * * * task')
+
+
+class RenderCacheTestCase(BaseTestCase):
+
+    def test_cached_line(self):
+        job = CommandJob('task', every='1.day')
+        self.assert_true(job.cron is job.cron)
+        job.every = '1.day'
+        self.assert_true(job._cron is not None)
+
+    def test_invalidate_on_change(self):
+        job = CommandJob('task', every='1.day')
+        self.assert_equal(job.cron, '0 0 * * * task')
+        job.at = 'hour.2'
+        self.assert_equal(job.cron, '0 2 * * * task')
+        job.output = '> /tmp/out.log'
+        self.assert_equal(job.cron, '0 2 * * * task > /tmp/out.log')
+        job.default_moments = {MINUTE: '7', HOUR: '0'}
+        self.assert_equal(job.cron, '7 2 * * * task > /tmp/out.log')
+
+    def test_invalidate(self):
+        environment = {'A': 'a'}
+        job = ModuleJob('calendar', every='1.day', environment=environment)
+        self.assert_in('A=a', job.cron)
+        job.environment['A'] = 'b'
+        self.assert_in('A=a', job.cron)
+        job.invalidate()
+        self.assert_in('A=b', job.cron)
+
+    def test_subclass(self):
+        class DeployJob(CommandJob):
+            def __init__(self, task, every, release):
+                self.release = release
+                self.every = every
+                CommandJob.__init__(self, '%s %s' % (task, release), every)
+
+        job = DeployJob('deploy', '1.day', 'v1')
+        self.assert_equal(job.cron, '0 0 * * * deploy v1')
+        job.at = 'hour.3'
+        self.assert_equal(job.cron, '0 3 * * * deploy v1')
+
+
 def suite():
     suite = unittest.TestSuite()
     suite.addTest(unittest.makeSuite(BasicTestCase))
     suite.addTest(unittest.makeSuite(JobTestCase))
+    suite.addTest(unittest.makeSuite(FunctionJobTestCase))
+    suite.addTest(unittest.makeSuite(ParseCacheTestCase))
+    suite.addTest(unittest.makeSuite(CompactJobTestCase))
+    suite.addTest(unittest.makeSuite(RenderCacheTestCase))
     return suite
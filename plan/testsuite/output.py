@@ -11,7 +11,7 @@
 
 import unittest
 
-from plan.output import Output
+from plan.output import Output, parse_output
 from plan.testsuite import BaseTestCase
 
 
@@ -47,6 +47,17 @@ class OutputTestCase(BaseTestCase):
         output = Output(1)
         self.assert_raises(TypeError, output.__str__)
 
+    def test_parse_output(self):
+        self.assert_equal(parse_output(''), [])
+        self.assert_equal(parse_output(str(Output('null'))),
+                          [('StandardOutput', 'null'),
+                           ('StandardError', 'null')])
+        output = str(Output(dict(stdout='/t/out.log')))
+        self.assert_equal(parse_output(output),
+                          [('StandardOutput', 'append:/t/out.log'),
+                           ('StandardError', 'null')])
+        self.assert_equal(parse_output('| logger'), None)
+
 
 def suite():
     suite = unittest.TestSuite()
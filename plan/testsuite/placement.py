@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+    plan.testsuite.placement
+    ~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Tests the job placement for Plan.
+
+    :copyright: (c) 2014 by Shipeng Feng.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import unittest
+from datetime import datetime
+
+from plan.testsuite import BaseTestCase
+from plan.core import Plan
+from plan.job import CommandJob, MINUTE, HOUR, parse_cache
+from plan.placement import free_moments, job_identity, spread, placeable
+from plan.placement import parse_window, place
+from plan.exceptions import ParseError
+
+
+class SpreadTestCase(BaseTestCase):
+
+    def test_free_moments(self):
+        self.assert_equal(free_moments(CommandJob('t', every='1.minute')), ())
+        self.assert_equal(free_moments(CommandJob('t', every='1.hour')),
+                          (MINUTE,))
+        self.assert_equal(free_moments(CommandJob('t', every='1.day')),
+                          (MINUTE, HOUR))
+        self.assert_equal(free_moments(CommandJob('t', every='1.day',
+                                                  at='hour.3')), (MINUTE,))
+        self.assert_equal(free_moments(CommandJob('t', every='monday',
+                                                  at='12:30')), ())
+        self.assert_equal(free_moments(CommandJob('t', every='0 * * * *')),
+                          ())
+        self.assert_equal(free_moments(CommandJob('t', every='daily')), ())
+        self.assert_equal(free_moments(CommandJob('t', every='1.century')),
+                          ())
+
+    def test_job_identity(self):
+        self.assert_equal(job_identity(CommandJob('t', every='1.day')),
+                          job_identity(CommandJob('t', every='1.day')))
+        self.assert_true(job_identity(CommandJob('t', every='1.day')) !=
+                         job_identity(CommandJob('t', every='2.day')))
+
+    def test_spread_plan(self):
+        plan = Plan(spread=True)
+        plan.command('pinned', every='1.hour', at='minute.0')
+        for i in range(60):
+            plan.command('hourly%d' % i, every='1.hour')
+        plan.command('daily', every='1.day', at='hour.3')
+        lines = plan.cron_content.splitlines()[1:-1]
+        self.assert_equal(lines[0], '0 * * * * pinned')
+        minutes = [line.split()[0] for line in lines[1:61]]
+        # 59 hourly jobs fill the free minutes, the last one shares one
+        self.assert_equal(len(set(minutes)), 60)
+        self.assert_equal(minutes.count('0'), 1)
+        self.assert_equal(lines[-1].split()[1:], ['3', '*', '*', '*', 'daily'])
+        self.assert_equal(plan.cron_content, plan.cron_content)
+        # spreading again keeps the rendered lines
+        job = plan.jobs[1]
+        line = job.cron
+        plan.cron_content
+        self.assert_true(job.cron is line)
+
+    def test_spread_memoized(self):
+        plan = Plan(spread=True)
+        for i in range(20):
+            plan.command('job%d' % i, every='1.day')
+        plan.cron_content
+        key = plan.spread_key
+        plan.cron_content
+        self.assert_true(plan.spread_key is key)
+        plan.jobs[0].at = 'hour.5'
+        plan.cron_content
+        self.assert_true(plan.spread_key != key)
+        self.assert_equal(plan.jobs[0].cron.split()[1], '5')
+
+    def test_spread_parse_cache(self):
+        parse_cache.clear()
+        plan = Plan(spread=True)
+        for i in range(100):
+            plan.command('job%d' % i, every='1.day')
+        plan.cron_content
+        self.assert_equal(len(set(job.cron.split()[0] + job.cron.split()[1]
+                                  for job in plan.jobs)), 100)
+        # one time template and one schedule for all of them
+        self.assert_equal(parse_cache.info()['size'], 2)
+        for job in plan.jobs:
+            fire = job.schedule.next_fire(datetime(2015, 1, 1))
+            self.assert_equal(job.cron.split()[:2],
+                              [str(fire.minute), str(fire.hour)])
+
+    def test_spread_stable(self):
+        def render(order):
+            plan = Plan(spread=True)
+            for i in order:
+                plan.command('job%d' % i, every='1.day')
+            return sorted(plan.cron_content.splitlines())
+        self.assert_equal(render(range(10)), render(reversed(range(10))))
+
+    def test_spread_daily(self):
+        jobs = [CommandJob('job%d' % i, every='1.day') for i in range(30)]
+        spread(jobs)
+        moments = set(tuple(job.cron.split()[:2]) for job in jobs)
+        self.assert_equal(len(moments), 30)
+
+    def test_no_spread(self):
+        plan = Plan()
+        plan.command('job', every='1.day')
+        self.assert_equal(plan.crons, ['0 0 * * * job'])
+
+
+class PlaceTestCase(BaseTestCase):
+
+    def test_placeable(self):
+        self.assert_true(placeable(CommandJob('t', every='1.day')))
+        self.assert_true(placeable(CommandJob('t', every='monday')))
+        self.assert_false(placeable(CommandJob('t', every='1.hour')))
+        self.assert_false(placeable(CommandJob('t', every='1.day',
+                                               at='hour.1')))
+
+    def test_parse_window(self):
+        self.assert_equal(len(parse_window(None)), 1440)
+        self.assert_equal(parse_window('01:00-01:03'), [60, 61, 62])
+        self.assert_equal(parse_window('23:58-00:02'),
+                          [1438, 1439, 0, 1])
+        self.assert_equal(parse_window('23:58-24:00'), [1438, 1439])
+        for window in ('1:00', '25:00-26:00', '01:60-02:00', 'a-b'):
+            self.assert_raises(ParseError, parse_window, window)
+
+    def test_place(self):
+        plan = Plan()
+        plan.command('pinned', every='1.day', at='2:00',
+                     cost=dict(duration=60, cpu=2))
+        for i in range(3):
+            plan.command('etl%d' % i, every='1.day', cost=40,
+                         window='01:00-04:00')
+        report = plan.place()
+        self.assert_equal(report.peak, 2)
+        self.assert_equal(len(report.moments), 3)
+        starts = []
+        for job in plan.jobs[1:]:
+            minute, hour = map(int, job.cron.split()[:2])
+            starts.append(hour * 60 + minute)
+        for start in starts:
+            # inside the window, never overlapping the pinned job
+            self.assert_true(60 <= start < 240)
+            self.assert_true(start + 40 <= 120 or start >= 180)
+        self.assert_equal(max(report.load), 2)
+
+    def test_place_runs_inside_window(self):
+        plan = Plan()
+        for i in range(4):
+            plan.command('etl%d' % i, every='1.day', cost=40,
+                         window='01:00-02:00')
+        plan.command('long', every='1.day', cost=90, window='03:00-03:30')
+        plan.place()
+        for job in plan.jobs:
+            minute, hour = map(int, job.cron.split()[:2])
+            start = hour * 60 + minute
+            if job.task == 'long':
+                self.assert_true(180 <= start < 210)
+            else:
+                self.assert_true(60 <= start and start + 40 <= 120)
+
+    def test_place_stable_with_spread(self):
+        def render():
+            plan = Plan(spread=True)
+            plan.command('hourly', every='1.hour', cost=10)
+            plan.command('daily', every='1.day', at='hour.1', cost=30)
+            for i in range(4):
+                plan.command('etl%d' % i, every='1.day',
+                             cost=dict(duration=30, cpu=2))
+            report = plan.place(resource='cpu', step=1)
+            return report.peak, plan.cron_content
+        self.assert_equal(render(), render())
+
+    def test_place_resource(self):
+        self.assert_raises(ValueError, place, [], 'disk')
+        report = place([CommandJob('t', every='1.day',
+                                   cost=dict(memory=3))], 'memory')
+        self.assert_equal(report.peak, 3)
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(SpreadTestCase))
+    suite.addTest(unittest.makeSuite(PlaceTestCase))
+    return suite
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+    plan.testsuite.profile
+    ~~~~~~~~~~~~~~~~~~~~~~
+
+    Tests the load profile for Plan.
+
+    :copyright: (c) 2014 by Shipeng Feng.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import unittest
+from datetime import datetime, timedelta
+
+from plan.testsuite import BaseTestCase
+from plan.core import Plan
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class LoadProfileTestCase(BaseTestCase):
+
+    def setup(self):
+        self.plan = Plan()
+        self.plan.command('hourly', every='1.hour')
+        self.plan.command('daily', every='1.day')
+        self.plan.command('noon', every='1.day', at='12:00')
+        self.plan.command('weekday', every='weekday', at='12:00')
+        self.plan.command('raw', every='*/20 * 13 * fri')
+
+    def test_counts(self):
+        # 2015-02-09 is Monday
+        profile = self.plan.load_profile(days=7, start=datetime(2015, 2, 9))
+        self.assert_equal(profile.minutes, 7 * 1440)
+        self.assert_equal(int(profile.counts.sum()),
+                          7 * 24 + 7 + 7 + 5 + 72)
+        # 2015-02-13 is Friday the 13th
+        self.assert_equal(profile.peak, 4)
+        self.assert_equal(profile.peak_minutes, [datetime(2015, 2, 13, 12)])
+
+    def test_matrix(self):
+        start = datetime(2015, 2, 9)
+        profile = self.plan.load_profile(days=7, start=start)
+        matrix = profile.matrix
+        self.assert_equal(matrix.shape, (5, 7 * 1440))
+        for row, job in zip(matrix, self.plan.jobs):
+            for index in row.nonzero()[0]:
+                self.assert_true(job.schedule.match(profile.time(index)))
+            fires = list(job.schedule.iter_fires(start,
+                                                 start + timedelta(days=7)))
+            self.assert_equal(len(fires), int(row.sum()))
+
+    def test_jobs_at(self):
+        profile = self.plan.load_profile(days=7, start=datetime(2015, 2, 9))
+        jobs = profile.jobs_at(datetime(2015, 2, 13, 0, 0))
+        self.assert_equal([job.task for job in jobs],
+                          ['hourly', 'daily', 'raw'])
+        time, count, jobs = profile.peaks(limit=1)[0]
+        self.assert_equal(time, datetime(2015, 2, 13, 12))
+        self.assert_equal(count, 4)
+        self.assert_equal([job.task for job in jobs],
+                          ['hourly', 'noon', 'weekday', 'raw'])
+        time, count, jobs = profile.peaks(limit=2)[1]
+        self.assert_equal(time, datetime(2015, 2, 9, 12))
+        self.assert_equal(count, 3)
+
+    def test_empty_plan(self):
+        profile = Plan().load_profile(days=1, start=datetime(2015, 2, 9))
+        self.assert_equal(profile.peak, 0)
+        self.assert_equal(profile.peak_minutes, [])
+        self.assert_equal(profile.peaks(), [])
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(LoadProfileTestCase))
+    return suite
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+    plan.testsuite.simulation
+    ~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Tests the simulation for Plan.
+
+    :copyright: (c) 2014 by Shipeng Feng.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import unittest
+from datetime import datetime
+
+import click
+from click.testing import CliRunner
+
+from plan.testsuite import BaseTestCase
+from plan.core import Plan
+from plan.job import CommandJob
+from plan.simulation import get_duration
+
+
+class SimulationTestCase(BaseTestCase):
+
+    def setup(self):
+        self.plan = Plan()
+        self.plan.command('poll', every='10.minute', cost=15)
+        self.plan.command('etl', every='1.day', at='1:00',
+                          cost=dict(duration=60, cpu=4))
+        self.plan.command('report', every='1.day', at='1:30')
+
+    def test_get_duration(self):
+        job = CommandJob('task', every='1.day', cost=5)
+        self.assert_equal(get_duration(job, 0, {}), 5)
+        self.assert_equal(get_duration(job, 0, {'task': 3}), 3)
+        self.assert_equal(get_duration(job, 0, {0: [3, 9, 4]}), 9)
+        self.assert_equal(get_duration(job, 0, [7]), 7)
+        self.assert_equal(get_duration(job, 0, {job: 2, 'task': 3}), 2)
+
+    def test_simulate(self):
+        report = self.plan.simulate(datetime(2015, 2, 9),
+                                    datetime(2015, 2, 10))
+        # poll overlaps itself, etl and report both run at 01:30
+        self.assert_equal(report.peak, 4)
+        self.assert_equal(report.peak_time, datetime(2015, 2, 9, 1, 30))
+        self.assert_equal([job.task for job in report.peak_jobs],
+                          ['poll', 'etl', 'report'])
+        self.assert_equal(report.peak_cpu, 7)
+        self.assert_equal([(job.task, runs) for job, runs in report.runs],
+                          [('poll', 144), ('etl', 1), ('report', 1)])
+        self.assert_equal([(job.task, overlaps)
+                           for job, overlaps in report.overlaps],
+                          [('poll', 144)])
+        # poll runs 1.5 in average, etl 60 minutes of 4 cpu, report 1 minute
+        self.assert_equal(report.cpu_demand,
+                          (144 * 15 + 60 * 4 + 1) / 1440.0)
+
+    def test_simulate_durations(self):
+        report = self.plan.simulate(datetime(2015, 2, 9),
+                                    datetime(2015, 2, 10),
+                                    durations={'poll': [2, 5], 1: 20})
+        self.assert_equal(report.peak, 2)
+        self.assert_equal(report.overlaps, [])
+
+    def test_simulate_zero_durations(self):
+        report = self.plan.simulate(datetime(2015, 2, 9),
+                                    datetime(2015, 2, 10),
+                                    durations={'poll': [0, 0], 1: 0})
+        self.assert_equal(report.peak, 1)
+        self.assert_equal([job.task for job in report.peak_jobs], ['report'])
+        self.assert_equal([(job.task, runs) for job, runs in report.runs],
+                          [('poll', 144), ('etl', 1), ('report', 1)])
+        self.assert_equal(report.overlaps, [])
+
+    def test_check_max_concurrency(self):
+        self.plan.max_concurrency = 2
+        result = CliRunner().invoke(self.make_command(self.plan))
+        self.assert_in('[fail] peak concurrency 4 exceeds max_concurrency 2',
+                       result.output)
+        self.assert_in('[message] poll overlaps with its previous run',
+                       result.output)
+
+    def make_command(self, plan):
+        @click.command()
+        def command():
+            plan.run('check')
+        return command
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(SimulationTestCase))
+    return suite
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+    plan.testsuite.systemd
+    ~~~~~~~~~~~~~~~~~~~~~~
+
+    Tests the systemd timer output for Plan.
+
+    :copyright: (c) 2014 by Shipeng Feng.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+from plan.testsuite import BaseTestCase
+from plan.core import Plan
+from plan.cron import CronSchedule
+from plan.job import CommandJob, ModuleJob, RawJob
+from plan.systemd import on_calendar, on_calendar_seconds, service_settings
+from plan.systemd import SystemdDirectory
+from plan.exceptions import ValidationError
+
+
+class CalendarTestCase(BaseTestCase):
+
+    def calendar(self, time):
+        return on_calendar(CronSchedule.parse(time))
+
+    def test_on_calendar(self):
+        self.assert_equal(self.calendar('0 12 * * *'), ['*-*-* 12:00:00'])
+        self.assert_equal(self.calendar('*/15 9-17 * * 1-5'),
+                          ['Mon..Fri *-*-* 09..17:00,15,30,45:00'])
+        self.assert_equal(self.calendar('30 2 1 1,4,7,10 *'),
+                          ['*-01,04,07,10-01 02:30:00'])
+        self.assert_equal(self.calendar('0 0 * * 0,6'),
+                          ['Sat,Sun *-*-* 00:00:00'])
+
+    def test_day_rule(self):
+        # either field matches
+        self.assert_equal(self.calendar('0 0 1,15 * fri'),
+                          ['*-*-01,15 00:00:00', 'Fri *-*-* 00:00:00'])
+        self.assert_equal(self.calendar('0 0 1-31 * 1'), ['*-*-* 00:00:00'])
+        # both fields match
+        self.assert_equal(self.calendar('0 0 */10 * mon'),
+                          ['Mon *-*-01,11,21,31 00:00:00'])
+
+    def test_seconds(self):
+        self.assert_equal(on_calendar_seconds(15), '*-*-* *:*:00/15')
+        self.assert_equal(on_calendar_seconds(60), '*-*-* *:*:00')
+
+
+class ServiceTestCase(BaseTestCase):
+
+    def test_command(self):
+        job = CommandJob('echo "$HOME" 100%', every='1.day', output='null')
+        self.assert_equal(service_settings(job), [
+            ('Type', 'oneshot'),
+            ('ExecStart', '/bin/sh -c "echo \\"$$HOME\\" 100%%"'),
+            ('StandardOutput', 'null'), ('StandardError', 'null')])
+        job = CommandJob('ls', every='1.day', output='| logger')
+        self.assert_equal(service_settings(job)[1],
+                          ('ExecStart', '/bin/sh -c "ls | logger"'))
+        self.assert_equal(service_settings(job, {'PATH': '/bin',
+                                                 'MAILTO': None,
+                                                 'RETRIES': 3})[:3], [
+            ('Type', 'oneshot'), ('Environment', 'PATH=/bin'),
+            ('Environment', 'RETRIES=3')])
+
+    def test_module(self):
+        job = ModuleJob('calendar', every='1.day',
+                        environment={'A': 'a b', 'TOKEN': 'a$b%'},
+                        output=dict(stdout='/tmp/out.log'))
+        self.assert_equal(service_settings(job), [
+            ('Type', 'oneshot'), ('Environment', '"A=a b"'),
+            ('Environment', 'TOKEN=a$b%%'),
+            ('ExecStart', '%s -m calendar' % sys.executable),
+            ('StandardOutput', 'append:/tmp/out.log'),
+            ('StandardError', 'null')])
+
+    def test_raw(self):
+        # the output is ignored like in the crontab
+        job = RawJob('date >> /tmp/date.log', every='1.day', output='null')
+        self.assert_equal(job.cron, '0 0 * * * date >> /tmp/date.log')
+        self.assert_equal(service_settings(job), [
+            ('Type', 'oneshot'),
+            ('ExecStart', '/bin/sh -c "date >> /tmp/date.log"')])
+
+
+class SystemdDirectoryTestCase(BaseTestCase):
+
+    def setup(self):
+        self.directory = tempfile.mkdtemp()
+
+    def teardown(self):
+        shutil.rmtree(self.directory)
+
+    def test_write(self):
+        plan = Plan('main', user='deploy', systemd=SystemdDirectory(
+            self.directory, randomized_delay='5min'))
+        plan.env('MAILTO', 'ops@example.com')
+        plan.command('date', every='1.day', at='12:00')
+        plan.command('reboot', every='reboot')
+        report = plan.write_systemd()
+        self.assert_equal(len(report.written), 4)
+        timers = sorted(name for name in os.listdir(self.directory)
+                        if name.endswith('.timer'))
+        self.assert_equal(len(timers), 2)
+        contents = []
+        for timer in timers:
+            with open(os.path.join(self.directory, timer)) as f:
+                contents.append(f.read())
+        self.assert_in("""\
+[Timer]
+OnCalendar=*-*-* 12:00:00
+AccuracySec=1min
+RandomizedDelaySec=5min
+
+[Install]
+WantedBy=timers.target
+""", ''.join(contents))
+        self.assert_in('OnBootSec=0\n', ''.join(contents))
+        service = timers[0].replace('.timer', '.service')
+        with open(os.path.join(self.directory, service)) as f:
+            self.assert_in('\nUser=deploy\n'
+                           'Environment=MAILTO=ops@example.com\n', f.read())
+
+        # only changed units are written, removed jobs are cleaned
+        plan.jobs[0].at = '13:00'
+        del plan.jobs[1]
+        other = Plan('main-other', systemd=self.directory)
+        other.command('date', every='1.day')
+        other.write_systemd()
+        report = plan.write_systemd()
+        self.assert_equal(len(report.written), 1)
+        self.assert_equal(len(report.unchanged), 1)
+        self.assert_equal(len(report.removed), 2)
+        self.assert_equal(len(os.listdir(self.directory)), 4)
+        self.assert_equal(len(plan.clear_systemd()), 2)
+        self.assert_equal(len(os.listdir(self.directory)), 2)
+
+    def test_stable_names(self):
+        directory = SystemdDirectory(self.directory)
+        plan = Plan('main')
+        plan.command('a', every='1.day')
+        plan.command('a', every='1.day')
+        names = list(directory.render(plan))
+        self.assert_equal(len(set(names)), 4)
+        plan.jobs.insert(0, CommandJob('b', every='1.day'))
+        self.assert_equal(list(directory.render(plan))[2:], names)
+
+
+    def test_seconds(self):
+        directory = SystemdDirectory(self.directory)
+        plan = Plan('main')
+        plan.command('poll', every='15.second')
+        units = list(directory.render(plan).values())
+        self.assert_in('OnCalendar=*-*-* *:*:00/15', units[1])
+        self.assert_in('AccuracySec=1s', units[1])
+        plan.command('poll', every='15.second', at='minute.1')
+        self.assert_raises(ValidationError, directory.render, plan)
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(CalendarTestCase))
+    suite.addTest(unittest.makeSuite(ServiceTestCase))
+    suite.addTest(unittest.makeSuite(SystemdDirectoryTestCase))
+    return suite
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+    plan.testsuite.utils
+    ~~~~~~~~~~~~~~~~~~~~
+
+    Tests the utilities for Plan.
+
+    :copyright: (c) 2014 by Shipeng Feng.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import io
+import unittest
+
+from plan.testsuite import BaseTestCase
+from plan.utils import iter_lines, normalize_lines, write_lines, same_lines
+
+
+class LinesTestCase(BaseTestCase):
+
+    def normalize(self, content):
+        return '\n'.join(normalize_lines([content]))
+
+    def test_iter_lines(self):
+        for content in ('', 'a', 'a\nb', 'a\n', '\n\na\n\n'):
+            self.assert_equal(list(iter_lines(content)), content.split('\n'))
+
+    def test_normalize_lines(self):
+        self.assert_equal(self.normalize('\n\n  a\n\n\n\n\nb \n\n'),
+                          'a\n\n\nb')
+        self.assert_equal(self.normalize('a\n\n \n\nb'), 'a\n\n \n\nb')
+        self.assert_equal(self.normalize(' \n \n'), '')
+        self.assert_equal(list(normalize_lines(['a', '', '', '', 'b\nc'])),
+                          ['a', '', '', 'b', 'c'])
+
+    def test_same_lines(self):
+        self.assert_true(same_lines(['a', 'b'], iter(['a', 'b'])))
+        self.assert_false(same_lines(['a', 'b'], ['a']))
+        self.assert_false(same_lines(['a', ''], ['a']))
+        self.assert_true(same_lines([], []))
+
+    def test_write_lines(self):
+        fileobj = io.BytesIO()
+        write_lines(fileobj, ['a', u'\xe9'])
+        self.assert_equal(fileobj.getvalue(), b'a\n\xc3\xa9\n')
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(LinesTestCase))
+    return suite
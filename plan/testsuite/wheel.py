@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+    plan.testsuite.wheel
+    ~~~~~~~~~~~~~~~~~~~~
+
+    Tests the timing wheel for Plan.
+
+    :copyright: (c) 2014 by Shipeng Feng.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import random
+import unittest
+
+from plan.testsuite import BaseTestCase
+from plan.wheel import TimingWheel
+
+
+class TimingWheelTestCase(BaseTestCase):
+
+    def expire_all(self, wheel, ticks):
+        expired = {}
+        for tick in range(ticks):
+            for timer in wheel.advance():
+                self.assert_not_in(timer.item, expired)
+                expired[timer.item] = wheel.current
+        return expired
+
+    def test_expire(self):
+        wheel = TimingWheel()
+        wheel.add(1, 'a')
+        wheel.add(0, 'b')
+        wheel.add(64, 'c')
+        wheel.add(64 ** 2 + 5, 'd')
+        self.assert_equal(len(wheel), 4)
+        self.assert_equal(self.expire_all(wheel, 64 ** 2 + 10),
+                          {'a': 1, 'b': 1, 'c': 64, 'd': 64 ** 2 + 5})
+        self.assert_equal(len(wheel), 0)
+
+    def test_random(self):
+        random.seed(7)
+        for slots, levels in ((2, 1), (4, 2), (8, 3), (64, 4)):
+            wheel = TimingWheel(slots=slots, levels=levels)
+            expected = {}
+            for item in range(300):
+                ticks = random.randint(1, 3000)
+                wheel.add(ticks, item)
+                expected[item] = ticks
+            self.assert_equal(self.expire_all(wheel, 3000), expected)
+
+    def test_cancel(self):
+        wheel = TimingWheel()
+        timer = wheel.add(100, 'a')
+        wheel.add(100, 'b')
+        wheel.cancel(timer)
+        wheel.cancel(timer)
+        self.assert_equal(len(wheel), 1)
+        self.assert_equal(self.expire_all(wheel, 200), {'b': 100})
+
+    def test_advance_to(self):
+        wheel = TimingWheel(tick=0.5, start=10.0)
+        wheel.add(1, 'a')
+        wheel.add(3, 'b')
+        self.assert_equal(wheel.advance_to(10.4), [])
+        self.assert_equal([timer.item for timer in wheel.advance_to(10.6)],
+                          ['a'])
+        self.assert_true(abs(wheel.lag - 0.1) < 1e-9)
+        # late ticks are all handled and their lag recorded
+        self.assert_equal([timer.item for timer in wheel.advance_to(12.0)],
+                          ['b'])
+        self.assert_equal(wheel.current, 4)
+        self.assert_true(abs(wheel.max_lag - 1.0) < 1e-9)
+        self.assert_equal(wheel.ticks, 4)
+        self.assert_true(abs(wheel.mean_lag - 0.4) < 1e-9)
+
+    def test_many_timers(self):
+        wheel = TimingWheel()
+        for item in range(100000):
+            wheel.add(item % 86400 + 1, item)
+        self.assert_equal(len(wheel), 100000)
+        expired = 0
+        for tick in range(86400):
+            expired += len(wheel.advance())
+        self.assert_equal(expired, 100000)
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TimingWheelTestCase))
+    return suite
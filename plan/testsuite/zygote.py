@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+    plan.testsuite.zygote
+    ~~~~~~~~~~~~~~~~~~~~~
+
+    Tests the zygote runner for Plan.
+
+    :copyright: (c) 2014 by Shipeng Feng.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import os
+import sys
+import time
+import shutil
+import socket
+import tempfile
+import unittest
+import subprocess
+
+from plan.testsuite import BaseTestCase
+from plan.zygote import stats
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+SCRIPT = """\
+import os
+import sys
+print('%s %s %s %s' % (sys.argv[1:], os.getcwd(), os.environ.get('GREETING'),
+                       'decimal' in sys.modules))
+sys.exit(int(sys.argv[1]))
+"""
+
+
+@unittest.skipIf(not hasattr(socket.socket, 'sendmsg'),
+                 'the zygote needs Python 3.3')
+class ZygoteTestCase(BaseTestCase):
+
+    def setup(self):
+        self.directory = os.path.realpath(tempfile.mkdtemp())
+        self.path = os.path.join(self.directory, 'zygote.sock')
+        with open(os.path.join(self.directory, 'job.py'), 'w') as f:
+            f.write(SCRIPT)
+        self.environ = dict(os.environ, PYTHONPATH=ROOT, GREETING='hello')
+        self.daemon = None
+
+    def teardown(self):
+        if self.daemon is not None and self.daemon.poll() is None:
+            self.daemon.kill()
+            self.daemon.wait()
+        shutil.rmtree(self.directory)
+
+    def start(self):
+        self.daemon = subprocess.Popen(
+            [sys.executable, '-c', 'from plan.zygote import Zygote; '
+             'Zygote(%r, ["decimal"]).serve_forever()' % self.path],
+            env=self.environ)
+        for attempt in range(100):
+            if stats(self.path) is not None:
+                return
+            time.sleep(0.05)
+        self.fail('zygote did not start')
+
+    def run_job(self, status):
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'plan.zygote', self.path, 'job.py',
+             str(status)], cwd=self.directory, env=self.environ,
+            stdout=subprocess.PIPE)
+        output = process.communicate()[0].decode('utf-8')
+        return process.returncode, output
+
+    def test_run(self):
+        self.start()
+        self.assert_equal(self.run_job(3), (3, "['3'] %s hello True\n" %
+                                            self.directory))
+        self.assert_equal(self.run_job(0)[0], 0)
+        result = stats(self.path)
+        self.assert_equal(result['runs'], 2)
+        self.assert_equal(result['preload'], ['decimal'])
+        self.assert_equal(result['jobs']['job.py']['failures'], 1)
+        self.assert_true(result['saved_seconds'] >= 0)
+        self.daemon.terminate()
+        self.assert_equal(self.daemon.wait(), 0)
+        self.assert_false(os.path.exists(self.path))
+
+    def test_fallback(self):
+        self.assert_equal(self.run_job(4), (4, "['4'] %s hello False\n" %
+                                            self.directory))
+
+
+def suite():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(ZygoteTestCase))
+    return suite
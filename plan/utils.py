@@ -9,7 +9,50 @@
     :license: BSD, see LICENSE for more details.
 """
 
-from subprocess import Popen, PIPE
+import os
+import contextlib
+
+from ._compat import get_binary_content, string_types, zip_longest
+
+
+class Echo(object):
+    """Echo class for Plan.  This is used to echo some common used content
+    type in the command line.  Click is imported on the first echo, so
+    importing Plan does not pay for it.
+    """
+
+    @classmethod
+    def echo(cls, message):
+        import click
+        click.echo(message)
+
+    @classmethod
+    def secho(cls, *args, **kwargs):
+        import click
+        click.secho(*args, **kwargs)
+
+    @classmethod
+    def message(cls, message):
+        cls.secho("[message] %s" % message, fg="green")
+
+    @classmethod
+    def write(cls, message):
+        cls.secho("[write] %s" % message, fg="green")
+
+    @classmethod
+    def fail(cls, message):
+        cls.secho("[fail] %s" % message, fg="red")
+
+    @classmethod
+    def add(cls, message):
+        cls.secho("[add] %s" % message, fg="green")
+
+    @classmethod
+    def done(cls, message=None):
+        if message:
+            cls.secho("[done] %s" % message, fg="green")
+        else:
+            cls.secho("[done]!", fg="green")
 
 
 def communicate_process(command, stdin=None, *args, **kwargs):
@@ -18,7 +61,161 @@ def communicate_process(command, stdin=None, *args, **kwargs):
     :param stdin: the data you want to send to stdin.
     :return: a tuple of stdout, stderr and returncode
     """
+    from subprocess import Popen, PIPE
     p = Popen(command, stdin=PIPE, stdout=PIPE, stderr=PIPE, *args, **kwargs)
     output, error = p.communicate(stdin)
     returncode = p.returncode
     return output, error, returncode
+
+
+def iter_lines(content):
+    """Iterate over the lines of content split by ``'\\n'`` without building
+    a list, the same as iterating over ``content.split('\\n')``.
+    """
+    start = 0
+    while True:
+        end = content.find('\n', start)
+        if end == -1:
+            yield content[start:]
+            return
+        yield content[start:end]
+        start = end + 1
+
+
+def normalize_lines(lines):
+    """Normalize the content made of lines joined by ``'\\n'`` the way
+    cronfiles are written, one line at a time.  At most two empty lines are
+    kept in a row and the whole content is stripped.  Lines containing
+    ``'\\n'`` are split.
+
+    :param lines: an iterable of lines.
+    :return: a generator of normalized lines.
+    """
+    # the last line with content and the lines after it
+    previous = None
+    blanks = []
+    for line in lines:
+        for part in iter_lines(line):
+            if not part.strip():
+                if previous is not None:
+                    blanks.append(part)
+                continue
+            if previous is None:
+                part = part.lstrip()
+            else:
+                yield previous
+                empty = 0
+                for blank in blanks:
+                    empty = empty + 1 if blank == '' else 0
+                    if empty <= 2:
+                        yield blank
+            previous = part
+            blanks = []
+    if previous is not None:
+        yield previous.rstrip()
+
+
+def write_lines(fileobj, lines):
+    """Write lines into one binary file object, every line is followed by
+    ``'\\n'``.
+    """
+    for line in lines:
+        fileobj.write(get_binary_content(line + '\n'))
+
+
+def same_lines(first, second):
+    """Tell whether two iterables of lines are equal, stops at the first
+    difference.
+    """
+    missing = object()
+    for a, b in zip_longest(first, second, fillvalue=missing):
+        if a != b:
+            return False
+    return True
+
+
+def join_chunks(chunks):
+    """Iterate over the lines of the content made of chunks, the same as
+    iterating over ``iter_lines(''.join(chunks))`` without joining them.
+    Every chunk is either a string or an iterable of strings.
+    """
+    pending = []
+    for chunk in chunks:
+        if isinstance(chunk, string_types):
+            chunk = [chunk]
+        for part in chunk:
+            if '\n' not in part:
+                pending.append(part)
+                continue
+            lines = iter_lines(part)
+            pending.append(next(lines))
+            line = ''.join(pending)
+            for next_line in lines:
+                yield line
+                line = next_line
+            pending = [line]
+    yield ''.join(pending)
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on one local lockfile, the file is created if
+    it does not exist.  Nothing is locked if path is None.
+    """
+    if path is None:
+        yield
+        return
+    import fcntl
+    with open(path, 'a') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def atomic_write(path, lines, mode=0o644, owner=None):
+    """Replace one file with lines atomically.  Lines are written into one
+    temporary file starting with a dot in the same directory, synced to disk
+    and renamed over path, so readers never see half written files.
+
+    :param path: the file path.
+    :param lines: an iterable of lines without newlines.
+    :param mode: the permission bits of the file.
+    :param owner: the (uid, gid) tuple the file is given to, None means the
+                  file is not given away.
+    """
+    import tempfile
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(prefix='.%s.' % os.path.basename(path),
+                                    dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write_lines(f, lines)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, mode)
+        if owner is not None:
+            os.chown(tmp_path, owner[0], owner[1])
+        os.rename(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    sync_directory(directory)
+
+
+def sync_directory(directory):
+    """Sync one directory so renames inside it are on disk."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
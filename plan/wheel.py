@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+    plan.wheel
+    ~~~~~~~~~~
+
+    Hierarchical timing wheel for Plan.  Timers are kept in levels of slots,
+    every level covers `slots` times the ticks of the one below, so adding a
+    timer and expiring one costs the same no matter how many timers there
+    are.  Timers far away sit in upper levels and move down one level at a
+    time as their tick comes closer.
+
+    :copyright: (c) 2014 by Shipeng Feng.
+    :license: BSD, see LICENSE for more details.
+"""
+
+
+class Timer(object):
+    """One timer added to :class:`TimingWheel`."""
+
+    __slots__ = ('expires', 'item', 'cancelled')
+
+    def __init__(self, expires, item):
+        #: The tick the timer expires on.
+        self.expires = expires
+        #: The item given when adding the timer.
+        self.item = item
+        self.cancelled = False
+
+    def __repr__(self):
+        return '<Timer %d %r>' % (self.expires, self.item)
+
+
+class TimingWheel(object):
+    """The hierarchical timing wheel.  The wheel counts ticks, time is only
+    used by :meth:`advance_to`, which also records how late every tick was
+    handled.
+
+    .. versionadded:: 0.6
+
+    :param tick: how many seconds one tick lasts.
+    :param start: the time of tick 0 in seconds.
+    :param slots: how many slots one level has, a power of 2.
+    :param levels: how many levels there are, timers further away than
+                   ``slots ** levels`` ticks are moved down when their slot
+                   in the top level comes around until they fit.
+    """
+
+    def __init__(self, tick=1.0, start=0.0, slots=64, levels=4):
+        if slots & (slots - 1):
+            raise ValueError("slots must be a power of 2")
+        self.tick = tick
+        self.start = start
+        self.bits = slots.bit_length() - 1
+        self.mask = slots - 1
+        self.spans = [slots ** (level + 1) for level in range(levels)]
+        self.wheels = [[[] for slot in range(slots)]
+                       for level in range(levels)]
+        #: The current tick.
+        self.current = 0
+        self.count = 0
+        #: How many seconds the last tick was handled after its time.
+        self.lag = 0.0
+        #: The largest lag seen.
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        #: How many ticks were handled by :meth:`advance_to`.
+        self.ticks = 0
+
+    def __len__(self):
+        return self.count
+
+    def add(self, ticks, item):
+        """Add one timer expiring ticks after the current tick, ticks less
+        than 1 expire on the next tick.
+
+        :param ticks: how many ticks from now.
+        :param item: anything, returned in the timer on expiry.
+        :return: one :class:`Timer` instance.
+        """
+        timer = Timer(self.current + max(ticks, 1), item)
+        self.place(timer)
+        self.count += 1
+        return timer
+
+    def place(self, timer):
+        delta = timer.expires - self.current
+        for level, span in enumerate(self.spans):
+            if delta < span:
+                expires = timer.expires
+                break
+        else:
+            # too far away, park it in the top level until it fits
+            expires = self.current + self.spans[-1] - 1
+        index = (expires >> (self.bits * level)) & self.mask
+        self.wheels[level][index].append(timer)
+
+    def cancel(self, timer):
+        """Cancel one timer, it is dropped when its slot is next reached."""
+        if not timer.cancelled:
+            timer.cancelled = True
+            self.count -= 1
+
+    def cascade(self, level):
+        """Move the timers of the current slot of one level down."""
+        index = (self.current >> (self.bits * level)) & self.mask
+        timers = self.wheels[level][index]
+        self.wheels[level][index] = []
+        for timer in timers:
+            if not timer.cancelled:
+                self.place(timer)
+
+    def advance(self):
+        """Move to the next tick.
+
+        :return: a list of the :class:`Timer` instances expiring on it.
+        """
+        self.current += 1
+        level = 0
+        while level + 1 < len(self.wheels) and \
+                not (self.current >> (self.bits * level)) & self.mask:
+            # one level turns whenever the level below wrapped around
+            level += 1
+            self.cascade(level)
+        wheel = self.wheels[0]
+        index = self.current & self.mask
+        timers = wheel[index]
+        if not timers:
+            return timers
+        wheel[index] = []
+        expired = []
+        for timer in timers:
+            if timer.cancelled:
+                continue
+            if timer.expires > self.current:
+                # parked in the only level
+                self.place(timer)
+            else:
+                expired.append(timer)
+        self.count -= len(expired)
+        return expired
+
+    @property
+    def next_time(self):
+        """The time of the next tick in seconds."""
+        return self.start + (self.current + 1) * self.tick
+
+    def advance_to(self, now):
+        """Move through all the ticks due at now.
+
+        :param now: the current time in seconds.
+        :return: a list of the :class:`Timer` instances expired.
+        """
+        expired = []
+        while self.next_time <= now:
+            lag = now - self.next_time
+            expired.extend(self.advance())
+            self.lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self.total_lag += lag
+            self.ticks += 1
+        return expired
+
+    @property
+    def mean_lag(self):
+        """The average lag of all ticks handled by :meth:`advance_to`."""
+        if not self.ticks:
+            return 0.0
+        return self.total_lag / self.ticks
@@ -0,0 +1,432 @@
+# -*- coding: utf-8 -*-
+"""
+    plan.zygote
+    ~~~~~~~~~~~
+
+    Pre-forked runner for Plan.  The zygote is one daemon importing a set of
+    heavy modules once and listening on one Unix socket, script and module
+    jobs ask it to fork one child running the script or module instead of
+    starting one interpreter importing everything again.
+
+    The cron line runs the client with the same arguments the interpreter
+    would get::
+
+        python -m plan.zygote /path/to/zygote.sock script.py
+        python -m plan.zygote /path/to/zygote.sock -m module
+
+    The client sends its working directory, environment and standard streams
+    to the zygote and exits with the status of the child.  If the zygote is
+    not running, the client replaces itself with ``python script.py`` or
+    ``python -m module``, so the job still runs.
+
+    :copyright: (c) 2014 by Shipeng Feng.
+    :license: BSD, see LICENSE for more details.
+"""
+
+import os
+import sys
+import json
+import time
+import errno
+import array
+import signal
+import select
+import socket
+import traceback
+
+
+#: The longest request the zygote reads.
+MAX_REQUEST = 1 << 20
+
+
+def read_line(sock, fds=None):
+    """Read one line from one socket, file descriptors sent with it are
+    appended to fds.
+    """
+    data = b''
+    while not data.endswith(b'\n'):
+        if fds is not None:
+            chunk, ancdata, flags, address = sock.recvmsg(
+                4096, socket.CMSG_LEN(3 * array.array('i').itemsize))
+            for level, kind, payload in ancdata:
+                if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+                    received = array.array('i')
+                    received.frombytes(payload[:len(payload) -
+                                               len(payload) %
+                                               received.itemsize])
+                    fds.extend(received)
+        else:
+            chunk = sock.recv(4096)
+        if not chunk:
+            break
+        data += chunk
+        if len(data) > MAX_REQUEST:
+            raise ValueError("request too long")
+    return data.decode('utf-8')
+
+
+def run_child(argv, cwd, environ):
+    """Run one script or module in the current process like the interpreter
+    would with argv, this is called in the forked child.
+
+    :return: the exit status.
+    """
+    import runpy
+    os.chdir(cwd)
+    os.environ.clear()
+    os.environ.update(environ)
+    try:
+        if argv[0] == '-m':
+            sys.argv = argv[1:]
+            sys.path[0] = cwd
+            runpy.run_module(argv[1], run_name='__main__', alter_sys=True)
+        else:
+            sys.argv = list(argv)
+            sys.path[0] = os.path.dirname(os.path.abspath(argv[0]))
+            runpy.run_path(argv[0], run_name='__main__')
+    except SystemExit as e:
+        if e.code is None:
+            return 0
+        if isinstance(e.code, int):
+            return e.code
+        sys.stderr.write('%s\n' % e.code)
+        return 1
+    except BaseException:
+        traceback.print_exc()
+        return 1
+    return 0
+
+
+class Zygote(object):
+    """The zygote daemon.  Every request forks one child of the daemon, the
+    preloaded modules are already imported there.  Requests are handled one
+    after another in one thread, so children are never forked while another
+    thread holds one lock.
+
+    The socket is only accessible by the user running the zygote, children
+    run as this user no matter who asked.
+
+    .. versionadded:: 0.6
+
+    :param path: the Unix socket path.
+    :param preload: a list of module names imported before serving.
+    :param mode: the permission bits of the socket.
+    """
+
+    def __init__(self, path, preload=(), mode=0o600):
+        self.path = path
+        self.preload = list(preload)
+        self.mode = mode
+        #: How many seconds one new interpreter takes to start and import
+        #: the preloaded modules, measured once when serving starts.
+        self.startup_seconds = 0.0
+        #: How many seconds importing the preloaded modules took here.
+        self.preload_seconds = 0.0
+        #: Per job statistics, the job is the script path or ``-m module``.
+        self.jobs = {}
+        self.children = {}
+        self.stopping = False
+        self.listener = None
+        self.wakeup = None
+
+    def load(self):
+        """Import the preloaded modules and measure the startup time one new
+        interpreter would need instead.
+        """
+        import importlib
+        import subprocess
+        start = time.time()
+        for module in self.preload:
+            importlib.import_module(module)
+        self.preload_seconds = time.time() - start
+        code = ''.join('import %s;' % module for module in self.preload)
+        start = time.time()
+        subprocess.call([sys.executable, '-c', code or 'pass'])
+        self.startup_seconds = time.time() - start
+
+    def bind(self):
+        """Bind the socket, one stale socket left by one dead zygote is
+        removed first.
+        """
+        from .exceptions import PlanError
+        if not hasattr(socket.socket, 'recvmsg'):
+            raise PlanError("the zygote needs Python 3.3 or later")
+        if os.path.exists(self.path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.path)
+            except socket.error:
+                os.unlink(self.path)
+            else:
+                raise PlanError("one zygote is already listening on %s" %
+                                self.path)
+            finally:
+                probe.close()
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        umask = os.umask(0o777 & ~self.mode)
+        try:
+            listener.bind(self.path)
+        finally:
+            os.umask(umask)
+        listener.listen(128)
+        self.listener = listener
+
+    def serve_forever(self):
+        """Load, bind and serve requests until SIGTERM or SIGINT, children
+        still running then are waited for.
+        """
+        self.load()
+        self.bind()
+        read_fd, write_fd = os.pipe()
+        for fd in (read_fd, write_fd):
+            set_nonblocking(fd)
+        self.wakeup = read_fd
+        old_wakeup = signal.set_wakeup_fd(write_fd)
+        handlers = {}
+        for signum, handler in ((signal.SIGCHLD, lambda *args: None),
+                                (signal.SIGTERM, self.stop),
+                                (signal.SIGINT, self.stop)):
+            handlers[signum] = signal.signal(signum, handler)
+        try:
+            while not self.stopping or self.children:
+                self.poll()
+        finally:
+            signal.set_wakeup_fd(old_wakeup)
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+            self.close()
+            os.close(read_fd)
+            os.close(write_fd)
+
+    def stop(self, *args):
+        """Stop accepting requests."""
+        self.stopping = True
+
+    def close(self):
+        if self.listener is not None:
+            self.listener.close()
+            self.listener = None
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+    def poll(self, timeout=None):
+        """Wait for one request or one child exiting and handle it."""
+        if self.stopping:
+            self.close()
+        readers = [self.wakeup]
+        if self.listener is not None:
+            readers.append(self.listener)
+        try:
+            readable = select.select(readers, [], [], timeout)[0]
+        except (select.error, OSError) as e:
+            if e.args[0] != errno.EINTR:
+                raise
+            readable = []
+        if self.wakeup in readable:
+            try:
+                while os.read(self.wakeup, 512):
+                    pass
+            except OSError:
+                pass
+        self.reap()
+        if self.listener is not None and self.listener in readable:
+            try:
+                connection = self.listener.accept()[0]
+            except socket.error:
+                return
+            self.handle(connection)
+
+    def handle(self, connection):
+        """Handle one request."""
+        fds = []
+        try:
+            connection.settimeout(5)
+            line = read_line(connection, fds)
+            request = json.loads(line)
+            if request.get('stats'):
+                connection.sendall(json.dumps(self.stats()).encode('utf-8') +
+                                   b'\n')
+                connection.close()
+                return
+            if len(fds) != 3:
+                raise ValueError("standard streams missing")
+            self.fork(connection, request, fds)
+        except Exception as e:
+            try:
+                connection.sendall(json.dumps(
+                    {'error': str(e)}).encode('utf-8') + b'\n')
+            except socket.error:
+                pass
+            connection.close()
+        finally:
+            for fd in fds:
+                os.close(fd)
+
+    def fork(self, connection, request, fds):
+        argv = request['argv']
+        sys.stdout.flush()
+        sys.stderr.flush()
+        start = time.time()
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                signal.set_wakeup_fd(-1)
+                for signum in (signal.SIGCHLD, signal.SIGTERM,
+                               signal.SIGINT):
+                    signal.signal(signum, signal.SIG_DFL)
+                self.listener.close()
+                connection.close()
+                os.close(self.wakeup)
+                for other, job in self.children.values():
+                    other.close()
+                for target, fd in enumerate(fds):
+                    os.dup2(fd, target)
+                for fd in fds:
+                    if fd > 2:
+                        os.close(fd)
+                status = run_child(argv, request['cwd'], request['environ'])
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                try:
+                    sys.stdout.flush()
+                    sys.stderr.flush()
+                finally:
+                    os._exit(status)
+        fork_seconds = time.time() - start
+        job = ' '.join(argv[:2]) if argv[0] == '-m' else argv[0]
+        self.children[pid] = (connection, job)
+        stats = self.jobs.setdefault(job, {'runs': 0, 'failures': 0,
+                                           'saved_seconds': 0.0})
+        stats['runs'] += 1
+        stats['saved_seconds'] += max(self.startup_seconds - fork_seconds, 0)
+
+    def reap(self):
+        """Reply the exit status of every exited child."""
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except OSError as e:
+                if e.errno != errno.ECHILD:
+                    raise
+                return
+            if pid == 0:
+                return
+            if pid not in self.children:
+                continue
+            connection, job = self.children.pop(pid)
+            if os.WIFSIGNALED(status):
+                status = -os.WTERMSIG(status)
+            else:
+                status = os.WEXITSTATUS(status)
+            if status != 0:
+                self.jobs[job]['failures'] += 1
+            try:
+                connection.sendall(json.dumps(
+                    {'status': status}).encode('utf-8') + b'\n')
+            except socket.error:
+                pass
+            connection.close()
+
+    def stats(self):
+        """Get the statistics as one dictionary."""
+        return {
+            'pid': os.getpid(),
+            'preload': self.preload,
+            'preload_seconds': self.preload_seconds,
+            'startup_seconds': self.startup_seconds,
+            'running': len(self.children),
+            'runs': sum(job['runs'] for job in self.jobs.values()),
+            'saved_seconds': sum(job['saved_seconds']
+                                 for job in self.jobs.values()),
+            'jobs': self.jobs,
+        }
+
+
+def set_nonblocking(fd):
+    import fcntl
+    flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+    fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+
+
+def connect(path):
+    """Connect to the zygote listening on path, None if it is not up."""
+    if not hasattr(socket.socket, 'sendmsg'):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except socket.error:
+        sock.close()
+        return None
+    return sock
+
+
+def request(path, argv):
+    """Ask the zygote listening on path to run argv, the script or module
+    arguments the interpreter would get.  If the zygote is not up, this
+    process is replaced with the interpreter running argv.
+
+    :return: the exit status.
+    """
+    sock = connect(path)
+    if sock is not None:
+        message = json.dumps({'argv': argv, 'cwd': os.getcwd(),
+                              'environ': dict(os.environ)})
+        try:
+            sock.sendmsg([message.encode('utf-8') + b'\n'],
+                         [(socket.SOL_SOCKET, socket.SCM_RIGHTS,
+                           array.array('i', [0, 1, 2]))])
+        except socket.error:
+            sock.close()
+            sock = None
+    if sock is None:
+        os.execv(sys.executable, [sys.executable] + list(argv))
+    try:
+        line = read_line(sock)
+    finally:
+        sock.close()
+    if not line:
+        sys.stderr.write("plan zygote exited before the job finished\n")
+        return 1
+    reply = json.loads(line)
+    if 'error' in reply:
+        sys.stderr.write("plan zygote failed: %s\n" % reply['error'])
+        return 1
+    status = reply['status']
+    if status < 0:
+        return 128 - status
+    return status
+
+
+def stats(path):
+    """Get the statistics of the zygote listening on path, None if it is
+    not up.
+    """
+    sock = connect(path)
+    if sock is None:
+        return None
+    try:
+        sock.sendall(b'{"stats": true}\n')
+        return json.loads(read_line(sock))
+    finally:
+        sock.close()
+
+
+def main(args=None):
+    """The client, ``python -m plan.zygote socket script.py`` or
+    ``python -m plan.zygote socket -m module``.
+    """
+    args = sys.argv[1:] if args is None else args
+    if len(args) < 2 or (args[1] == '-m' and len(args) < 3):
+        sys.stderr.write("usage: python -m plan.zygote socket "
+                         "(script | -m module) [args]\n")
+        return 2
+    return request(args[0], args[1:])
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -51,15 +51,21 @@ setup(
     description='A Python package for writing and deploying cron jobs '
                 'with a clear and beautiful syntax.',
     long_description=__doc__,
-    packages=['plan', 'plan.testsuite'],
+    packages=['plan', 'plan.testsuite', 'plan.benchmarks'],
     entry_points={
         'console_scripts': [
-            'plan-quickstart = plan.commands:quickstart'
+            'plan-quickstart = plan.commands:quickstart',
+            'plan-deploy = plan.commands:deploy',
+            'plan-serve = plan.commands:serve',
+            'plan-zygote = plan.commands:zygote'
         ]
     },
     install_requires=[
         'click>=2.1'
     ],
+    extras_require={
+        'profile': ['numpy']
+    },
     zip_safe=False,
     classifiers=[
         'Development Status :: 5 - Production/Stable',